@@ -2,10 +2,20 @@
 Insert legislation xml files into postgres.
 """
 
-import json
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+import datetime
+from functools import partial
+import os
 from pathlib import Path
-import re
 import rich
+import sys
+import time
+import traceback
+from typing import Iterable
+from typing import Iterator
 from typing import Union
 from typing import Optional
 
@@ -13,16 +23,25 @@ from bs4 import BeautifulSoup
 import pandas as pd
 import sqlalchemy
 from sqlalchemy import create_engine
+from sqlalchemy import literal_column
+from sqlalchemy import select
 from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.dialects import postgresql
 from sqlalchemy.dialects.postgresql import insert
-import xml.etree.ElementTree as ET
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
+from congress_prep import billstatus_tables_mod
+from congress_prep import checkpoint_mod
+from congress_prep import instrument_mod
 from congress_prep import orm_mod
+from congress_prep import parse_cache_mod
+from congress_prep import pg_copy_mod
+from congress_prep import pipeline_mod
+from congress_prep import scan_mod
 from congress_prep import utils
-from congress_prep.bill_status_mod import BillStatus
-from congress_prep.textversions_mod import get_bill_text_v4
+from congress_prep import textversions_mod
+from congress_prep import xml_mod
 
 
 def get_session(conn_str: str, echo=False):
@@ -52,264 +71,918 @@ def upsert(
     rows: list[dict],
     lastmod_col: str = "lastmod",
     no_update_cols: Optional[list[str]] = None,
-):
+    hash_col: Optional[str] = "content_hash",
+    watermark_cols: Iterable[str] = pg_copy_mod.WATERMARK_COLUMNS,
+) -> Counter:
+    """Insert rows and update existing rows on primary key conflict
+
+    If the rows have a hash_col value an existing row is only updated when
+    its stored hash differs, so identical content is never rewritten. The
+    watermark_cols (lastmod, scrape_path) of the other rows are then updated
+    on their own, so an incremental run does not read an unchanged file
+    whose lastmod moved again. With hash_col None every conflicting row is
+    updated.
+
+    Works with postgres and sqlite (used by the benchmarks). On sqlite the
+    lastmod strings are parsed to datetimes and the inserted/updated split
+    comes from looking up the batch keys first instead of RETURNING xmax.
+
+    Returns:
+        counts of "inserted", "updated" (content changed), "lastmod_only"
+        (only watermark columns changed) and "unchanged" rows
+    """
     if no_update_cols is None:
         no_update_cols = []
-    stmt = insert(table).values(rows)
+    is_sqlite = session.get_bind().dialect.name == "sqlite"
+    if is_sqlite:
+        rows = [
+            {**row, lastmod_col: utils.parse_lastmod(row[lastmod_col])}
+            if isinstance(row.get(lastmod_col), str)
+            else row
+            for row in rows
+        ]
+        stmt = sqlite_insert(table).values(rows)
+    else:
+        stmt = insert(table).values(rows)
     update_cols = [
         c.name
         for c in table.c
         if c not in list(table.primary_key.columns) and c.name not in no_update_cols
     ]
+    where = None
+    if hash_col is not None and hash_col in table.c and hash_col in rows[0]:
+        where = table.c[hash_col].is_distinct_from(stmt.excluded[hash_col])
     on_conflict_stmt = stmt.on_conflict_do_update(
         index_elements=table.primary_key.columns,
         set_={k: getattr(stmt.excluded, k) for k in update_cols},
+        where=where,
     )
-    session.execute(on_conflict_stmt)
+
+    if is_sqlite:
+        (key_col,) = table.primary_key.columns
+        keys = [row[key_col.name] for row in rows]
+        nexisting = session.execute(
+            select(sqlalchemy.func.count()).where(key_col.in_(keys))
+        ).scalar_one()
+        nwritten = session.execute(on_conflict_stmt).rowcount
+        ninserted = len(rows) - nexisting
+        counts = Counter(
+            inserted=ninserted,
+            updated=nwritten - ninserted,
+            unchanged=len(rows) - nwritten,
+        )
+    else:
+        on_conflict_stmt = on_conflict_stmt.returning(
+            literal_column("(xmax = 0)").label("inserted")
+        )
+        counts = pg_copy_mod.count_returned(
+            session.execute(on_conflict_stmt), len(rows)
+        )
+    counts["lastmod_only"] = 0
+
+    watermark_cols = [col for col in watermark_cols if col in update_cols and col in rows[0]]
+    if where is not None and watermark_cols and counts["unchanged"]:
+        # rows written above already have the new values and do not match
+        key_cols = [c.name for c in table.primary_key.columns]
+        incoming = {tuple(row[col] for col in key_cols): row for row in rows}
+        params = {
+            col: sqlalchemy.bindparam(f"b_{col}", type_=table.c[col].type)
+            for col in key_cols + watermark_cols
+        }
+        update_stmt = (
+            sqlalchemy.update(table)
+            .where(*[table.c[col] == params[col] for col in key_cols])
+            .where(
+                sqlalchemy.or_(
+                    *[table.c[col].is_distinct_from(params[col]) for col in watermark_cols]
+                )
+            )
+            .values({col: params[col] for col in watermark_cols})
+        )
+        nwatermarked = session.execute(
+            update_stmt,
+            [
+                {f"b_{col}": row[col] for col in key_cols + watermark_cols}
+                for row in incoming.values()
+            ],
+        ).rowcount
+        counts["lastmod_only"] = nwatermarked
+        counts["unchanged"] -= nwatermarked
     session.commit()
+    return counts
 
 
-def upsert_billstatus(
-    congress_scraper_path: Union[str, Path], conn_str: str, batch_size: int = 1000
-):
-    """Upsert billstatus xml files into postgres
+def format_counts(counts: Counter) -> str:
+    return ", ".join(
+        f"{counts[key]} {key.replace('_', ' ')}"
+        for key in ("inserted", "updated", "lastmod_only", "unchanged")
+    )
+
+
+def sized_item_nbytes(item: tuple[int, tuple[dict, int]]) -> int:
+    """Size of an (offset, (row, nbytes)) item of the billstatus pipeline"""
+    return item[1][1]
+
+
+def get_lastmods(
+    conn_str: str, table: sqlalchemy.Table, id_col: str
+) -> dict[str, datetime.datetime]:
+    """Read all (id, lastmod) pairs from a table in one query"""
+    engine = create_engine(conn_str)
+    with engine.connect() as conn:
+        result = conn.execute(select(table.c[id_col], table.c["lastmod"]))
+        return {row_id: lastmod for row_id, lastmod in result}
+
+
+def is_new_or_changed(
+    row_id: str, lastmod_str: str, lastmods: dict[str, datetime.datetime]
+) -> bool:
+    if row_id not in lastmods:
+        return True
+    try:
+        return utils.parse_lastmod(lastmod_str) != lastmods[row_id]
+    except ValueError:
+        rich.print(f"can't parse lastmod {lastmod_str!r} of {row_id}, treating it as changed")
+        return True
+
+
+def get_billstatus_path_info(record: scan_mod.ScanRecord) -> dict:
+    """Get billstatus table columns that come from the file path"""
+    return {
+        "legis_id": record.legis_id,
+        "congress_num": record.congress_num,
+        "legis_type": record.legis_type,
+        "legis_num": record.legis_num,
+        "scrape_path": record.scrape_path,
+    }
+
+
+def get_textversion_path_info(record: scan_mod.ScanRecord) -> dict:
+    """Get textversions table columns that come from the file path"""
+    return {
+        "tv_id": record.tv_id,
+        "legis_id": record.legis_id,
+        "congress_num": record.congress_num,
+        "legis_type": record.legis_type,
+        "legis_num": record.legis_num,
+        "legis_version": record.legis_version,
+        "legis_class": record.legis_class,
+        "scrape_path": record.scrape_path,
+        "file_name": record.file_name,
+        "xml_type": record.xml_type,
+    }
+
+
+def filter_new_or_changed(
+    items: Iterable[tuple[int, scan_mod.ScanRecord]],
+    congress_scraper_path: Union[str, Path],
+    id_col: str,
+    lastmods: dict[str, datetime.datetime],
+    skipped: Counter,
+) -> Iterator[tuple[int, scan_mod.ScanRecord]]:
+    """Yield only (offset, record) pairs whose lastmod file differs from the database"""
+    for idx, record in items:
+        if record.lastmod_path is not None:
+            lastmod_str = (Path(congress_scraper_path) / record.lastmod_path).read_text()
+            if not is_new_or_changed(getattr(record, id_col), lastmod_str, lastmods):
+                skipped["unchanged"] += 1
+                continue
+        yield idx, record
+
+
+def get_billstatus_row(
+    record: scan_mod.ScanRecord,
+    congress_scraper_path: Union[str, Path],
+    trusted: bool = False,
+    parse_cache_dir: Optional[Union[str, Path]] = None,
+    stream_min_bytes: Optional[int] = None,
+) -> Optional[tuple[dict, int]]:
+    """Read and parse one billstatus xml file into a billstatus table row
+
+    This is a module level function so that it can be sent to worker processes.
 
     Args:
+        record: scan record for a fdsys_billstatus.xml file
         congress_scraper_path: should have "cache" and "data" as subdirectories
-        conn_str: postgres connection string
-        batch_size: number of billstatus files to upsert at once
+        trusted: build bs_json without pydantic validation (same json for
+            valid files, see model_json_mod)
+        parse_cache_dir: parsed billstatus cache (see parse_cache_mod,
+            default $CONGRESS_PREP_PARSE_CACHE)
+        stream_min_bytes: parse files of at least this size with the
+            streaming parser (None for never, see parse_cache_mod.parse)
+
+    Returns:
+        (row dictionary, payload bytes) or None if the file has no lastmod
+        sibling. The payload is the length of the xml plus the json text of
+        bs_json, which in memory is a nested dict much larger than the xml.
     """
+    if record.lastmod_path is None:
+        rich.print("billstatus oops: {}".format(record.scrape_path))
+        return None
+
+    congress_scraper_path = Path(congress_scraper_path)
+    with instrument_mod.step("read") as sp:
+        lastmod_str = (congress_scraper_path / record.lastmod_path).read_text()
+        xml_str = (congress_scraper_path / record.scrape_path).read_text().strip()
+        sp.nbytes = len(xml_str)
+    with instrument_mod.step("parse", nbytes=len(xml_str)):
+        bs_json, bs_json_str = parse_cache_mod.get_or_parse(
+            xml_str, parse_cache_dir, trusted=trusted, stream_min_bytes=stream_min_bytes
+        )
+    row = {
+        **get_billstatus_path_info(record),
+        "lastmod": lastmod_str,
+        "bs_xml": xml_str,
+        "bs_json": bs_json,
+        "content_hash": utils.get_content_hash(xml_str, bs_json_str),
+    }
+    return row, pipeline_mod.row_nbytes(row) + len(bs_json_str)
 
-    data_path = Path(congress_scraper_path) / "data"
-    Session = get_session(conn_str)
 
-    rows = []
-    ibatch = 0
-    for path_object in data_path.rglob("fdsys_billstatus.xml"):
-        path_str = str(path_object.relative_to(congress_scraper_path))
-        if match := re.match(utils.FILE_PATTERN, path_str):
-            congress_num, legis_class, legis_type, _, legis_num = match.groups()
-        else:
-            rich.print("billstatus oops: {}".format(path_object))
-            continue
-
-        lastmod_path = path_object.parent / "fdsys_billstatus-lastmod.txt"
-        lastmod_str = lastmod_path.read_text()
-        xml_str = path_object.read_text().strip()
-        bs = BillStatus.from_xml_str(xml_str)
-
-        row = {
-            "legis_id": "{}-{}-{}".format(congress_num, legis_type, legis_num),
-            "congress_num": int(congress_num),
-            "legis_type": legis_type,
-            "legis_num": int(legis_num),
-            "scrape_path": path_str,
-            "lastmod": lastmod_str,
-            "bs_xml": xml_str,
-            "bs_json": json.loads(bs.model_dump_json()),
-        }
-        rows.append(row)
+def upsert_billstatus(
+    congress_scraper_path: Union[str, Path],
+    conn_str: str,
+    batch_size: int = 1000,
+    workers: int = 1,
+    chunksize: int = 16,
+    incremental: bool = False,
+    records: Optional[list[scan_mod.ScanRecord]] = None,
+    use_copy: bool = False,
+    batch_bytes: Optional[int] = pipeline_mod.DEFAULT_BATCH_BYTES,
+    max_in_flight: int = 256,
+    checkpoint_path: Optional[Union[str, Path]] = None,
+    quarantine_path: Optional[Union[str, Path]] = None,
+    resume: bool = False,
+    trusted: bool = False,
+    parse_cache_dir: Optional[Union[str, Path]] = None,
+    side_tables: bool = True,
+    stream_min_bytes: Optional[int] = None,
+):
+    """Upsert billstatus xml files into postgres
 
-        if len(rows) >= batch_size:
-            rich.print(f"upserting billstatus batch {ibatch} with {len(rows)} rows.")
-            with Session() as session:
-                upsert(session, orm_mod.BillStatus.__table__, rows)
-            rows = []
-            ibatch += 1
+    Records are streamed through the reader -> parse -> writer stages in
+    pipeline_mod, so memory stays bounded by batch_bytes and max_in_flight
+    rather than by the size of the corpus.
 
-    if len(rows) > 0:
-        rich.print(f"upserting billstatus batch {ibatch} with {len(rows)} rows.")
-        with Session() as session:
-            upsert(session, orm_mod.BillStatus.__table__, rows)
+    With workers > 1 the xml files are read and parsed in a process pool.
+    Results come back in scan order and are written in batches by a writer
+    thread, so the rows are the same as with the serial path.
 
+    With incremental = True the existing (legis_id, lastmod) pairs are read
+    from postgres once and only files that are new or have a different
+    lastmod on disk are read, parsed and upserted.
 
-def upsert_textversions_xml(
-    congress_scraper_path: Union[str, Path], conn_str: str, batch_size: int = 1000
-):
-    """Upsert textversions xml files into postgres
+    After each committed batch a checkpoint with the offset into records is
+    written to checkpoint_path. With resume = True a run continues after the
+    last committed batch of the checkpointed run (use the same manifest).
+    Files that fail to parse are appended to quarantine_path and skipped.
+
+    With trusted = True bs_json is built without pydantic validation and
+    without the model_dump_json / json.loads round trip. The json and the
+    content hash are the same as in the default strict mode for files that
+    validate, so use strict mode to check new scrapes for schema drift.
+
+    With side_tables = True the sponsors, cosponsors, actions, subjects,
+    committees, related bills and amendments of new and changed bills are
+    also written to the normalized tables of billstatus_tables_mod, in the
+    same transaction as their billstatus rows.
 
     Args:
         congress_scraper_path: should have "cache" and "data" as subdirectories
         conn_str: postgres connection string
         batch_size: number of billstatus files to upsert at once
+        workers: number of parser processes (1 means parse on the main thread)
+        chunksize: number of files sent to a worker process at a time
+        incremental: only upsert files that are new or changed
+        records: output of scan_mod.load_or_scan (the tree is scanned if None)
+        use_copy: load batches with COPY and a staging table merge
+        batch_bytes: also flush a batch once its xml and json payload reaches
+            this many bytes (None for row count only)
+        max_in_flight: maximum number of files submitted to the parser and
+            not yet added to a batch (a count of files, not bytes)
+        checkpoint_path: json checkpoint file (None for no checkpoints)
+        quarantine_path: json lines file for files that failed to parse
+        resume: continue the run recorded in checkpoint_path
+        trusted: skip pydantic validation of the parsed billstatus
+        parse_cache_dir: read unchanged files from this parsed billstatus
+            cache instead of parsing them (see parse_cache_mod, default
+            $CONGRESS_PREP_PARSE_CACHE)
+        side_tables: keep the normalized billstatus side tables in sync
+        stream_min_bytes: parse files of at least this size (e.g. the
+            largest appropriations bills) with the streaming parser, which
+            roughly halves their peak memory but is slower (None for never)
     """
 
-    data_path = Path(congress_scraper_path) / "data"
+    if records is None:
+        records = scan_mod.scan(congress_scraper_path)
+    checkpoint = checkpoint_mod.start_run(
+        checkpoint_path,
+        "billstatus",
+        len(records),
+        resume=resume,
+        quarantine_path=quarantine_path,
+    )
+    items = (
+        (idx, record)
+        for idx, record in checkpoint_mod.skip_committed(records, checkpoint.offset)
+        if record.kind == scan_mod.BILLSTATUS
+    )
     Session = get_session(conn_str)
+    upsert_fn = pg_copy_mod.copy_upsert if use_copy else upsert
+    get_row = partial(
+        checkpoint_mod.call_quarantined,
+        partial(
+            get_billstatus_row,
+            congress_scraper_path=congress_scraper_path,
+            trusted=trusted,
+            parse_cache_dir=parse_cache_dir,
+            stream_min_bytes=stream_min_bytes,
+        ),
+    )
 
-    rows = []
-    ibatch = 0
-    for path_object in data_path.rglob("*.xml"):
-        path_str = str(path_object.relative_to(congress_scraper_path))
+    skipped = Counter()
+    if incremental:
+        lastmods = get_lastmods(conn_str, orm_mod.BillStatus.__table__, "legis_id")
+        rich.print(f"loaded {len(lastmods)} billstatus lastmods")
+        items = filter_new_or_changed(
+            items, congress_scraper_path, "legis_id", lastmods, skipped
+        )
 
-        if "/uslm/" in path_str:
-            xml_type = "uslm"
-        else:
-            xml_type = "dtd"
+    ibatch = checkpoint.nbatches
+    nfiles = 0
+    totals = Counter()
+    t0 = time.perf_counter()
 
-        if match := re.match(utils.BILLS_PATTERN, path_object.name):
-            legis_class = "bills"
-            congress_num, legis_type, legis_num, legis_version = match.groups()
+    def write(batch: list[tuple[int, tuple[dict, int]]]):
+        nonlocal ibatch, nfiles
+        rows = [row for _, (row, _) in batch]
+        nbytes = sum(row_nbytes for _, (_, row_nbytes) in batch)
+        rich.print(f"upserting billstatus batch {ibatch} with {len(rows)} rows.")
+        with instrument_mod.step("db_write", items=len(rows), nbytes=nbytes):
+            with Session() as session:
+                if side_tables:
+                    # before the upsert, which commits both and updates the hashes
+                    side_counts = billstatus_tables_mod.sync(session, rows, use_copy=use_copy)
+                counts = upsert_fn(session, orm_mod.BillStatus.__table__, rows)
+        checkpoint_mod.commit_batch(checkpoint, checkpoint_path, batch[-1][0] + 1, counts)
+        rich.print(f"billstatus batch {ibatch}: {format_counts(counts)}")
+        if side_tables:
+            rich.print(f"billstatus batch {ibatch} side rows: {dict(side_counts)}")
+        totals.update(counts)
+        ibatch += 1
+        nfiles += len(rows)
+        st.add(len(rows), nbytes)
+        dt = time.perf_counter() - t0
+        rich.print(f"{nfiles} files in {dt:.1f}s, {nfiles / dt:.1f} files/s")
+
+    with ExitStack() as stack:
+        st = stack.enter_context(
+            instrument_mod.stage("billstatus", workers=workers, trusted=trusted)
+        )
+        executor = None
+        if workers > 1:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+        results = pipeline_mod.bounded_map(
+            get_row,
+            pipeline_mod.prefetch(items, max_queued=max_in_flight),
+            executor=executor,
+            max_in_flight=max_in_flight,
+            chunksize=chunksize,
+        )
+        rows = checkpoint_mod.drop_quarantined(results, checkpoint, quarantine_path)
+        pipeline_mod.write_batches(
+            pipeline_mod.iter_batches(rows, batch_size, batch_bytes, sized_item_nbytes),
+            write,
+        )
+    checkpoint_mod.finish_run(checkpoint, checkpoint_path)
+    parse_cache_mod.evict(parse_cache_dir)
+
+    dt = time.perf_counter() - t0
+    rich.print(
+        f"upserted {nfiles} billstatus files in {dt:.1f}s, "
+        f"{nfiles / dt:.1f} files/s with {workers=}"
+    )
+    rich.print(f"billstatus totals: {format_counts(totals)}")
+    rich.print(
+        f"quarantined {checkpoint.counts['quarantined']} billstatus files "
+        f"in run {checkpoint.run_id}"
+    )
+    if incremental:
+        rich.print(f"skipped {skipped['unchanged']} unchanged billstatus files")
 
-        elif match := re.match(utils.PLAW_PATTERN, path_object.name):
-            legis_class = "plaw"
-            legis_version = "plaw"
-            congress_num, legis_type, legis_num = match.groups()
 
+def get_root_tag(xml: str, path_str: str) -> str:
+    """Root tag of a text version document
+
+    Only the prolog and first start tag are parsed (xml_mod.sniff_root_tag).
+    BeautifulSoup is the fallback for documents whose prolog lxml rejects.
+    """
+    root_tag = xml_mod.sniff_root_tag(xml)
+    if root_tag is None:
+        print(f"couldn't sniff root tag of xml path {path_str} with lxml")
+        root_tag = "parse_failed"
+
+    if root_tag == "parse_failed":
+        soup = BeautifulSoup(xml, "xml")
+        root_tags = [el.name for el in soup.contents if el.name]
+        if len(root_tags) != 1:
+            print("root tags: ", root_tags)
         else:
-            continue
+            root_tag = root_tags[0]
+            print("parsed with soup worked", root_tag)
 
-        lastmod_path = path_object.parent / (
-            path_object.name.split(".")[0] + "-lastmod.txt"
-        )
-        lastmod_str = lastmod_path.read_text()
-        xml = path_object.read_text().strip()
-        try:
-            root = ET.fromstring(xml)
-            root_tag = root.tag
-            root_tag = root_tag.replace("{http://schemas.gpo.gov/xml/uslm}", "")
-        except:
-            print(f"couldn't parse xml path {path_str} with ET")
-            root_tag = "parse_failed"
-
-
-        if root_tag == "parse_failed":
-            soup = BeautifulSoup(xml, "xml")
-            root_tags = [el.name for el in soup.contents if el.name]
-            if len(root_tags) != 1:
-                print("root tags: ", root_tags)
-            else:
-                root_tag = root_tags[0]
-                print("parsed with soup worked", root_tag)
-
-        if root_tag not in ("bill", "resolution", "amendment-doc", "pLaw", "parse_failed"):
-            print(f"root tag not recognized: {root_tag}")
-
-        row = {
-            "tv_id": "{}-{}-{}-{}-{}".format(
-                congress_num, legis_type, legis_num, legis_version, xml_type
-            ),
-            "legis_id": "{}-{}-{}".format(congress_num, legis_type, legis_num),
-            "congress_num": int(congress_num),
-            "legis_type": legis_type,
-            "legis_num": int(legis_num),
-            "legis_version": legis_version,
-            "legis_class": legis_class,
-            "scrape_path": path_str,
-            "file_name": Path(path_str).name,
-            "lastmod": lastmod_str,
-            "xml_type": xml_type,
-            "root_tag": root_tag,
-            "tv_xml": xml,
-        }
-        rows.append(row)
+    if root_tag not in ("bill", "resolution", "amendment-doc", "pLaw", "parse_failed"):
+        print(f"root tag not recognized: {root_tag}")
 
-        if len(rows) >= batch_size:
-            rich.print(f"upserting textversions_xml batch {ibatch} with {len(rows)} rows.")
-            with Session() as session:
-                upsert(session, orm_mod.TextVersionsXml.__table__, rows)
-            rows = []
-            ibatch += 1
+    return root_tag
 
-    if len(rows) > 0:
-        rich.print(f"upserting textversions_xml batch {ibatch} with {len(rows)} rows.")
-        with Session() as session:
-            upsert(session, orm_mod.TextVersionsXml.__table__, rows)
 
+def get_textversion_rows(
+    record: scan_mod.ScanRecord,
+    congress_scraper_path: Union[str, Path],
+    write_xml: bool = True,
+    write_txt: bool = True,
+) -> tuple[Optional[dict], Optional[dict]]:
+    """Read and parse one text version file into textversions_xml/textversions rows
 
-def upsert_textversions(
-    congress_scraper_path: Union[str, Path], conn_str: str, batch_size: int = 1000
+    The file is read once and parsed once. When text is requested the lxml
+    tree built for the text extraction (get_bill_text_v5, same text as the
+    BeautifulSoup based v4) also provides the root tag.
+
+    Returns:
+        (textversions_xml row, textversions row), either can be None
+    """
+    congress_scraper_path = Path(congress_scraper_path)
+    with instrument_mod.step("read") as sp:
+        lastmod_str = (congress_scraper_path / record.lastmod_path).read_text()
+        xml = (congress_scraper_path / record.scrape_path).read_text().strip()
+        sp.nbytes = len(xml)
+
+    if write_txt:
+        with instrument_mod.step("parse", nbytes=len(xml)):
+            root = textversions_mod.parse_textversion(xml)
+            root_tag = xml_mod.get_root_tag(root)
+        with instrument_mod.step("extract") as sp:
+            tv_txt = textversions_mod.get_bill_text_v5_from_root(root)
+            sp.nbytes = len(tv_txt)
+    else:
+        with instrument_mod.step("parse", nbytes=len(xml)):
+            root_tag = get_root_tag(xml, record.scrape_path)
+
+    base = {
+        **get_textversion_path_info(record),
+        "lastmod": lastmod_str,
+        "root_tag": root_tag,
+    }
+    xml_hash = utils.get_content_hash(xml, root_tag)
+    xml_row = None
+    if write_xml:
+        xml_row = {
+            **base,
+            "tv_xml": xml,
+            "content_hash": xml_hash,
+        }
+    txt_row = None
+    if write_txt:
+        txt_row = {
+            **base,
+            "tv_txt": tv_txt,
+            "content_hash": utils.get_content_hash(tv_txt, root_tag),
+            "extractor_version": textversions_mod.EXTRACTOR_VERSION,
+            "source_hash": xml_hash,
+        }
+    return xml_row, txt_row
+
+
+def upsert_textversions_combined(
+    congress_scraper_path: Union[str, Path],
+    conn_str: str,
+    batch_size: int = 1000,
+    incremental: bool = False,
+    records: Optional[list[scan_mod.ScanRecord]] = None,
+    use_copy: bool = False,
+    write_xml: bool = True,
+    write_txt: bool = True,
+    workers: int = 1,
+    chunksize: int = 16,
+    batch_bytes: Optional[int] = pipeline_mod.DEFAULT_BATCH_BYTES,
+    max_in_flight: int = 256,
+    checkpoint_path: Optional[Union[str, Path]] = None,
+    quarantine_path: Optional[Union[str, Path]] = None,
+    resume: bool = False,
 ):
-    """Upsert textversions xml files into postgres
+    """Upsert textversions xml files into the textversions_xml and textversions tables
+
+    Each file is read and parsed once no matter how many tables are written.
+    Files are streamed through the reader -> parse -> writer stages in
+    pipeline_mod and checkpointed after each batch (see upsert_billstatus).
 
     Args:
         congress_scraper_path: should have "cache" and "data" as subdirectories
         conn_str: postgres connection string
-        batch_size: number of billstatus files to upsert at once
+        batch_size: number of textversions files to upsert at once
+        incremental: only upsert files that are new or have a changed lastmod
+            in any of the selected tables
+        records: output of scan_mod.load_or_scan (the tree is scanned if None)
+        use_copy: load batches with COPY and a staging table merge
+        write_xml: write the textversions_xml table
+        write_txt: write the textversions table
+        workers: number of parser processes (1 means parse on the main thread)
+        chunksize: number of files sent to a worker process at a time
+        batch_bytes: also flush a batch once its xml and text payload reaches
+            this many bytes (None for row count only)
+        max_in_flight: maximum number of files submitted to the parser and
+            not yet added to a batch
+        checkpoint_path: json checkpoint file (None for no checkpoints)
+        quarantine_path: json lines file for files that failed to parse
+        resume: continue the run recorded in checkpoint_path
     """
 
-    data_path = Path(congress_scraper_path) / "data"
+    congress_scraper_path = Path(congress_scraper_path)
     Session = get_session(conn_str)
+    upsert_fn = pg_copy_mod.copy_upsert if use_copy else upsert
+    if records is None:
+        records = scan_mod.scan(congress_scraper_path)
+
+    tables = []
+    if write_xml:
+        tables.append(orm_mod.TextVersionsXml.__table__)
+    if write_txt:
+        tables.append(orm_mod.TextVersionsTxt.__table__)
+    table_names = "/".join(table.name for table in tables)
+
+    checkpoint = checkpoint_mod.start_run(
+        checkpoint_path,
+        table_names,
+        len(records),
+        resume=resume,
+        quarantine_path=quarantine_path,
+    )
+    textversion_kinds = set(scan_mod.TEXTVERSION_KINDS)
+    items = (
+        (idx, record)
+        for idx, record in checkpoint_mod.skip_committed(records, checkpoint.offset)
+        if record.kind in textversion_kinds
+    )
 
-    rows = []
-    ibatch = 0
-    for path_object in data_path.rglob("*.xml"):
-        path_str = str(path_object.relative_to(congress_scraper_path))
+    skipped = Counter()
+    if incremental:
+        # keep only ids that have the same lastmod in every selected table
+        lastmods = None
+        for table in tables:
+            table_lastmods = get_lastmods(conn_str, table, "tv_id")
+            if lastmods is None:
+                lastmods = table_lastmods
+            else:
+                lastmods = {
+                    tv_id: lastmod
+                    for tv_id, lastmod in lastmods.items()
+                    if table_lastmods.get(tv_id) == lastmod
+                }
+        rich.print(f"loaded {len(lastmods)} {table_names} lastmods")
+        items = filter_new_or_changed(
+            items, congress_scraper_path, "tv_id", lastmods, skipped
+        )
 
-        if "/uslm/" in path_str:
-            xml_type = "uslm"
-        else:
-            xml_type = "dtd"
+    def has_lastmod(item: tuple[int, scan_mod.ScanRecord]) -> bool:
+        _, record = item
+        if record.lastmod_path is None:
+            rich.print("textversion oops: {}".format(record.scrape_path))
+            return False
+        return True
+
+    def pair_nbytes(item: tuple[int, tuple[Optional[dict], Optional[dict]]]) -> int:
+        return sum(pipeline_mod.row_nbytes(row) for row in item[1] if row is not None)
+
+    ibatch = checkpoint.nbatches
+    totals = {table.name: Counter() for table in tables}
+
+    def write(batch: list[tuple[int, tuple[Optional[dict], Optional[dict]]]]):
+        nonlocal ibatch
+        pairs = [pair for _, pair in batch]
+        nbytes = sum(pair_nbytes(item) for item in batch)
+        rich.print(f"upserting {table_names} batch {ibatch} with {len(pairs)} rows.")
+        batch_counts = {}
+        with instrument_mod.step("db_write", items=len(pairs), nbytes=nbytes):
+            with Session() as session:
+                if write_xml:
+                    batch_counts["textversions_xml"] = upsert_fn(
+                        session,
+                        orm_mod.TextVersionsXml.__table__,
+                        [xml_row for xml_row, _ in pairs],
+                    )
+                if write_txt:
+                    # the text can be unchanged when the xml is not, so the
+                    # provenance columns are updated along with the watermark
+                    batch_counts["textversions"] = upsert_fn(
+                        session,
+                        orm_mod.TextVersionsTxt.__table__,
+                        [txt_row for _, txt_row in pairs],
+                        watermark_cols=(
+                            *pg_copy_mod.WATERMARK_COLUMNS,
+                            "extractor_version",
+                            "source_hash",
+                        ),
+                    )
+        checkpoint_mod.commit_batch(
+            checkpoint,
+            checkpoint_path,
+            batch[-1][0] + 1,
+            {
+                f"{table_name}_{key}": value
+                for table_name, counts in batch_counts.items()
+                for key, value in counts.items()
+            },
+        )
+        for table_name, counts in batch_counts.items():
+            rich.print(f"{table_name} batch {ibatch}: {format_counts(counts)}")
+            totals[table_name].update(counts)
+        st.add(len(pairs), nbytes)
+        ibatch += 1
+
+    get_rows = partial(
+        checkpoint_mod.call_quarantined,
+        partial(
+            get_textversion_rows,
+            congress_scraper_path=congress_scraper_path,
+            write_xml=write_xml,
+            write_txt=write_txt,
+        ),
+    )
+    with ExitStack() as stack:
+        st = stack.enter_context(instrument_mod.stage(table_names, workers=workers))
+        executor = None
+        if workers > 1:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+        results = pipeline_mod.bounded_map(
+            get_rows,
+            pipeline_mod.prefetch(filter(has_lastmod, items), max_queued=max_in_flight),
+            executor=executor,
+            max_in_flight=max_in_flight,
+            chunksize=chunksize,
+        )
+        pairs = checkpoint_mod.drop_quarantined(results, checkpoint, quarantine_path)
+        pipeline_mod.write_batches(
+            pipeline_mod.iter_batches(pairs, batch_size, batch_bytes, pair_nbytes), write
+        )
+    checkpoint_mod.finish_run(checkpoint, checkpoint_path)
 
-        if match := re.match(utils.BILLS_PATTERN, path_object.name):
-            legis_class = "bills"
-            congress_num, legis_type, legis_num, legis_version = match.groups()
+    for table_name, counts in totals.items():
+        rich.print(f"{table_name} totals: {format_counts(counts)}")
+    rich.print(
+        f"quarantined {checkpoint.counts['quarantined']} {table_names} files "
+        f"in run {checkpoint.run_id}"
+    )
+    if incremental:
+        rich.print(f"skipped {skipped['unchanged']} unchanged {table_names} files")
 
-        elif match := re.match(utils.PLAW_PATTERN, path_object.name):
-            legis_class = "plaw"
-            legis_version = "plaw"
-            congress_num, legis_type, legis_num = match.groups()
 
-        else:
-            continue
+def upsert_textversions_xml(
+    congress_scraper_path: Union[str, Path],
+    conn_str: str,
+    batch_size: int = 1000,
+    incremental: bool = False,
+    records: Optional[list[scan_mod.ScanRecord]] = None,
+    use_copy: bool = False,
+    checkpoint_path: Optional[Union[str, Path]] = None,
+    quarantine_path: Optional[Union[str, Path]] = None,
+    resume: bool = False,
+):
+    """Upsert textversions xml files into the textversions_xml table
+
+    See upsert_textversions_combined for arguments.
+    """
+    upsert_textversions_combined(
+        congress_scraper_path,
+        conn_str,
+        batch_size=batch_size,
+        incremental=incremental,
+        records=records,
+        use_copy=use_copy,
+        write_xml=True,
+        write_txt=False,
+        checkpoint_path=checkpoint_path,
+        quarantine_path=quarantine_path,
+        resume=resume,
+    )
+
+
+def upsert_textversions(
+    congress_scraper_path: Union[str, Path],
+    conn_str: str,
+    batch_size: int = 1000,
+    incremental: bool = False,
+    records: Optional[list[scan_mod.ScanRecord]] = None,
+    use_copy: bool = False,
+    checkpoint_path: Optional[Union[str, Path]] = None,
+    quarantine_path: Optional[Union[str, Path]] = None,
+    resume: bool = False,
+):
+    """Upsert textversions xml files into the textversions (text) table
 
-        lastmod_path = path_object.parent / (
-            path_object.name.split(".")[0] + "-lastmod.txt"
+    See upsert_textversions_combined for arguments.
+    """
+    upsert_textversions_combined(
+        congress_scraper_path,
+        conn_str,
+        batch_size=batch_size,
+        incremental=incremental,
+        records=records,
+        use_copy=use_copy,
+        write_xml=False,
+        write_txt=True,
+        checkpoint_path=checkpoint_path,
+        quarantine_path=quarantine_path,
+        resume=resume,
+    )
+
+
+def get_pending_query(
+    extractor_version: str, force: bool = False
+) -> sqlalchemy.Select:
+    """Select the textversions_xml rows that need their text extracted
+
+    Those are rows without a textversions row or whose textversions row has
+    another extractor_version or a source_hash that is not their content_hash
+    (every row if force).
+    """
+    xml_table = orm_mod.TextVersionsXml.__table__
+    txt_table = orm_mod.TextVersionsTxt.__table__
+    query = (
+        select(*xml_table.c)
+        .select_from(xml_table.outerjoin(txt_table, xml_table.c.tv_id == txt_table.c.tv_id))
+        .order_by(xml_table.c.tv_id)
+    )
+    if not force:
+        query = query.where(
+            sqlalchemy.or_(
+                txt_table.c.tv_id.is_(None),
+                txt_table.c.extractor_version.is_distinct_from(extractor_version),
+                txt_table.c.source_hash.is_distinct_from(xml_table.c.content_hash),
+            )
         )
-        lastmod_str = lastmod_path.read_text()
-        xml = path_object.read_text().strip()
-        try:
-            root = ET.fromstring(xml)
-            root_tag = root.tag
-            root_tag = root_tag.replace("{http://schemas.gpo.gov/xml/uslm}", "")
-        except:
-            print(f"couldn't parse xml path {path_str} with ET")
-            root_tag = "parse_failed"
-
-
-        if root_tag == "parse_failed":
-            soup = BeautifulSoup(xml, "xml")
-            root_tags = [el.name for el in soup.contents if el.name]
-            if len(root_tags) != 1:
-                print("root tags: ", root_tags)
-            else:
-                root_tag = root_tags[0]
-                print("parsed with soup worked", root_tag)
-
-        if root_tag not in ("bill", "resolution", "amendment-doc", "pLaw", "parse_failed"):
-            print(f"root tag not recognized: {root_tag}")
-
-        row = {
-            "tv_id": "{}-{}-{}-{}-{}".format(
-                congress_num, legis_type, legis_num, legis_version, xml_type
-            ),
-            "legis_id": "{}-{}-{}".format(congress_num, legis_type, legis_num),
-            "congress_num": int(congress_num),
-            "legis_type": legis_type,
-            "legis_num": int(legis_num),
-            "legis_version": legis_version,
-            "legis_class": legis_class,
-            "scrape_path": path_str,
-            "file_name": Path(path_str).name,
-            "lastmod": lastmod_str,
-            "xml_type": xml_type,
-            "root_tag": root_tag,
-            "tv_xml": xml,
-            "tv_txt": get_bill_text_v4(xml),
-        }
-        rows.append(row)
+    return query
+
+
+def iter_pending_xml_rows(
+    conn_str: str, query: sqlalchemy.Select, fetch_size: int = 100
+) -> Iterator[dict]:
+    """Stream the rows of query without loading them all
+
+    On postgres this is one server side cursor (stream_results) that fetches
+    fetch_size rows at a time. Other databases (sqlite in the benchmarks)
+    cannot write while a read is open, so there the rows are read in
+    tv_id pages of fetch_size, each in its own short transaction.
+    """
+    engine = create_engine(conn_str)
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            result = conn.execution_options(yield_per=fetch_size).execute(query)
+            for row in result:
+                yield row._asdict()
+        return
+
+    tv_id_col = orm_mod.TextVersionsXml.__table__.c.tv_id
+    last_id = None
+    while True:
+        page = query if last_id is None else query.where(tv_id_col > last_id)
+        with engine.connect() as conn:
+            rows = [row._asdict() for row in conn.execute(page.limit(fetch_size))]
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1]["tv_id"]
+
+
+def get_extracted_row(
+    xml_row: dict, extractor_version: str
+) -> tuple[str, Optional[dict], Optional[str]]:
+    """Extract the textversions row of a textversions_xml row
+
+    This is a module level function so that it can be sent to worker processes.
+
+    Returns:
+        (tv_id, textversions row or None, formatted error or None)
+    """
+    try:
+        get_text = textversions_mod.TEXT_EXTRACTORS[extractor_version]
+        with instrument_mod.step("extract", nbytes=len(xml_row["tv_xml"])) as sp:
+            tv_txt = get_text(xml_row["tv_xml"])
+            sp.nbytes = len(tv_txt)
+    except Exception:
+        return xml_row["tv_id"], None, traceback.format_exc(limit=-3)
+    row = {
+        col: value for col, value in xml_row.items() if col not in ("tv_xml", "content_hash")
+    }
+    return (
+        xml_row["tv_id"],
+        {
+            **row,
+            "tv_txt": tv_txt,
+            "content_hash": utils.get_content_hash(tv_txt, row["root_tag"]),
+            "extractor_version": extractor_version,
+            "source_hash": xml_row["content_hash"],
+        },
+        None,
+    )
 
-        if len(rows) >= batch_size:
-            rich.print(f"upserting textversions batch {ibatch} with {len(rows)} rows.")
+
+def extract_textversions(
+    conn_str: str,
+    extractor_version: str = textversions_mod.EXTRACTOR_VERSION,
+    force: bool = False,
+    batch_size: int = 1000,
+    workers: int = 1,
+    chunksize: int = 16,
+    fetch_size: int = 100,
+    batch_bytes: Optional[int] = pipeline_mod.DEFAULT_BATCH_BYTES,
+    max_in_flight: int = 256,
+    use_copy: bool = False,
+):
+    """Extract textversions.tv_txt from the tv_xml already in textversions_xml
+
+    Unlike upsert_textversions this does not read the scraper tree, so a new
+    extractor version can be tried on the loaded xml. Only rows whose text
+    is missing, was made by another extractor version or from xml with a
+    different content_hash (source_hash) are extracted, so a re-run with the
+    same version touches nothing and an interrupted run just continues.
+
+    The xml rows are streamed from a server side cursor (see
+    iter_pending_xml_rows), extracted in a process pool and upserted in
+    batches by the writer thread of pipeline_mod. Rows that fail to extract
+    are reported and left as they are.
+
+    Args:
+        conn_str: postgres connection string
+        extractor_version: key of textversions_mod.TEXT_EXTRACTORS
+        force: extract every row
+        batch_size: number of textversions rows to upsert at once
+        workers: number of extractor processes (1 means extract on the main thread)
+        chunksize: number of rows sent to a worker process at a time
+        fetch_size: number of xml rows fetched from the cursor at a time
+        batch_bytes: also flush a batch once its text payload reaches this
+            many bytes (None for row count only)
+        max_in_flight: maximum number of rows submitted to the extractor and
+            not yet added to a batch
+        use_copy: load batches with COPY and a staging table merge
+    """
+    if extractor_version not in textversions_mod.TEXT_EXTRACTORS:
+        raise ValueError(f"unknown extractor version {extractor_version}")
+    create_tables(conn_str)
+    Session = get_session(conn_str)
+    upsert_fn = pg_copy_mod.copy_upsert if use_copy else upsert
+    table = orm_mod.TextVersionsTxt.__table__
+    rows = iter_pending_xml_rows(
+        conn_str, get_pending_query(extractor_version, force=force), fetch_size=fetch_size
+    )
+
+    ibatch = 0
+    totals = Counter()
+    failed = Counter()
+
+    def write(batch: list[dict]):
+        nonlocal ibatch
+        nbytes = sum(pipeline_mod.row_nbytes(row) for row in batch)
+        with instrument_mod.step("db_write", items=len(batch), nbytes=nbytes):
             with Session() as session:
-                upsert(session, orm_mod.TextVersions.__table__, rows)
-            rows = []
-            ibatch += 1
+                # the text can be unchanged while the version or source is not
+                counts = upsert_fn(session, table, batch, hash_col=None)
+        rich.print(f"textversions extract batch {ibatch}: {format_counts(counts)}")
+        totals.update(counts)
+        st.add(len(batch), nbytes)
+        ibatch += 1
+
+    def drop_failed(results: Iterable[tuple[str, Optional[dict], Optional[str]]]):
+        for tv_id, row, error in results:
+            if error is not None:
+                last_line = error.strip().splitlines()[-1]
+                rich.print(f"failed to extract {tv_id}: {last_line}")
+                failed["failed"] += 1
+                continue
+            yield row
+
+    with ExitStack() as stack:
+        st = stack.enter_context(
+            instrument_mod.stage(
+                "textversions_extract", workers=workers, extractor_version=extractor_version
+            )
+        )
+        executor = None
+        if workers > 1:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+        results = pipeline_mod.bounded_map(
+            partial(get_extracted_row, extractor_version=extractor_version),
+            pipeline_mod.prefetch(rows, max_queued=max_in_flight),
+            executor=executor,
+            max_in_flight=max_in_flight,
+            chunksize=chunksize,
+        )
+        pipeline_mod.write_batches(
+            pipeline_mod.iter_batches(drop_failed(results), batch_size, batch_bytes), write
+        )
 
-    if len(rows) > 0:
-        rich.print(f"upserting textversions batch {ibatch} with {len(rows)} rows.")
-        with Session() as session:
-            upsert(session, orm_mod.TextVersions.__table__, rows)
+    rich.print(f"textversions extract totals ({extractor_version}): {format_counts(totals)}")
+    rich.print(f"failed to extract {failed['failed']} textversions")
 
 
 def create_unified_xml(conn_str: str):
@@ -394,9 +1067,10 @@ def create_unified_xml(conn_str: str):
     """
 
     engine = create_engine(conn_str, echo=True)
-    with engine.connect() as conn:
-        with conn.begin():
-            result = conn.execute(text(sql))
+    with instrument_mod.stage("unified_xml"):
+        with engine.connect() as conn:
+            with conn.begin():
+                result = conn.execute(text(sql))
 
 
 def create_unified(conn_str: str):
@@ -482,19 +1156,118 @@ def create_unified(conn_str: str):
     """
 
     engine = create_engine(conn_str, echo=True)
-    with engine.connect() as conn:
-        with conn.begin():
-            result = conn.execute(text(sql))
+    with instrument_mod.stage("unified"):
+        with engine.connect() as conn:
+            with conn.begin():
+                result = conn.execute(text(sql))
 
 
 if __name__ == "__main__":
 
-    conn_str = "postgresql+psycopg2://galtay@localhost:5432/galtay"
-    congress_scraper_path = Path("/Users/galtay/data/congress-scraper")
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--conn-str", default="postgresql+psycopg2://galtay@localhost:5432/galtay"
+    )
+    parser.add_argument(
+        "--congress-scraper-path",
+        type=Path,
+        default=Path("/Users/galtay/data/congress-scraper"),
+    )
+    parser.add_argument(
+        "--run-log",
+        type=Path,
+        default=None,
+        help="json lines file for stage timings (default congress_scraper_path/run_log.jsonl)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue the last run from its checkpoints instead of starting over",
+    )
+    parser.add_argument(
+        "--trusted",
+        action="store_true",
+        help="build billstatus json without pydantic validation (faster, no schema drift checks)",
+    )
+    parser.add_argument(
+        "--parse-cache",
+        type=Path,
+        default=None,
+        help="parsed billstatus cache directory (default $CONGRESS_PREP_PARSE_CACHE, none if unset)",
+    )
+    parser.add_argument(
+        "--stream-min-mb",
+        type=float,
+        default=None,
+        help="parse billstatus files of at least this many MB with the streaming parser "
+        "(less memory, slower; default never)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="keep the tables and only upsert files that are new or have a changed lastmod",
+    )
+    parser.add_argument(
+        "--extract-only",
+        action="store_true",
+        help="only (re)extract textversions text from the loaded textversions_xml table",
+    )
+    parser.add_argument(
+        "--extractor-version",
+        default=textversions_mod.EXTRACTOR_VERSION,
+        choices=sorted(textversions_mod.TEXT_EXTRACTORS),
+    )
+    args = parser.parse_args()
+
+    conn_str = args.conn_str
+    congress_scraper_path = args.congress_scraper_path
+    manifest_path = congress_scraper_path / "manifest.jsonl"
+    checkpoint_dir = congress_scraper_path / "checkpoints"
+    quarantine_path = checkpoint_dir / "quarantine.jsonl"
+    instrument_mod.start_run(
+        "01_populate_postgres", args.run_log or congress_scraper_path / "run_log.jsonl"
+    )
 
-    reset_tables(conn_str)
-    upsert_billstatus(congress_scraper_path, conn_str)
-    upsert_textversions_xml(congress_scraper_path, conn_str)
+    if args.extract_only:
+        extract_textversions(
+            conn_str, extractor_version=args.extractor_version, workers=os.cpu_count()
+        )
+        sys.exit(0)
+
+    if args.resume:
+        # offsets in the checkpoints refer to this exact manifest
+        records = scan_mod.read_manifest(manifest_path)
+    else:
+        if args.incremental:
+            create_tables(conn_str)
+        else:
+            reset_tables(conn_str)
+        with instrument_mod.stage("scan") as st:
+            records = scan_mod.load_or_scan(congress_scraper_path, manifest_path, rescan=True)
+            st.items = len(records)
+    upsert_billstatus(
+        congress_scraper_path,
+        conn_str,
+        workers=os.cpu_count(),
+        records=records,
+        incremental=args.incremental,
+        checkpoint_path=checkpoint_dir / "billstatus.json",
+        quarantine_path=quarantine_path,
+        resume=args.resume,
+        trusted=args.trusted,
+        parse_cache_dir=args.parse_cache,
+        stream_min_bytes=None if args.stream_min_mb is None else int(args.stream_min_mb * 2**20),
+    )
+    upsert_textversions_combined(
+        congress_scraper_path,
+        conn_str,
+        workers=os.cpu_count(),
+        records=records,
+        incremental=args.incremental,
+        checkpoint_path=checkpoint_dir / "textversions.json",
+        quarantine_path=quarantine_path,
+        resume=args.resume,
+    )
     create_unified_xml(conn_str)
 
 #    engine = create_engine(conn_str, echo=True)
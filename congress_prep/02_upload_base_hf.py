@@ -12,7 +12,10 @@ import pandas as pd
 import rich
 from sqlalchemy import create_engine
 
+from congress_prep import instrument_mod
 
+
+@instrument_mod.staged()
 def upload_billstatus(congress_hf_path: Union[str, Path], conn_str: str):
 
     rich.print(f"{congress_hf_path=}")
@@ -27,10 +30,12 @@ def upload_billstatus(congress_hf_path: Union[str, Path], conn_str: str):
     data_folder = upload_folder / "data"
     data_folder.mkdir(exist_ok=True, parents=True)
 
-    df = pd.read_sql(
-        f"select * from billstatus order by congress_num, legis_type, legis_num",
-        con=engine,
-    )
+    with instrument_mod.step("read") as sp:
+        df = pd.read_sql(
+            f"select * from billstatus order by congress_num, legis_type, legis_num",
+            con=engine,
+        )
+        sp.items = len(df)
     df["lastmod"] = df["lastmod"].astype(str)
     table = pa.Table.from_pandas(df)
 
@@ -38,7 +43,9 @@ def upload_billstatus(congress_hf_path: Union[str, Path], conn_str: str):
         tf = table.filter((df["congress_num"] == cn).values)
         out_path = data_folder / f"usc-{cn}-{ds_tag}.parquet"
         rich.print(f"{out_path=}")
-        pq.write_table(tf, out_path)
+        with instrument_mod.step("serialize", items=tf.num_rows):
+            pq.write_table(tf, out_path)
+        instrument_mod.add_counts(tf.num_rows, out_path.stat().st_size)
 
     api = HfApi()
     api.create_repo(
@@ -48,13 +55,15 @@ def upload_billstatus(congress_hf_path: Union[str, Path], conn_str: str):
     )
 
     rich.print(f"{upload_folder=}")
-    api.upload_folder(
-        folder_path=upload_folder,
-        repo_id=repo_id,
-        repo_type="dataset",
-    )
+    with instrument_mod.step("upload"):
+        api.upload_folder(
+            folder_path=upload_folder,
+            repo_id=repo_id,
+            repo_type="dataset",
+        )
 
 
+@instrument_mod.staged()
 def upload_textversions(congress_hf_path: Union[str, Path], conn_str: str):
 
     rich.print(f"{congress_hf_path=}")
@@ -69,13 +78,15 @@ def upload_textversions(congress_hf_path: Union[str, Path], conn_str: str):
     data_folder = upload_folder / "data"
     data_folder.mkdir(exist_ok=True, parents=True)
 
-    df = pd.read_sql(
-        f"""select * from textversions
-        where xml_type = 'dtd'
-        order by congress_num, legis_type, legis_num, legis_version
-        """,
-        con=engine,
-    )
+    with instrument_mod.step("read") as sp:
+        df = pd.read_sql(
+            f"""select * from textversions
+            where xml_type = 'dtd'
+            order by congress_num, legis_type, legis_num, legis_version
+            """,
+            con=engine,
+        )
+        sp.items = len(df)
     df["lastmod"] = df["lastmod"].astype(str)
     table = pa.Table.from_pandas(df)
 
@@ -83,7 +94,9 @@ def upload_textversions(congress_hf_path: Union[str, Path], conn_str: str):
         tf = table.filter((df["congress_num"] == cn).values)
         out_path = data_folder / f"usc-{cn}-{ds_tag}.parquet"
         rich.print(f"{out_path=}")
-        pq.write_table(tf, out_path)
+        with instrument_mod.step("serialize", items=tf.num_rows):
+            pq.write_table(tf, out_path)
+        instrument_mod.add_counts(tf.num_rows, out_path.stat().st_size)
 
     api = HfApi()
     api.create_repo(
@@ -93,13 +106,15 @@ def upload_textversions(congress_hf_path: Union[str, Path], conn_str: str):
     )
 
     rich.print(f"{upload_folder=}")
-    api.upload_folder(
-        folder_path=upload_folder,
-        repo_id=repo_id,
-        repo_type="dataset",
-    )
+    with instrument_mod.step("upload"):
+        api.upload_folder(
+            folder_path=upload_folder,
+            repo_id=repo_id,
+            repo_type="dataset",
+        )
 
 
+@instrument_mod.staged()
 def upload_unified(congress_hf_path: Union[str, Path], conn_str: str):
 
     rich.print(f"{congress_hf_path=}")
@@ -114,10 +129,12 @@ def upload_unified(congress_hf_path: Union[str, Path], conn_str: str):
     data_folder = upload_folder / "data"
     data_folder.mkdir(exist_ok=True, parents=True)
 
-    df = pd.read_sql(
-        f"select * from unified order by congress_num, legis_type, legis_num",
-        con=engine,
-    )
+    with instrument_mod.step("read") as sp:
+        df = pd.read_sql(
+            f"select * from unified order by congress_num, legis_type, legis_num",
+            con=engine,
+        )
+        sp.items = len(df)
     df["lastmod"] = df["lastmod"].astype(str)
     table = pa.Table.from_pandas(df)
 
@@ -125,7 +142,9 @@ def upload_unified(congress_hf_path: Union[str, Path], conn_str: str):
         tf = table.filter((df["congress_num"] == cn).values)
         out_path = data_folder / f"usc-{cn}-{ds_tag}.parquet"
         rich.print(f"{out_path=}")
-        pq.write_table(tf, out_path)
+        with instrument_mod.step("serialize", items=tf.num_rows):
+            pq.write_table(tf, out_path)
+        instrument_mod.add_counts(tf.num_rows, out_path.stat().st_size)
 
     api = HfApi()
     api.create_repo(
@@ -135,17 +154,19 @@ def upload_unified(congress_hf_path: Union[str, Path], conn_str: str):
     )
 
     rich.print(f"{upload_folder=}")
-    api.upload_folder(
-        folder_path=upload_folder,
-        repo_id=repo_id,
-        repo_type="dataset",
-    )
+    with instrument_mod.step("upload"):
+        api.upload_folder(
+            folder_path=upload_folder,
+            repo_id=repo_id,
+            repo_type="dataset",
+        )
 
 
 if __name__ == "__main__":
 
     congress_hf_path = Path("/Users/galtay/data/congress-hf")
     conn_str = "postgresql+psycopg2://galtay@localhost:5432/galtay"
+    instrument_mod.start_run("02_upload_base_hf", congress_hf_path / "run_log.jsonl")
 
     upload_billstatus(congress_hf_path, conn_str)
     upload_textversions(congress_hf_path, conn_str)
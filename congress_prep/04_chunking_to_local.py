@@ -10,6 +10,7 @@ from huggingface_hub import HfApi
 import rich
 import pandas as pd
 
+from congress_prep import instrument_mod
 from congress_prep import utils
 
 
@@ -55,6 +56,7 @@ def add_chunk_index(split_docs: list[Document]) -> list[Document]:
     return split_docs
 
 
+@instrument_mod.staged("chunking", labels=("congress_num", "chunk_size", "chunk_overlap"))
 def write_local(
     congress_hf_path: Union[str, Path],
     congress_num: int,
@@ -73,7 +75,9 @@ def write_local(
         congress_hf_path / "usc-unified" / "data" / f"usc-{congress_num}-unified.parquet"
     )
     rich.print(u_fpath)
-    df_u = pd.read_parquet(u_fpath)
+    with instrument_mod.step("read", nbytes=u_fpath.stat().st_size) as sp:
+        df_u = pd.read_parquet(u_fpath)
+        sp.items = len(df_u)
 
     text_splitter = RecursiveCharacterTextSplitter(
         separators=["\n\n", ";", "\n", " ", ""],
@@ -85,7 +89,8 @@ def write_local(
     )
 
     docs = get_langchain_docs_from_unified(df_u)
-    split_docs = text_splitter.split_documents(docs)
+    with instrument_mod.step("split", items=len(docs)):
+        split_docs = text_splitter.split_documents(docs)
     split_docs = add_chunk_index(split_docs)
 
     df_c = pd.DataFrame.from_records(
@@ -112,9 +117,12 @@ def write_local(
     fout = out_path / f"{file_tag}.parquet"
     rich.print(f"{fout=}")
     print()
-    df_c.to_parquet(fout)
+    with instrument_mod.step("serialize", items=len(df_c)):
+        df_c.to_parquet(fout)
+    instrument_mod.add_counts(len(df_c), int(df_c["text"].str.len().sum()))
 
 
+@instrument_mod.staged()
 def upload_dataset(congress_hf_path, chunk_size, chunk_overlap):
     chunk_tag = f"chunks-s{chunk_size}-o{chunk_overlap}"
     ds_name = f"usc-{chunk_tag}"
@@ -131,17 +139,19 @@ def upload_dataset(congress_hf_path, chunk_size, chunk_overlap):
     )
 
     rich.print(f"{upload_folder=}")
-    api.upload_folder(
-        folder_path=upload_folder,
-        repo_id=repo_id,
-        repo_type="dataset",
-    )
+    with instrument_mod.step("upload"):
+        api.upload_folder(
+            folder_path=upload_folder,
+            repo_id=repo_id,
+            repo_type="dataset",
+        )
 
 
 
 if __name__ == "__main__":
 
     congress_hf_path = Path("/Users/galtay/data/congress-hf")
+    instrument_mod.start_run("04_chunking_to_local", congress_hf_path / "run_log.jsonl")
     chunks = [(8192, 512), (4096, 512), (2048, 256), (1024, 256)]
     for chunk_size, chunk_overlap in chunks:
         congress_nums = [113, 114, 115, 116, 117, 118]
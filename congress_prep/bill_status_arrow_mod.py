@@ -0,0 +1,377 @@
+"""
+Billstatus xml straight to Arrow record batches and parquet.
+
+The HF billstatus export goes xml -> BillStatus -> json in postgres ->
+pd.read_sql -> object column of dicts -> pa.Table.from_pandas, which infers
+the struct types again from the dicts of every row. Here the Arrow schema is
+derived once from the models in bill_status_mod,
+
+  str -> string, int -> int64, bool -> bool, date -> date32,
+  datetime -> timestamp[us, UTC], list[X] -> list<X>, Model -> struct<...>
+
+and the fields of each bill are appended column by column into flat python
+lists (one per leaf field, plus offsets and validity for lists and structs).
+The lists become Arrow arrays once per batch, and bool, date and datetime
+columns are parsed by a vectorized Arrow cast of the xml strings. No
+pydantic model, json string or row dict for Arrow to infer types from is
+built; the field dict of bill_status_lxml_mod.get_bill_status_dict is
+appended and dropped right away.
+
+Like model_json_mod nothing is validated: a required field that is missing
+is null. Use BillStatus.from_xml_str to check files for schema drift.
+
+python -m congress_prep.bill_status_arrow_mod \
+    --congress-scraper-path /data/congress-scraper --out-path /data/congress-hf/usc-billstatus/data
+"""
+
+import argparse
+import datetime
+from itertools import groupby
+import inspect
+from pathlib import Path
+import types
+from typing import Any, Callable, Iterable, Iterator, Optional, Union, get_args, get_origin
+
+from lxml import etree
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pydantic import BaseModel
+import rich
+
+from congress_prep import bill_status_lxml_mod
+from congress_prep import instrument_mod
+from congress_prep import model_json_mod
+from congress_prep import scan_mod
+from congress_prep import utils
+from congress_prep import xml_mod
+from congress_prep.bill_status_mod import BillStatus
+
+
+SCALAR_TYPES = {
+    str: pa.string(),
+    int: pa.int64(),
+    bool: pa.bool_(),
+    datetime.date: pa.date32(),
+    # billstatus datetimes are UTC ("2024-01-11T13:48:15Z")
+    datetime.datetime: pa.timestamp("us", tz="UTC"),
+}
+
+# columns that come from the scan record (same as the billstatus table)
+RECORD_FIELDS = [
+    pa.field("legis_id", pa.string()),
+    pa.field("congress_num", pa.int64()),
+    pa.field("legis_type", pa.string()),
+    pa.field("legis_num", pa.int64()),
+    pa.field("scrape_path", pa.string()),
+    pa.field("lastmod", pa.string()),
+]
+
+# append(value) and finish() -> pa.Array
+Column = tuple[Callable[[Any], None], Callable[[], pa.Array]]
+
+
+def unwrap_optional(tp: Any) -> Any:
+    origin = get_origin(tp)
+    if origin is Union or origin is types.UnionType:
+        args = [arg for arg in get_args(tp) if arg is not type(None)]
+        if len(args) != 1:
+            raise TypeError(f"no arrow type for {tp}")
+        return args[0]
+    return tp
+
+
+def is_model(tp: Any) -> bool:
+    return inspect.isclass(tp) and issubclass(tp, BaseModel)
+
+
+def get_model_fields(model: type[BaseModel]) -> list[tuple[str, Any, Any]]:
+    """(name, annotation, default) for each field (default None for required fields)"""
+    return [
+        (
+            name,
+            info.annotation,
+            None if info.is_required() else info.get_default(call_default_factory=True),
+        )
+        for name, info in model.model_fields.items()
+    ]
+
+
+def get_arrow_type(tp: Any) -> pa.DataType:
+    """Arrow type of a model field annotation"""
+    tp = unwrap_optional(tp)
+    if get_origin(tp) is list:
+        return pa.list_(get_arrow_type(get_args(tp)[0]))
+    if is_model(tp):
+        return pa.struct(get_arrow_fields(tp))
+    if tp in SCALAR_TYPES:
+        return SCALAR_TYPES[tp]
+    raise TypeError(f"no arrow type for {tp}")
+
+
+def get_arrow_fields(model: type[BaseModel]) -> list[pa.Field]:
+    return [pa.field(name, get_arrow_type(tp)) for name, tp, _ in get_model_fields(model)]
+
+
+def get_schema(include_xml: bool = False) -> pa.Schema:
+    """Schema of the record batches: scan record columns, then the BillStatus fields"""
+    fields = list(RECORD_FIELDS)
+    if include_xml:
+        fields.append(pa.field("bs_xml", pa.string()))
+    return pa.schema(fields + get_arrow_fields(BillStatus))
+
+
+def cast_strings(values: list[Optional[str]], tp: type, arrow_type: pa.DataType) -> pa.Array:
+    """Parse xml strings into a bool, date or timestamp array
+
+    The vectorized cast handles the formats in billstatus files. Anything
+    else (e.g. a datetime without a zone) is converted one by one with
+    pydantic, and datetimes without a zone are taken to be UTC.
+    """
+    try:
+        return pa.array(values, pa.string()).cast(arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        adapter = model_json_mod.get_adapter(tp)
+        return pa.array(
+            [None if value is None else adapter.validate_python(value) for value in values],
+            arrow_type,
+        )
+
+
+def new_scalar_column(tp: type) -> Column:
+    values = []
+    arrow_type = SCALAR_TYPES[tp]
+    if tp is str:
+        return values.append, lambda: pa.array(values, arrow_type)
+    if tp is int:
+        return values.append, lambda: pa.array(
+            [None if value is None else int(value) for value in values], arrow_type
+        )
+    return values.append, lambda: cast_strings(values, tp, arrow_type)
+
+
+def new_list_column(item_tp: Any) -> Column:
+    offsets = [0]
+    nulls = []
+    append_item, finish_items = new_column(item_tp)
+
+    def append(value):
+        if value is None:
+            nulls.append(True)
+            offsets.append(offsets[-1])
+            return
+        nulls.append(False)
+        for item in value:
+            append_item(item)
+        offsets.append(offsets[-1] + len(value))
+
+    def finish():
+        return pa.ListArray.from_arrays(
+            pa.array(offsets, pa.int32()),
+            finish_items(),
+            mask=pa.array(nulls, pa.bool_()) if any(nulls) else None,
+        )
+
+    return append, finish
+
+
+def new_struct_column(model: type[BaseModel]) -> Column:
+    nulls = []
+    fields = get_arrow_fields(model)
+    appenders = []
+    finishers = []
+    for name, tp, default in get_model_fields(model):
+        append_field, finish_field = new_column(tp)
+        appenders.append((name, default, append_field))
+        finishers.append(finish_field)
+
+    def append(value):
+        if value is None:
+            nulls.append(True)
+            for _, _, append_field in appenders:
+                append_field(None)
+            return
+        nulls.append(False)
+        for name, default, append_field in appenders:
+            append_field(value.get(name, default))
+
+    def finish():
+        return pa.StructArray.from_arrays(
+            [finish_field() for finish_field in finishers],
+            fields=fields,
+            mask=pa.array(nulls, pa.bool_()) if any(nulls) else None,
+        )
+
+    return append, finish
+
+
+def new_column(tp: Any) -> Column:
+    """Append / finish pair that builds an Arrow array for a field annotation"""
+    tp = unwrap_optional(tp)
+    if get_origin(tp) is list:
+        return new_list_column(get_args(tp)[0])
+    if is_model(tp):
+        return new_struct_column(tp)
+    if tp in SCALAR_TYPES:
+        return new_scalar_column(tp)
+    raise TypeError(f"no arrow type for {tp}")
+
+
+def to_record_batch(
+    xmls: Iterable[Union[str, bytes]],
+    records: Optional[list[scan_mod.ScanRecord]] = None,
+    lastmods: Optional[list[str]] = None,
+    include_xml: bool = False,
+    skipped: Optional[list[tuple[int, str]]] = None,
+) -> pa.RecordBatch:
+    """Convert billstatus xml documents into one record batch
+
+    Args:
+        xmls: fdsys_billstatus.xml contents
+        records: scan record of each document (record columns are null if None)
+        lastmods: lastmod string of each document
+        include_xml: add a bs_xml column with the xml strings
+        skipped: documents that fail to parse are skipped and their
+            (index, error) appended here (None to raise instead)
+    """
+    schema = get_schema(include_xml=include_xml)
+    append_bs, finish_bs = new_struct_column(BillStatus)
+    parser = xml_mod.get_parser(recover=False)
+    kept = []
+    xml_column = []
+    with utils.gc_paused():
+        for ii, xml in enumerate(xmls):
+            xml_bytes = xml.encode("utf-8") if isinstance(xml, str) else xml
+            try:
+                root = etree.fromstring(xml_bytes, parser=parser)
+                fields = bill_status_lxml_mod.get_bill_status_dict(root)
+            except Exception as exc:
+                if skipped is None:
+                    raise
+                skipped.append((ii, f"{type(exc).__name__}: {exc}"))
+                continue
+            append_bs(fields)
+            kept.append(ii)
+            if include_xml:
+                xml_column.append(xml if isinstance(xml, str) else xml.decode("utf-8"))
+        bs_columns = finish_bs().flatten()
+
+    columns = []
+    for field in RECORD_FIELDS:
+        if field.name == "lastmod":
+            values = None if lastmods is None else [lastmods[ii] for ii in kept]
+        else:
+            values = None if records is None else [getattr(records[ii], field.name) for ii in kept]
+        columns.append(pa.nulls(len(kept), field.type) if values is None else pa.array(values, field.type))
+    if include_xml:
+        columns.append(pa.array(xml_column, pa.string()))
+    return pa.RecordBatch.from_arrays(columns + bs_columns, schema=schema)
+
+
+def read_batch(
+    congress_scraper_path: Path,
+    records: list[scan_mod.ScanRecord],
+    include_xml: bool = False,
+) -> tuple[pa.RecordBatch, int]:
+    """Read and convert the billstatus files of records
+
+    Files that fail to parse are printed and skipped (the postgres ingest
+    quarantines them).
+
+    Returns:
+        record batch and number of xml bytes read
+    """
+    records = [record for record in records if record.lastmod_path is not None]
+    xmls = [
+        (congress_scraper_path / record.scrape_path).read_text().strip() for record in records
+    ]
+    lastmods = [
+        (congress_scraper_path / record.lastmod_path).read_text() for record in records
+    ]
+    skipped = []
+    batch = to_record_batch(xmls, records, lastmods, include_xml=include_xml, skipped=skipped)
+    for ii, error in skipped:
+        rich.print(f"skipping {records[ii].scrape_path}: {error}")
+    return batch, sum(len(xml) for xml in xmls)
+
+
+def iter_record_batches(
+    congress_scraper_path: Union[str, Path],
+    records: list[scan_mod.ScanRecord],
+    batch_size: int = 1000,
+    include_xml: bool = False,
+) -> Iterator[pa.RecordBatch]:
+    """Record batches of at most batch_size billstatus files in records order"""
+    congress_scraper_path = Path(congress_scraper_path)
+    records = list(scan_mod.filter_kinds(records, [scan_mod.BILLSTATUS]))
+    for ii in range(0, len(records), batch_size):
+        with instrument_mod.step("convert") as sp:
+            batch, sp.nbytes = read_batch(
+                congress_scraper_path, records[ii : ii + batch_size], include_xml=include_xml
+            )
+            sp.items = batch.num_rows
+        yield batch
+
+
+def write_parquet(
+    congress_scraper_path: Union[str, Path],
+    out_path: Union[str, Path],
+    records: Optional[list[scan_mod.ScanRecord]] = None,
+    batch_size: int = 1000,
+    include_xml: bool = False,
+    ds_tag: str = "billstatus",
+) -> list[Path]:
+    """Write one usc-{congress_num}-{ds_tag}.parquet file per congress
+
+    Rows are ordered by congress_num, legis_type, legis_num like the export
+    in 02_upload_base_hf, and postgres is not needed.
+
+    Args:
+        congress_scraper_path: should have "cache" and "data" as subdirectories
+        out_path: output directory
+        records: output of scan_mod.load_or_scan (the tree is scanned if None)
+        batch_size: number of billstatus files per record batch
+        include_xml: add a bs_xml column
+        ds_tag: dataset tag in the file names
+    """
+    if records is None:
+        records = scan_mod.scan(congress_scraper_path)
+    out_path = Path(out_path)
+    out_path.mkdir(parents=True, exist_ok=True)
+    records = sorted(
+        scan_mod.filter_kinds(records, [scan_mod.BILLSTATUS]),
+        key=lambda record: (record.congress_num, record.legis_type, record.legis_num),
+    )
+    schema = get_schema(include_xml=include_xml)
+    fpaths = []
+    with instrument_mod.stage(f"arrow_{ds_tag}", batch_size=batch_size) as st:
+        for congress_num, cn_records in groupby(records, key=lambda record: record.congress_num):
+            fpath = out_path / f"usc-{congress_num}-{ds_tag}.parquet"
+            rich.print(f"{fpath=}")
+            with pq.ParquetWriter(fpath, schema) as writer:
+                for batch in iter_record_batches(
+                    congress_scraper_path, list(cn_records), batch_size, include_xml
+                ):
+                    with instrument_mod.step("write", items=batch.num_rows):
+                        writer.write_batch(batch)
+                    st.items += batch.num_rows
+            st.nbytes += fpath.stat().st_size
+            fpaths.append(fpath)
+    return fpaths
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--congress-scraper-path", type=Path, required=True)
+    parser.add_argument("--out-path", type=Path, required=True)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--include-xml", action="store_true")
+    args = parser.parse_args()
+
+    instrument_mod.start_run("bill_status_arrow_mod")
+    write_parquet(
+        args.congress_scraper_path,
+        args.out_path,
+        batch_size=args.batch_size,
+        include_xml=args.include_xml,
+    )
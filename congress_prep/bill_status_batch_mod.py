@@ -0,0 +1,203 @@
+"""
+Parse many billstatus documents at once, optionally in a process pool.
+
+  for idx, bs, error in BillStatus.parse_many(paths, workers=8, chunksize=16):
+      ...
+
+Every caller used to loop over files and call BillStatus.from_xml_str. Here
+the loop runs in a process pool through pipeline_mod.bounded_map, so at
+most max_in_flight documents are submitted and not yet consumed, and
+results come back in input order (ordered=True) or as soon as a chunk is
+done (ordered=False).
+
+Inter-process traffic is kept small in both directions. Paths are sent as
+paths and read by the worker. Xml strings are sent as utf-8 bytes, never
+as decoded strings. A worker returns the compact BillStatus json bytes
+(the bytes of model_dump_json), not a pickled model or dict. The pool is
+created once per call and warmed up by an initializer, or pass an executor
+to reuse one pool across calls.
+
+Full parses go through parse_cache_mod if a cache directory is given (or
+$CONGRESS_PREP_PARSE_CACHE is set).
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import partial
+import json
+from pathlib import Path
+import traceback
+from typing import Any, Iterable, Iterator, Optional, Union
+
+from pydantic import BaseModel
+import pydantic_core
+
+from congress_prep import bill_status_lxml_mod
+from congress_prep import model_json_mod
+from congress_prep import parse_cache_mod
+from congress_prep import pipeline_mod
+from congress_prep import xml_mod
+from congress_prep.bill_status_mod import BillStatus
+
+
+OUTPUTS = ("model", "dict", "json")
+
+Source = Union[str, Path, bytes]
+
+
+def get_source(source: Source) -> Union[Path, bytes]:
+    """Path to read in the worker or xml bytes
+
+    A str is xml if it starts with "<" (after whitespace), else a path.
+    """
+    if isinstance(source, str):
+        if source.lstrip().startswith("<"):
+            return source.encode("utf-8")
+        return Path(source)
+    return source
+
+
+def warm_up():
+    """Build the per process parser, converter and cache key state once"""
+    xml_mod.get_parser(recover=False)
+    model_json_mod.get_converter(BillStatus)
+    parse_cache_mod.get_parser_version()
+
+
+def parse_source(
+    source: Union[Path, bytes],
+    sections: Optional[frozenset[str]] = None,
+    trusted: bool = False,
+    stream: bool = False,
+    cache_dir: Optional[Union[str, Path]] = None,
+    serialize: bool = True,
+) -> Union[bytes, BaseModel, dict]:
+    """Parse one document (json bytes if serialize, else a model or trusted json dict)"""
+    xml = source.read_bytes() if isinstance(source, Path) else source
+
+    cache_dir = parse_cache_mod.get_cache_dir(cache_dir) if sections is None else None
+    if cache_dir is not None:
+        # same key as the ingest, which strips the xml it reads
+        _, key, json_str = parse_cache_mod.lookup(
+            xml.decode("utf-8").strip(), cache_dir, trusted
+        )
+        if json_str is not None:
+            return json_str.encode("utf-8")
+
+    if trusted:
+        result = bill_status_lxml_mod.json_from_xml_str(xml, sections, stream)
+    else:
+        result = bill_status_lxml_mod.from_xml_str(xml, sections, stream)
+    if cache_dir is not None or serialize:
+        json_bytes = pydantic_core.to_json(result)
+        if cache_dir is not None:
+            parse_cache_mod.write(cache_dir, key, json_bytes.decode("utf-8"))
+        if serialize:
+            return json_bytes
+    return result
+
+
+def parse_item(item: tuple[int, Union[Path, bytes]], **kwargs) -> tuple[int, Any, Optional[str]]:
+    """parse_source on an (index, source) pair that catches failures
+
+    This is a module level function so that it can be sent to worker processes.
+    """
+    idx, source = item
+    try:
+        return idx, parse_source(source, **kwargs), None
+    except Exception:
+        return idx, None, traceback.format_exc(limit=-3)
+
+
+def to_output(value: Union[bytes, str, BaseModel, dict], output: str, model: type[BillStatus]) -> Any:
+    """Convert a parse_source result to a model, json dict or json bytes"""
+    if isinstance(value, (bytes, str)):
+        if output == "json":
+            return value if isinstance(value, bytes) else value.encode("utf-8")
+        if output == "dict":
+            return json.loads(value)
+        return model.model_validate_json(value)
+    if isinstance(value, BaseModel):
+        if output == "model":
+            return value
+        if output == "dict":
+            return value.model_dump(mode="json")
+        return pydantic_core.to_json(value)
+    if output == "dict":
+        return value
+    if output == "json":
+        return pydantic_core.to_json(value)
+    return model.model_validate(value)
+
+
+def parse_many(
+    sources: Iterable[Source],
+    workers: int = 1,
+    chunksize: int = 16,
+    ordered: bool = True,
+    output: str = "model",
+    sections: Optional[Iterable[str]] = None,
+    trusted: bool = False,
+    stream: bool = False,
+    cache_dir: Optional[Union[str, Path]] = None,
+    max_in_flight: int = 256,
+    executor: Optional[Executor] = None,
+) -> Iterator[tuple[int, Any, Optional[str]]]:
+    """Parse billstatus documents and yield (index, result, error) for each
+
+    Args:
+        sources: paths or xml (str or bytes), a str that does not start
+            with "<" is a path
+        workers: number of parser processes (1 means parse on the calling
+            thread, ignored if executor is given)
+        chunksize: number of documents sent to a worker at a time
+        ordered: yield results in input order, else as chunks finish
+        output: "model" (BillStatus), "dict" (json dict as
+            model_dump(mode="json")) or "json" (compact json bytes)
+        sections: only read these sections (see bill_status_lxml_mod.SECTIONS)
+        trusted: skip pydantic validation in the workers (see model_json_mod),
+            "model" output is still validated once when it is built
+        stream: see bill_status_lxml_mod.from_xml_str
+        cache_dir: parsed billstatus cache (see parse_cache_mod, default
+            $CONGRESS_PREP_PARSE_CACHE, only used for full parses)
+        max_in_flight: maximum number of documents submitted and not yet yielded
+        executor: existing pool to reuse across calls
+
+    Returns:
+        iterator of (index into sources, result or None, formatted error or None)
+    """
+    if output not in OUTPUTS:
+        raise ValueError(f"output must be one of {OUTPUTS}, got {output}")
+    sections = bill_status_lxml_mod.check_sections(sections)
+    model = bill_status_lxml_mod.get_model(sections)
+
+    with ExitStack() as stack:
+        if executor is None and workers > 1:
+            warm_up()
+            executor = stack.enter_context(
+                ProcessPoolExecutor(max_workers=workers, initializer=warm_up)
+            )
+        fn = partial(
+            parse_item,
+            sections=sections,
+            trusted=trusted,
+            stream=stream,
+            cache_dir=cache_dir,
+            # on the calling thread there is nothing to send between processes
+            serialize=executor is not None,
+        )
+        items = ((idx, get_source(source)) for idx, source in enumerate(sources))
+        results = pipeline_mod.bounded_map(
+            fn,
+            items,
+            executor=executor,
+            max_in_flight=max_in_flight,
+            chunksize=chunksize,
+            ordered=ordered,
+        )
+        for idx, value, error in results:
+            if error is not None:
+                yield idx, None, error
+            else:
+                yield idx, to_output(value, output, model), None
+
@@ -0,0 +1,543 @@
+"""
+Single pass lxml parser for billstatus xml.
+
+The classmethods in bill_status_mod look up every field with
+`item.find(tag)`, which scans the children of an element once per field,
+and construct every nested model (sponsor, action, amendment, ...) with its
+own pydantic call. Omnibus bills have thousands of those.
+
+Here the fields come from declarative field maps (xml tag -> model field,
+nested type) derived from the bill_status_mod models and compiled once by
+xml_extract_mod. The compiled extractors visit every element once (first
+child wins, like find) and collect the fields into one nested dict that is
+validated with a single BillStatus.model_validate call, with
+the cyclic garbage collector paused (see utils.gc_paused). The models and
+their validation are the ones in bill_status_mod, so the output is the same
+BillStatus. scripts/parity_bill_status.py checks this on a
+directory of billstatus files and scripts/bench_bill_status.py measures it.
+
+For trusted input json_from_root skips pydantic altogether and converts the
+same dict straight to the json form of a BillStatus (see model_json_mod).
+
+All parsers take an optional list of sections (see SECTIONS). Only those
+sections are read, the elements of the others (e.g. thousands of actions
+and amendments) are not visited and their fields are None.
+
+Very large documents (appropriations bills with thousands of amendments)
+can be parsed with get_bill_status_dict_stream (stream=True), an iterparse
+pass that builds each action, cosponsor and amendment when its end tag is
+parsed and then drops its elements, so the element tree does not hold all
+of them at once. That halves the peak memory of a 50 MB bill but takes
+about 10% longer (scripts/bench_bill_status_stream.py), so it is not the default.
+"""
+
+from functools import lru_cache
+import io
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+from lxml import etree
+from pydantic import create_model
+
+from congress_prep import model_json_mod
+from congress_prep import utils
+from congress_prep import xml_extract_mod
+from congress_prep import xml_mod
+from congress_prep.bill_status_mod import Action
+from congress_prep.bill_status_mod import ActionAmendment
+from congress_prep.bill_status_mod import AmendedBill
+from congress_prep.bill_status_mod import Amendment
+from congress_prep.bill_status_mod import BillStatus
+from congress_prep.bill_status_mod import CboCostEstimate
+from congress_prep.bill_status_mod import Committee
+from congress_prep.bill_status_mod import CommitteeReport
+from congress_prep.bill_status_mod import Cosponsor
+from congress_prep.bill_status_mod import Identifiers
+from congress_prep.bill_status_mod import Law
+from congress_prep.bill_status_mod import Link
+from congress_prep.bill_status_mod import Note
+from congress_prep.bill_status_mod import RecordedVote
+from congress_prep.bill_status_mod import RelatedBill
+from congress_prep.bill_status_mod import Sponsor
+from congress_prep.bill_status_mod import Summary
+from congress_prep.bill_status_mod import Title
+
+
+DC_NS = "{http://purl.org/dc/elements/1.1/}"
+
+# bump when the fields built from the same xml change (invalidates parse_cache_mod)
+PARSER_VERSION = "1"
+
+
+def get_texts(xel: etree._Element) -> dict[str, Optional[str]]:
+    """Child texts by tag in one pass (the first child wins, like find)"""
+    return {child.tag: child.text for child in reversed(xel)}
+
+
+def get_children(xel: etree._Element) -> dict[str, etree._Element]:
+    """Child elements by tag in one pass (the first child wins, like find)"""
+    return {child.tag: child for child in reversed(xel)}
+
+
+def get_items(xel: Optional[etree._Element], tag: str = "item") -> Iterable[etree._Element]:
+    return () if xel is None else xel.iterchildren(tag)
+
+
+def is_name_only(item: etree._Element) -> bool:
+    """Some amendment sponsors have only a name like "Rules Committee", skip these for now"""
+    return len(item) == 1 and item[0].tag == "name"
+
+
+def check_amended_bill(xel: Optional[etree._Element]):
+    """Fail on amendedBill elements that bill_status_mod fails on
+
+    Amendment has no amended_bill field so pydantic drops it, but
+    AmendedBill.from_xel still builds the model. congress, originChamber and
+    title are read with .text (a missing child fails), the other children can
+    be missing but type, originChamberCode and number are required fields.
+    """
+    if xel is None:
+        return
+    t = get_texts(xel)
+    AmendedBill(
+        congress=t["congress"],
+        type=t.get("type"),
+        origin_chamber=t["originChamber"],
+        origin_chamber_code=t.get("originChamberCode"),
+        number=t.get("number"),
+        title=t["title"],
+        update_date_including_text=t.get("updateDateIncludingText"),
+    )
+
+
+def get_action_amendments(xel_outer: Optional[etree._Element]) -> list[dict]:
+    if xel_outer is None:
+        return []
+    outer = get_children(xel_outer)
+    # not used, but a missing count fails like it does in bill_status_mod
+    int(outer["count"].text)
+    return get_action_amendment_items(outer.get("actions"))
+
+
+def get_text_versions(xel: Optional[etree._Element]) -> list[dict]:
+    result = []
+    for item in get_items(xel):
+        t = get_texts(item)
+        urls = list(
+            set([get_texts(fmt).get("url") for fmt in get_items(item.find("formats"))])
+        )
+        if None in urls:
+            raise ValueError("text version format without url")
+        if len(urls) == 0:
+            url = None
+        elif len(urls) == 1:
+            url = urls[0]
+        else:
+            raise ValueError("len(urls)>1")
+
+        tv_type = t.get("type")
+        tv_date = t.get("date")
+        if url is None and tv_type is None and tv_date is None:
+            continue
+        result.append({"type": tv_type, "date": tv_date, "url": url})
+    return result
+
+
+def get_dublin_core(xel: etree._Element) -> dict:
+    t = get_texts(xel)
+    return {
+        "dc_format": t[DC_NS + "format"],
+        "dc_language": t[DC_NS + "language"],
+        "dc_rights": t[DC_NS + "rights"],
+        "dc_contributor": t[DC_NS + "contributor"],
+        "dc_description": t[DC_NS + "description"],
+    }
+
+
+def get_one_of(t: dict[str, Optional[str]], tag: str, alt_tag: str) -> str:
+    """Text of tag or alt_tag (e.g. number/billNumber), which must agree if both exist"""
+    if tag not in t and alt_tag not in t:
+        raise ValueError()
+    if tag not in t:
+        return t[alt_tag]
+    if alt_tag in t and t[tag] != t[alt_tag]:
+        raise ValueError()
+    return t[tag]
+
+
+def get_subjects(xel: Optional[etree._Element]) -> list[str]:
+    if xel is None:
+        return []
+    return [
+        get_texts(item).get("name")
+        for item in get_items(xel.find("legislativeSubjects"))
+    ]
+
+
+def get_policy_area(xel: Optional[etree._Element]) -> Optional[str]:
+    if xel is None:
+        return None
+    return get_texts(xel).get("name")
+
+
+# Field maps of the nested models, see xml_extract_mod. Fields not listed in
+# an override are read from the child with the camelCase tag of their name.
+
+ACTION_FIELDS = xml_extract_mod.from_model(Action)
+
+LINKS = xml_extract_mod.many(xml_extract_mod.from_model(Link), item_tag="link")
+
+SPONSOR_FIELDS = xml_extract_mod.from_model(
+    Sponsor,
+    identifiers=xml_extract_mod.one(
+        xml_extract_mod.from_model(Identifiers, lis_id=xml_extract_mod.text("lisID"))
+    ),
+)
+SPONSORS = xml_extract_mod.many(SPONSOR_FIELDS, skip=is_name_only)
+
+COSPONSOR_FIELDS = xml_extract_mod.from_model(Cosponsor)
+
+ACTION_AMENDMENT_FIELDS = xml_extract_mod.from_model(
+    ActionAmendment,
+    links=LINKS,
+    recorded_votes=xml_extract_mod.many(
+        xml_extract_mod.from_model(RecordedVote), item_tag="recordedVote"
+    ),
+)
+
+# bill_status_mod reads only these fields of the latest action of an amendment
+LATEST_ACTION_AMENDMENT_FIELDS = xml_extract_mod.from_model(
+    ActionAmendment,
+    type=None,
+    action_code=None,
+    source_system=None,
+    recorded_votes=None,
+    links=LINKS,
+)
+
+AMENDMENT_FIELDS = xml_extract_mod.from_model(
+    Amendment,
+    latest_action=xml_extract_mod.one(LATEST_ACTION_AMENDMENT_FIELDS),
+    sponsors=SPONSORS,
+    links=LINKS,
+    actions=xml_extract_mod.custom(get_action_amendments),
+    amended_bill=xml_extract_mod.check(check_amended_bill, "amendedBill"),
+)
+
+# BillStatus fields read from a child of <bill>
+BILL_SECTION_FIELDS = {
+    "committees": xml_extract_mod.many(xml_extract_mod.from_model(Committee)),
+    "committee_reports": xml_extract_mod.many(
+        xml_extract_mod.from_model(CommitteeReport), item_tag="committeeReport"
+    ),
+    "related_bills": xml_extract_mod.many(
+        xml_extract_mod.from_model(
+            RelatedBill,
+            latest_action=xml_extract_mod.one(ACTION_FIELDS, empty_is_none=True),
+        )
+    ),
+    "actions": xml_extract_mod.many(ACTION_FIELDS, empty_is_none=True),
+    "sponsors": SPONSORS,
+    "cosponsors": xml_extract_mod.many(COSPONSOR_FIELDS),
+    "laws": xml_extract_mod.many(xml_extract_mod.from_model(Law)),
+    "notes": xml_extract_mod.many(xml_extract_mod.from_model(Note, links=LINKS)),
+    "cbo_cost_estimates": xml_extract_mod.many(xml_extract_mod.from_model(CboCostEstimate)),
+    "policy_area": xml_extract_mod.custom(get_policy_area),
+    "subjects": xml_extract_mod.custom(get_subjects),
+    "summaries": xml_extract_mod.many(
+        xml_extract_mod.from_model(Summary), item_tag="summary"
+    ),
+    "titles": xml_extract_mod.many(xml_extract_mod.from_model(Title)),
+    "amendments": xml_extract_mod.many(AMENDMENT_FIELDS, item_tag="amendment"),
+    "text_versions": xml_extract_mod.custom(get_text_versions),
+    "latest_action": xml_extract_mod.one(ACTION_FIELDS, empty_is_none=True),
+}
+
+# compiled once: element -> field dict (None for an action without children)
+get_action = xml_extract_mod.compile_fields(ACTION_FIELDS, empty_is_none=True)
+get_cosponsor = xml_extract_mod.compile_fields(COSPONSOR_FIELDS)
+get_amendment = xml_extract_mod.compile_fields(AMENDMENT_FIELDS)
+get_action_amendment_items = xml_extract_mod.compile_section(
+    xml_extract_mod.many(ACTION_AMENDMENT_FIELDS)
+)
+
+# BillStatus section -> (xml tag, getter of the possibly missing element)
+BILL_SECTIONS = {
+    name: (field.tag or xml_extract_mod.to_xml_tag(name), xml_extract_mod.compile_section(field))
+    for name, field in BILL_SECTION_FIELDS.items()
+}
+
+# elements read by the custom getters, relative to <bill>
+CUSTOM_PATHS = (
+    "policyArea/name",
+    "subjects/legislativeSubjects",
+    "subjects/legislativeSubjects/item",
+    "subjects/legislativeSubjects/item/name",
+    "textVersions/item",
+    "textVersions/item/type",
+    "textVersions/item/date",
+    "textVersions/item/formats",
+    "textVersions/item/formats/item",
+    "textVersions/item/formats/item/url",
+)
+
+BILL_TAGS = (
+    "number",
+    "billNumber",
+    "updateDate",
+    "updateDateIncludingText",
+    "originChamber",
+    "originChamberCode",
+    "type",
+    "billType",
+    "introducedDate",
+    "congress",
+    "title",
+)
+
+
+def get_read_paths() -> set[str]:
+    """Paths of the elements that get_bill_status_dict reads (e.g. billStatus/bill/title)
+
+    Used by profile_mod to report elements that the parser drops.
+    """
+    bill = "billStatus/bill"
+    paths = {"billStatus", "billStatus/version", bill, "billStatus/dublinCore"}
+    paths.update(f"{bill}/{tag}" for tag in BILL_TAGS)
+    paths.update(xml_extract_mod.get_paths(BILL_SECTION_FIELDS, bill))
+    paths.update(f"{bill}/{path}" for path in CUSTOM_PATHS)
+    amendment_actions = f"{bill}/amendments/amendment/actions"
+    paths.update({f"{amendment_actions}/count", f"{amendment_actions}/actions"})
+    paths.update(
+        xml_extract_mod.get_paths(
+            {"item": xml_extract_mod.one(ACTION_AMENDMENT_FIELDS)},
+            f"{amendment_actions}/actions",
+        )
+    )
+    paths.update(
+        f"billStatus/dublinCore/{DC_NS}{name}"
+        for name in ("format", "language", "rights", "contributor", "description")
+    )
+    return paths
+
+
+# sections that can be requested, the other fields (number, title, dates, ...) are always read
+SECTIONS = (*BILL_SECTIONS, "dublin_core")
+
+# what the vector store and nomic exports read from a bill
+METADATA_SECTIONS = ("sponsors", "cosponsors", "subjects", "policy_area", "text_versions")
+
+
+def check_sections(sections: Optional[Iterable[str]]) -> Optional[frozenset[str]]:
+    """Frozen set of requested sections (None means all)"""
+    if sections is None:
+        return None
+    sections = frozenset(sections)
+    unknown = sections.difference(SECTIONS)
+    if unknown:
+        raise ValueError(f"unknown sections {sorted(unknown)}, choose from {SECTIONS}")
+    return sections
+
+
+def get_bill_status_dict(
+    root: etree._Element, sections: Optional[Iterable[str]] = None
+) -> dict:
+    """BillStatus field dict (not validated yet) from a parsed billStatus root
+
+    Args:
+        root: billStatus element
+        sections: sections to read (default all), the elements of the
+            other sections are not visited and their fields are None
+    """
+    sections = check_sections(sections)
+    top = get_children(root)
+    bill = top["bill"]
+    t = get_texts(bill)
+    c = get_children(bill)
+    version = top.get("version")
+    fields = {
+        "version": None if version is None else version.text,
+        "number": int(get_one_of(t, "number", "billNumber")),
+        "update_date": t["updateDate"],
+        "update_date_including_text": t.get("updateDateIncludingText"),
+        "origin_chamber": t["originChamber"],
+        "origin_chamber_code": t.get("originChamberCode"),
+        "type": get_one_of(t, "type", "billType"),
+        "introduced_date": t["introducedDate"],
+        "congress": t["congress"],
+        "title": t["title"],
+    }
+    for name, (tag, get_section) in BILL_SECTIONS.items():
+        if sections is None or name in sections:
+            fields[name] = get_section(c.get(tag))
+        else:
+            fields[name] = None
+    if sections is None or "dublin_core" in sections:
+        fields["dublin_core"] = get_dublin_core(top["dublinCore"])
+    else:
+        fields["dublin_core"] = None
+    return fields
+
+
+# sections that the streaming parser builds item by item while the document
+# is parsed: section -> (container tag under <bill>, item tag, item getter)
+STREAM_SECTIONS = {
+    "actions": ("actions", "item", get_action),
+    "cosponsors": ("cosponsors", "item", get_cosponsor),
+    "amendments": ("amendments", "amendment", get_amendment),
+}
+
+
+def get_bill_status_dict_stream(
+    source: Union[str, Path, bytes], sections: Optional[Iterable[str]] = None
+) -> dict:
+    """BillStatus field dict from an iterparse pass that drops finished items
+
+    Items of STREAM_SECTIONS are turned into field dicts as soon as their end
+    tag is parsed, then cleared and removed from the tree. The tree never
+    holds more than one action, cosponsor or amendment, so its size does
+    not grow with them. Like find, only the items of the first container
+    of the first <bill> are read, items of repeated containers are dropped
+    unread. The remaining sections are small and are read from the tree
+    once the document is parsed.
+
+    Args:
+        source: path of a billstatus xml file (str or Path) or its content
+            as bytes (a str is a path, encode xml text first)
+        sections: sections to read (default all, see SECTIONS)
+    """
+    sections = check_sections(sections)
+    streamed = {
+        name: [] for name in STREAM_SECTIONS if sections is None or name in sections
+    }
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    if not streamed:
+        return get_bill_status_dict(
+            etree.parse(source, parser=xml_mod.get_parser(recover=False)).getroot(),
+            sections,
+        )
+
+    handlers = {}
+    for name, items in streamed.items():
+        container_tag, item_tag, get_item = STREAM_SECTIONS[name]
+        handlers[(container_tag, item_tag)] = (items, get_item)
+    context = etree.iterparse(
+        source,
+        events=("end",),
+        tag=sorted({item_tag for _, item_tag in handlers}),
+        huge_tree=True,
+        resolve_entities=False,
+        no_network=True,
+    )
+    # container tag -> first container of the first <bill>, earlier elements
+    # are never removed so the first one found stays the first one
+    first_containers = {}
+    for _, xel in context:
+        container = xel.getparent()
+        if container is None:
+            continue
+        bill = container.getparent()
+        if bill is None or bill.tag != "bill":
+            continue
+        handler = handlers.get((container.tag, xel.tag))
+        if handler is None:
+            continue
+        first = first_containers.get(container.tag)
+        if first is None:
+            top = bill.getparent()
+            first = container if top is None else top.find("bill").find(container.tag)
+            first_containers[container.tag] = first
+        if container is first:
+            items, get_item = handler
+            item = get_item(xel)
+            if item is not None:
+                items.append(item)
+        xel.clear(keep_tail=True)
+        while xel.getprevious() is not None:
+            del container[0]
+
+    other_sections = frozenset(SECTIONS if sections is None else sections) - streamed.keys()
+    fields = get_bill_status_dict(context.root, other_sections)
+    fields.update(streamed)
+    return fields
+
+
+@lru_cache(maxsize=None)
+def get_model(sections: Optional[frozenset[str]] = None) -> type[BillStatus]:
+    """BillStatus, or a subclass in which the sections not requested are None"""
+    if sections is None:
+        return BillStatus
+    skipped = [name for name in SECTIONS if name not in sections]
+    return create_model(
+        "PartialBillStatus",
+        __base__=BillStatus,
+        **{name: (Optional[BillStatus.model_fields[name].annotation], None) for name in skipped},
+    )
+
+
+def from_root(
+    root: etree._Element, sections: Optional[Iterable[str]] = None
+) -> BillStatus:
+    """BillStatus from a parsed billStatus root element (lxml only)
+
+    Args:
+        root: billStatus element
+        sections: sections to read (default all, see SECTIONS), the fields
+            of the other sections are None
+    """
+    sections = check_sections(sections)
+    with utils.gc_paused():
+        return get_model(sections).model_validate(get_bill_status_dict(root, sections))
+
+
+def get_fields(
+    xml: Union[str, bytes], sections: Optional[frozenset[str]], stream: bool
+) -> dict:
+    """Field dict of an xml document (streamed if stream)"""
+    if isinstance(xml, str):
+        xml = xml.encode("utf-8")
+    if stream:
+        return get_bill_status_dict_stream(xml, sections)
+    root = etree.fromstring(xml, parser=xml_mod.get_parser(recover=False))
+    return get_bill_status_dict(root, sections)
+
+
+def from_xml_str(
+    xml: Union[str, bytes],
+    sections: Optional[Iterable[str]] = None,
+    stream: bool = False,
+) -> BillStatus:
+    """Parse billstatus xml with lxml's strict parser and build a BillStatus
+
+    Args:
+        xml: fdsys_billstatus.xml content
+        sections: sections to read (default all, see SECTIONS), the fields
+            of the other sections are None
+        stream: use the streaming parser, less memory for very large
+            documents but slower (see get_bill_status_dict_stream)
+    """
+    sections = check_sections(sections)
+    with utils.gc_paused():
+        return get_model(sections).model_validate(get_fields(xml, sections, stream))
+
+
+def json_from_root(
+    root: etree._Element, sections: Optional[Iterable[str]] = None
+) -> dict:
+    """BillStatus json dict (as model_dump(mode="json")) without validation"""
+    convert = model_json_mod.get_converter(BillStatus)
+    with utils.gc_paused():
+        return convert(get_bill_status_dict(root, sections))
+
+
+def json_from_xml_str(
+    xml: Union[str, bytes],
+    sections: Optional[Iterable[str]] = None,
+    stream: bool = False,
+) -> dict:
+    """Parse trusted billstatus xml into a BillStatus json dict without validation"""
+    sections = check_sections(sections)
+    convert = model_json_mod.get_converter(BillStatus)
+    with utils.gc_paused():
+        return convert(get_fields(xml, sections, stream))
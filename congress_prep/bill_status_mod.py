@@ -779,9 +779,54 @@ class BillStatus(BaseModel):
     dublin_core: DublinCoreBillStatus
 
     @classmethod
-    def from_xml_str(cls, xml: str):
+    def from_xml_str(
+        cls,
+        xml: str,
+        sections: Optional[list[str]] = None,
+        stream: bool = False,
+    ):
+        """Parse with the single pass lxml parser in bill_status_lxml_mod
+
+        Args:
+            xml: fdsys_billstatus.xml content
+            sections: only read these sections (e.g. ["sponsors", "subjects"],
+                see bill_status_lxml_mod.SECTIONS), the others are None
+            stream: parse with iterparse and drop finished actions,
+                cosponsors and amendments (less memory, but slower)
+        """
+        from congress_prep import bill_status_lxml_mod
+
+        return bill_status_lxml_mod.from_xml_str(xml, sections=sections, stream=stream)
 
-        root = ET.fromstring(xml)
+    @classmethod
+    def parse_many(cls, sources, workers: int = 1, **kwargs):
+        """Parse many documents, optionally in a process pool
+
+        Args:
+            sources: paths or xml strings / bytes
+            workers: number of parser processes
+            kwargs: see bill_status_batch_mod.parse_many (ordered, chunksize,
+                output, sections, trusted, cache_dir, executor, ...)
+
+        Returns:
+            iterator of (index, result, error)
+        """
+        from congress_prep import bill_status_batch_mod
+
+        return bill_status_batch_mod.parse_many(sources, workers=workers, **kwargs)
+
+    @classmethod
+    def from_xml_str_etree(cls, xml: str):
+        """Parse with ElementTree and the find based from_xel (reference implementation)"""
+        return cls.from_xel(ET.fromstring(xml))
+
+    @classmethod
+    def from_xel(cls, root: Element):
+        """Build from an already parsed billStatus root element
+
+        Works with ElementTree and lxml elements. For lxml elements
+        bill_status_lxml_mod.from_root is faster.
+        """
         version = root.find("version")
         bill = root.find("bill")
 
@@ -825,6 +870,7 @@ class BillStatus(BaseModel):
 
 
 def count_tags(xmls: list[str]) -> Counter:
+    """Count the child tags of <bill> (see profile_mod for a whole corpus)"""
     tags = Counter()
     for xml in xmls:
         bill = ET.fromstring(xml).find("bill")
@@ -838,6 +884,8 @@ if __name__ == "__main__":
     import pandas as pd
     import rich
 
+    from congress_prep import parse_cache_mod
+
     congress_hf_path = Path("/Users/galtay/data/congress-hf")
     #    for cn in range(109, 119):
     for cn in range(113, 114):
@@ -849,7 +897,7 @@ if __name__ == "__main__":
         print(tags.most_common())
         for _, row in df.iterrows():
             xml = row["xml"]
-            bs = BillStatus.from_xml_str(xml)
-            # make everything serializable
-            bss.append(json.loads(bs.model_dump_json()))
+            # serializable dict, from $CONGRESS_PREP_PARSE_CACHE if xml was parsed before
+            bs_json, _ = parse_cache_mod.get_or_parse(xml)
+            bss.append(bs_json)
         df_bss = pd.DataFrame(bss)
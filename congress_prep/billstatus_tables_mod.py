@@ -0,0 +1,307 @@
+"""
+Normalized billstatus side tables exploded from bs_json.
+
+Lookups like "all bills cosponsored by X" or "actions on date D" used to
+run json_array_elements(bs_json->...) over every billstatus row. The ingest
+also loads one row per sponsor, cosponsor, action, subject, committee,
+related bill and amendment into the tables below. Each table has a
+(legis_id, position) primary key and b-tree indexes on the columns that
+are looked up, e.g.
+
+  select legis_id from billstatus_cosponsors where bioguide_id = 'S000033';
+  select legis_id, text from billstatus_actions where action_date = '2023-01-09';
+
+sync runs in the transaction of the billstatus upsert of a batch. It only
+touches bills that are new or whose content_hash changed. Their old side
+rows are deleted and the new ones inserted, so the side tables always match
+the committed bs_json. rebuild fills the side tables of an existing
+billstatus table.
+"""
+
+from collections import Counter
+import datetime
+from typing import Optional
+
+import rich
+import sqlalchemy
+import sqlalchemy.orm
+from sqlalchemy import create_engine
+from sqlalchemy import delete
+from sqlalchemy import insert
+from sqlalchemy import select
+
+from congress_prep import orm_mod
+from congress_prep import pg_copy_mod
+from congress_prep import utils
+
+
+TABLES = (
+    orm_mod.BillStatusSponsor.__table__,
+    orm_mod.BillStatusCosponsor.__table__,
+    orm_mod.BillStatusAction.__table__,
+    orm_mod.BillStatusSubject.__table__,
+    orm_mod.BillStatusCommittee.__table__,
+    orm_mod.BillStatusRelatedBill.__table__,
+    orm_mod.BillStatusAmendment.__table__,
+)
+
+
+def to_date(value: Optional[str]) -> Optional[datetime.date]:
+    return None if value is None else datetime.date.fromisoformat(value)
+
+
+def to_datetime(value: Optional[str]) -> Optional[datetime.datetime]:
+    """Naive datetime, offsets are dropped like for the lastmod columns"""
+    if value is None:
+        return None
+    return utils.parse_iso_datetime(value).replace(tzinfo=None)
+
+
+def get_legis_id(congress: int, legis_type: str, legis_num: int) -> str:
+    """Same form as the legis_id of scan_mod (e.g. 118-hr-1)"""
+    return f"{congress}-{legis_type.lower()}-{legis_num}"
+
+
+def get_sponsor_rows(legis_id: str, bs_json: dict) -> list[dict]:
+    return [
+        {
+            "legis_id": legis_id,
+            "position": position,
+            "bioguide_id": sponsor["bioguide_id"],
+            "full_name": sponsor["full_name"],
+            "party": sponsor.get("party"),
+            "state": sponsor.get("state"),
+            "district": sponsor.get("district"),
+            "is_by_request": sponsor.get("is_by_request"),
+        }
+        for position, sponsor in enumerate(bs_json.get("sponsors") or [])
+    ]
+
+
+def get_cosponsor_rows(legis_id: str, bs_json: dict) -> list[dict]:
+    return [
+        {
+            "legis_id": legis_id,
+            "position": position,
+            "bioguide_id": cosponsor["bioguide_id"],
+            "full_name": cosponsor["full_name"],
+            "party": cosponsor.get("party"),
+            "state": cosponsor.get("state"),
+            "district": cosponsor.get("district"),
+            "sponsorship_date": to_date(cosponsor.get("sponsorship_date")),
+            "is_original_cosponsor": cosponsor.get("is_original_cosponsor"),
+        }
+        for position, cosponsor in enumerate(bs_json.get("cosponsors") or [])
+    ]
+
+
+def get_action_rows(legis_id: str, bs_json: dict) -> list[dict]:
+    return [
+        {
+            "legis_id": legis_id,
+            "position": position,
+            "action_date": to_date(action["action_date"]),
+            "text": action["text"],
+            "type": action.get("type"),
+            "action_code": action.get("action_code"),
+            "source_system": (action.get("source_system") or {}).get("name"),
+        }
+        for position, action in enumerate(bs_json.get("actions") or [])
+    ]
+
+
+def get_subject_rows(legis_id: str, bs_json: dict) -> list[dict]:
+    return [
+        {"legis_id": legis_id, "position": position, "subject": subject}
+        for position, subject in enumerate(bs_json.get("subjects") or [])
+    ]
+
+
+def get_committee_rows(legis_id: str, bs_json: dict) -> list[dict]:
+    return [
+        {
+            "legis_id": legis_id,
+            "position": position,
+            "system_code": committee["system_code"],
+            "name": committee["name"],
+            "chamber": committee.get("chamber"),
+            "type": committee.get("type"),
+        }
+        for position, committee in enumerate(bs_json.get("committees") or [])
+    ]
+
+
+def get_related_bill_rows(legis_id: str, bs_json: dict) -> list[dict]:
+    rows = []
+    for position, related_bill in enumerate(bs_json.get("related_bills") or []):
+        # usually one detail, a bill can be e.g. both "Related bill" and "Identical bill"
+        types = dict.fromkeys(
+            detail["type"] for detail in related_bill.get("relationship_details") or []
+        )
+        rows.append(
+            {
+                "legis_id": legis_id,
+                "position": position,
+                "related_legis_id": get_legis_id(
+                    related_bill["congress"], related_bill["type"], related_bill["number"]
+                ),
+                "congress_num": related_bill["congress"],
+                "legis_type": related_bill["type"].lower(),
+                "legis_num": related_bill["number"],
+                "title": related_bill.get("title"),
+                "relationship_types": "; ".join(types) or None,
+            }
+        )
+    return rows
+
+
+def get_amendment_rows(legis_id: str, bs_json: dict) -> list[dict]:
+    rows = []
+    for position, amendment in enumerate(bs_json.get("amendments") or []):
+        sponsors = amendment.get("sponsors") or []
+        rows.append(
+            {
+                "legis_id": legis_id,
+                "position": position,
+                "amendment_id": get_legis_id(
+                    amendment["congress"], amendment["type"], amendment["number"]
+                ),
+                "congress_num": amendment["congress"],
+                "amendment_type": amendment["type"].lower(),
+                "amendment_num": amendment["number"],
+                "chamber": amendment.get("chamber"),
+                "sponsor_bioguide_id": sponsors[0]["bioguide_id"] if sponsors else None,
+                "submitted_date": to_datetime(amendment.get("submitted_date")),
+                "purpose": amendment.get("purpose"),
+                "description": amendment.get("description"),
+            }
+        )
+    return rows
+
+
+ROW_GETTERS = {
+    "billstatus_sponsors": get_sponsor_rows,
+    "billstatus_cosponsors": get_cosponsor_rows,
+    "billstatus_actions": get_action_rows,
+    "billstatus_subjects": get_subject_rows,
+    "billstatus_committees": get_committee_rows,
+    "billstatus_related_bills": get_related_bill_rows,
+    "billstatus_amendments": get_amendment_rows,
+}
+
+
+def get_side_rows(rows: list[dict]) -> dict[str, list[dict]]:
+    """Side table rows of billstatus rows (with legis_id and bs_json), by table name"""
+    side_rows = {table.name: [] for table in TABLES}
+    for row in rows:
+        for table_name, get_rows in ROW_GETTERS.items():
+            side_rows[table_name].extend(get_rows(row["legis_id"], row["bs_json"]))
+    return side_rows
+
+
+def get_changed_rows(session: sqlalchemy.orm.Session, rows: list[dict]) -> list[dict]:
+    """Billstatus rows that are new or whose content_hash differs from the database"""
+    table = orm_mod.BillStatus.__table__
+    hashes = dict(
+        session.execute(
+            select(table.c.legis_id, table.c.content_hash).where(
+                table.c.legis_id.in_([row["legis_id"] for row in rows])
+            )
+        ).all()
+    )
+    return [
+        row
+        for row in rows
+        if row["legis_id"] not in hashes
+        or row.get("content_hash") is None
+        or hashes[row["legis_id"]] != row["content_hash"]
+    ]
+
+
+def replace_rows(
+    session: sqlalchemy.orm.Session,
+    legis_ids: list[str],
+    side_rows: dict[str, list[dict]],
+    use_copy: bool = False,
+) -> Counter:
+    """Delete the side rows of legis_ids and insert side_rows (does not commit)"""
+    counts = Counter()
+    for table in TABLES:
+        session.execute(delete(table).where(table.c.legis_id.in_(legis_ids)))
+        table_rows = side_rows[table.name]
+        if not table_rows:
+            continue
+        if use_copy:
+            pg_copy_mod.copy_upsert_rows(
+                session.connection(),
+                table.name,
+                [col.name for col in table.c],
+                [col.name for col in table.primary_key.columns],
+                table_rows,
+            )
+        else:
+            session.execute(insert(table), table_rows)
+        counts[table.name] += len(table_rows)
+    return counts
+
+
+def sync(
+    session: sqlalchemy.orm.Session, rows: list[dict], use_copy: bool = False
+) -> Counter:
+    """Replace the side rows of new and changed bills in a billstatus batch
+
+    Call before upserting rows into billstatus and in the same session, so
+    the side rows commit together with bs_json and the content_hash check
+    still sees the old hashes.
+
+    Args:
+        session: session of the billstatus upsert (not committed here)
+        rows: billstatus rows with legis_id, bs_json and content_hash
+        use_copy: load the side rows with COPY (postgres only)
+
+    Returns:
+        number of rows written per side table
+    """
+    changed = get_changed_rows(session, rows)
+    if not changed:
+        return Counter()
+    return replace_rows(
+        session,
+        [row["legis_id"] for row in changed],
+        get_side_rows(changed),
+        use_copy=use_copy,
+    )
+
+
+def rebuild(conn_str: str, batch_size: int = 1000, use_copy: bool = False) -> Counter:
+    """Fill the side tables from every row of an existing billstatus table
+
+    Bills are read in legis_id order, batch_size at a time, and each batch
+    is committed before the next one is read.
+    """
+    engine = create_engine(conn_str)
+    orm_mod.Base.metadata.create_all(engine, tables=list(TABLES))
+    table = orm_mod.BillStatus.__table__
+    totals = Counter()
+    last_id = None
+    while True:
+        query = select(table.c.legis_id, table.c.bs_json).order_by(table.c.legis_id)
+        if last_id is not None:
+            query = query.where(table.c.legis_id > last_id)
+        with sqlalchemy.orm.Session(engine) as session:
+            rows = [row._asdict() for row in session.execute(query.limit(batch_size))]
+            if not rows:
+                break
+            totals.update(
+                replace_rows(
+                    session,
+                    [row["legis_id"] for row in rows],
+                    get_side_rows(rows),
+                    use_copy=use_copy,
+                )
+            )
+            session.commit()
+        last_id = rows[-1]["legis_id"]
+        rich.print(f"rebuilt side tables of {len(rows)} bills up to {last_id}")
+    rich.print(f"side table totals: {dict(totals)}")
+    return totals
@@ -0,0 +1,224 @@
+"""
+Durable checkpoints and a quarantine list for long ingest runs.
+
+An ingest stage works through a list of scan records (usually the manifest
+written by scan_mod). After each committed batch the stage writes a small
+json checkpoint with the run id, the manifest offset up to which every
+record has been committed and running counts. A resumed run reads the
+checkpoint and skips records before that offset.
+
+Files that fail to read or parse do not abort their batch. The error is
+appended to a json lines quarantine file and the run moves on.
+"""
+
+import datetime
+import json
+import os
+from pathlib import Path
+import traceback
+import uuid
+from typing import Any, Callable, Iterable, Iterator, Optional, Union
+
+from pydantic import BaseModel
+import rich
+
+from congress_prep import scan_mod
+
+
+class Checkpoint(BaseModel):
+    run_id: str
+    stage: str
+    nrecords: int
+    offset: int = 0
+    nbatches: int = 0
+    counts: dict[str, int] = {}
+    # scrape paths in the quarantine file, so a resumed run that fails on
+    # them again does not count or append them twice
+    quarantined_paths: list[str] = []
+    complete: bool = False
+    updated_at: Optional[datetime.datetime] = None
+
+
+def new_run_id() -> str:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return "{}-{}".format(now.strftime("%Y%m%dT%H%M%S"), uuid.uuid4().hex[:8])
+
+
+def read_checkpoint(checkpoint_path: Union[str, Path]) -> Optional[Checkpoint]:
+    checkpoint_path = Path(checkpoint_path)
+    if not checkpoint_path.exists():
+        return None
+    return Checkpoint.model_validate_json(checkpoint_path.read_text())
+
+
+def write_checkpoint(checkpoint: Checkpoint, checkpoint_path: Optional[Union[str, Path]]):
+    """Atomically replace the checkpoint file (no-op if checkpoint_path is None)"""
+    if checkpoint_path is None:
+        return
+    checkpoint_path = Path(checkpoint_path)
+    checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+    checkpoint.updated_at = datetime.datetime.now(datetime.timezone.utc)
+    tmp_path = checkpoint_path.with_suffix(checkpoint_path.suffix + ".tmp")
+    with open(tmp_path, "w") as fp:
+        fp.write(checkpoint.model_dump_json(indent=2))
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(tmp_path, checkpoint_path)
+
+
+def start_run(
+    checkpoint_path: Optional[Union[str, Path]],
+    stage: str,
+    nrecords: int,
+    resume: bool = False,
+    quarantine_path: Optional[Union[str, Path]] = None,
+) -> Checkpoint:
+    """Start a new run or pick up the checkpoint of an interrupted one
+
+    Args:
+        checkpoint_path: json checkpoint file (None disables checkpoints)
+        stage: name of the ingest stage (stored and checked on resume)
+        nrecords: length of the record list the offsets refer to
+        resume: continue from the checkpoint if there is one
+        quarantine_path: quarantine file of the run. On resume its entries
+            for the run are added to quarantined_paths, they can be newer
+            than the last checkpoint.
+
+    Raises:
+        ValueError: if the checkpoint belongs to another stage or to a
+            record list of a different length
+    """
+    checkpoint = None
+    if resume and checkpoint_path is not None:
+        checkpoint = read_checkpoint(checkpoint_path)
+
+    if checkpoint is None:
+        checkpoint = Checkpoint(
+            run_id=new_run_id(), stage=stage, nrecords=nrecords, counts={"quarantined": 0}
+        )
+        rich.print(f"starting {stage} run {checkpoint.run_id}")
+        return checkpoint
+
+    if checkpoint.stage != stage or checkpoint.nrecords != nrecords:
+        raise ValueError(
+            f"checkpoint {checkpoint_path} is for stage={checkpoint.stage} "
+            f"nrecords={checkpoint.nrecords}, not {stage=} {nrecords=}. "
+            "resume with the same manifest or start a new run."
+        )
+    for scrape_path in read_quarantined_paths(quarantine_path, checkpoint):
+        if scrape_path not in checkpoint.quarantined_paths:
+            checkpoint.quarantined_paths.append(scrape_path)
+    checkpoint.counts["quarantined"] = len(checkpoint.quarantined_paths)
+    rich.print(
+        f"resuming {stage} run {checkpoint.run_id} at record "
+        f"{checkpoint.offset}/{nrecords} after {checkpoint.nbatches} batches"
+    )
+    return checkpoint
+
+
+def read_quarantined_paths(
+    quarantine_path: Optional[Union[str, Path]], checkpoint: Checkpoint
+) -> list[str]:
+    """Scrape paths quarantined by the run and stage of checkpoint"""
+    if quarantine_path is None or not Path(quarantine_path).exists():
+        return []
+    paths = []
+    with open(quarantine_path) as fp:
+        for line in fp:
+            item = json.loads(line)
+            if item["run_id"] == checkpoint.run_id and item["stage"] == checkpoint.stage:
+                paths.append(item["scrape_path"])
+    return paths
+
+
+def skip_committed(
+    records: Iterable[scan_mod.ScanRecord], offset: int
+) -> Iterator[tuple[int, scan_mod.ScanRecord]]:
+    """Yield (manifest offset, record) pairs at or after offset"""
+    for idx, record in enumerate(records):
+        if idx >= offset:
+            yield idx, record
+
+
+def call_quarantined(
+    fn: Callable[[scan_mod.ScanRecord], Any],
+    item: tuple[int, scan_mod.ScanRecord],
+) -> tuple[int, scan_mod.ScanRecord, Any, Optional[str]]:
+    """Apply fn to the record of an (offset, record) pair and catch failures
+
+    This is a module level function so that it can be sent to worker processes.
+
+    Returns:
+        (offset, record, fn(record) or None, formatted error or None)
+    """
+    idx, record = item
+    try:
+        return idx, record, fn(record), None
+    except Exception:
+        return idx, record, None, traceback.format_exc(limit=-3)
+
+
+def drop_quarantined(
+    results: Iterable[tuple[int, scan_mod.ScanRecord, Any, Optional[str]]],
+    checkpoint: Checkpoint,
+    quarantine_path: Optional[Union[str, Path]] = None,
+) -> Iterator[tuple[int, Any]]:
+    """Quarantine failed results and yield (offset, result) for the rest
+
+    Results that are None (e.g. files without a lastmod sibling) are dropped.
+    """
+    for idx, record, result, error in results:
+        if error is not None:
+            quarantine(checkpoint, record, error, quarantine_path)
+            continue
+        if result is None:
+            continue
+        yield idx, result
+
+
+def quarantine(
+    checkpoint: Checkpoint,
+    record: scan_mod.ScanRecord,
+    error: str,
+    quarantine_path: Optional[Union[str, Path]] = None,
+):
+    last_line = error.strip().splitlines()[-1]
+    if record.scrape_path in checkpoint.quarantined_paths:
+        rich.print(f"already quarantined {record.scrape_path}: {last_line}")
+        return
+    rich.print(f"quarantined {record.scrape_path}: {last_line}")
+    # the key exists from start_run so the writer thread never sees the dict grow
+    checkpoint.counts["quarantined"] += 1
+    checkpoint.quarantined_paths.append(record.scrape_path)
+    if quarantine_path is None:
+        return
+    quarantine_path = Path(quarantine_path)
+    quarantine_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(quarantine_path, "a") as fp:
+        item = {
+            "run_id": checkpoint.run_id,
+            "stage": checkpoint.stage,
+            "scrape_path": record.scrape_path,
+            "error": error,
+        }
+        fp.write(json.dumps(item) + "\n")
+
+
+def commit_batch(
+    checkpoint: Checkpoint,
+    checkpoint_path: Optional[Union[str, Path]],
+    offset: int,
+    counts: dict[str, int],
+):
+    """Record a committed batch whose last record is at offset - 1"""
+    checkpoint.offset = offset
+    checkpoint.nbatches += 1
+    for key, value in counts.items():
+        checkpoint.counts[key] = checkpoint.counts.get(key, 0) + value
+    write_checkpoint(checkpoint, checkpoint_path)
+
+
+def finish_run(checkpoint: Checkpoint, checkpoint_path: Optional[Union[str, Path]]):
+    checkpoint.offset = checkpoint.nrecords
+    checkpoint.complete = True
+    write_checkpoint(checkpoint, checkpoint_path)
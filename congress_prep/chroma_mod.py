@@ -13,7 +13,12 @@ import rich
 from sklearn.preprocessing import normalize
 from tqdm import tqdm
 
+from congress_prep import instrument_mod
 
+
+@instrument_mod.staged(
+    "chroma_index", labels=("congress_nums", "chunk_size", "chunk_overlap", "model_name")
+)
 def create_index(
     congress_hf_path: Union[str, Path],
     congress_nums: list[int],
@@ -63,7 +68,8 @@ def create_index(
         file_tag = f"usc-{cn}-vecs-v1-s{chunk_size}-o{chunk_overlap}-{model_tag}"
         fpath = congress_hf_path / dir_tag / "data" / f"{file_tag}.parquet"
         rich.print(f"{fpath=}")
-        df_vec = pd.read_parquet(fpath)
+        with instrument_mod.step("read", nbytes=fpath.stat().st_size):
+            df_vec = pd.read_parquet(fpath)
         df_vec = df_vec.rename(columns={"metadata": "chunk_metadata"})
         if nlim is not None:
             df_vec = df_vec.head(nlim)
@@ -72,7 +78,8 @@ def create_index(
         file_tag = f"usc-{cn}-unified-v1"
         fpath = congress_hf_path / dir_tag / f"{file_tag}.parquet"
         rich.print(f"{fpath=}")
-        df_uni = pd.read_parquet(fpath)
+        with instrument_mod.step("read", nbytes=fpath.stat().st_size):
+            df_uni = pd.read_parquet(fpath)
         df_uni = df_uni.rename(columns={"metadata": "bill_metadata"})
 
         df = pd.merge(df_vec, df_uni, on="legis_id")
@@ -118,12 +125,14 @@ def create_index(
                 for meta in metas
             ]
 
-            collection.add(
-                embeddings=vecs.tolist(),
-                documents=df_batch["text"].tolist(),
-                metadatas=metas,
-                ids=df_batch["chunk_id"].to_list(),
-            )
+            with instrument_mod.step("upload", items=df_batch.shape[0]):
+                collection.add(
+                    embeddings=vecs.tolist(),
+                    documents=df_batch["text"].tolist(),
+                    metadatas=metas,
+                    ids=df_batch["chunk_id"].to_list(),
+                )
+            instrument_mod.add_counts(df_batch.shape[0])
 
 
 def load_collection(
@@ -192,6 +201,7 @@ if __name__ == "__main__":
     model_name = "BAAI/bge-large-en-v1.5"
     batch_size = 5000
     nlim = None
+    instrument_mod.start_run("chroma_mod", congress_hf_path / "run_log.jsonl")
 
     # create one chroma index with all congress nums
     create_index(
@@ -7,8 +7,10 @@ from pathlib import Path
 import rich
 
 import pandas as pd
+import pyarrow.parquet as pq
 from sqlalchemy import create_engine
 
+from congress_prep import model_json_mod
 from congress_prep import orm_mod
 from congress_prep.bill_status_mod import BillStatus
 
@@ -36,9 +38,15 @@ for ds in datasets:
     fpaths = sorted(list(ds_dir.glob("*.parquet")))
     for ii, fpath in enumerate(fpaths):
         rich.print(fpath)
-        df = pd.read_parquet(fpath)
+        table = pq.read_table(fpath)
+        df = table.to_pandas()
         if ds == "billstatus-parsed":
-            df["billstatus_json"] = df["billstatus_json"].apply(
-                lambda x: BillStatus(**x).model_dump_json()
-            )
+            # rows were validated when they were parsed, only convert them to json.
+            # to_pandas gives numpy arrays and scalars inside the structs,
+            # to_pylist gives the python values the converter expects
+            to_json = model_json_mod.get_converter(BillStatus)
+            df["billstatus_json"] = [
+                model_json_mod.to_json_str(to_json(x))
+                for x in table.column("billstatus_json").to_pylist()
+            ]
         df.to_sql(table_name, con=engine, index=False, if_exists="append")
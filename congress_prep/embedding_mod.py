@@ -12,6 +12,7 @@ import rich
 from sentence_transformers import SentenceTransformer
 import yaml
 
+from congress_prep import instrument_mod
 from congress_prep import utils
 
 
@@ -66,6 +67,9 @@ def get_readme_str(
     return readme_str
 
 
+@instrument_mod.staged(
+    "embedding", labels=("congress_num", "chunk_size", "chunk_overlap", "model_name")
+)
 def write_local(
     congress_hf_path: Union[str, Path],
     congress_num: int,
@@ -89,16 +93,20 @@ def write_local(
     chunk_tag = f"chunks-v1-s{chunk_size}-o{chunk_overlap}"
     c_tag = f"usc-{congress_num}-{chunk_tag}"
     c_fpath = congress_hf_path / f"usc-{chunk_tag}" / f"{c_tag}.parquet"
-    df_c = pd.read_parquet(c_fpath)
+    with instrument_mod.step("read", nbytes=c_fpath.stat().st_size):
+        df_c = pd.read_parquet(c_fpath)
 
     if nlim is not None:
         df_c = df_c.head(nlim)
 
     model = SentenceTransformer(model_name)
-    vecs = model.encode(
-        df_c["text"].tolist(),
-        show_progress_bar=True,
-    )
+    with instrument_mod.step(
+        "encode", items=len(df_c), nbytes=int(df_c["text"].str.len().sum())
+    ):
+        vecs = model.encode(
+            df_c["text"].tolist(),
+            show_progress_bar=True,
+        )
 
     df_c["vec"] = [row for row in vecs]
     df_c["chunk_id"] = df_c["metadata"].apply(lambda x: x["chunk_id"])
@@ -113,9 +121,12 @@ def write_local(
 
     v_tag = f"usc-{congress_num}-vecs-v1-s{chunk_size}-o{chunk_overlap}-{model_tag}"
     v_fpath = out_path / f"{v_tag}.parquet"
-    df_c.to_parquet(v_fpath)
+    with instrument_mod.step("serialize", items=len(df_c)):
+        df_c.to_parquet(v_fpath)
+    instrument_mod.add_counts(len(df_c), int(df_c["text"].str.len().sum()))
 
 
+@instrument_mod.staged()
 def upload_hf(
     congress_hf_path: Union[str, Path],
     chunk_size: int,
@@ -145,12 +156,13 @@ def upload_hf(
         repo_type="dataset",
         exist_ok=True,
     )
-    api.upload_folder(
-        folder_path=upload_folder,
-#        path_in_repo="",
-        repo_id=repo_id,
-        repo_type="dataset",
-    )
+    with instrument_mod.step("upload"):
+        api.upload_folder(
+            folder_path=upload_folder,
+#            path_in_repo="",
+            repo_id=repo_id,
+            repo_type="dataset",
+        )
 
 
 def write_readme(
@@ -179,6 +191,7 @@ if __name__ == "__main__":
     chunk_overlap = 256
     nlim = None
     model_names = ["BAAI/bge-small-en-v1.5", "BAAI/bge-large-en-v1.5"]
+    instrument_mod.start_run("embedding_mod", congress_hf_path / "run_log.jsonl")
 
     do_write_local = False
     do_upload_hf = False
@@ -0,0 +1,345 @@
+"""
+Stage timing and throughput for pipeline runs.
+
+A run is a sequence of stages (e.g. "billstatus" in 01_populate_postgres or
+"encode" in embedding_mod). Each stage records wall time, cpu time, items
+and bytes processed and the peak resident memory of the process so far
+(ru_maxrss is a high water mark over the whole process, so it is not the
+memory used by the stage alone; a stage raises it only if it needed more
+than every stage before it). Inside a stage the hot
+sub-steps (read, parse, serialize, db_write, encode, ...) are timed with
+`step`, which accumulates per step name so that a step called once per file
+costs two clock reads and a dict update.
+
+  instrument_mod.start_run("01_populate_postgres", "run_log.jsonl")
+  with instrument_mod.stage("billstatus") as st:
+      for path in paths:
+          with instrument_mod.step("read") as sp:
+              xml = path.read_text()
+              sp.nbytes += len(xml)
+          st.items += 1
+
+Functions that are a stage as a whole are decorated with `staged` instead
+and add their items with `add_counts`:
+
+  @instrument_mod.staged("chunking", labels=("congress_num", "chunk_size"))
+  def write_local(congress_hf_path, congress_num, chunk_size, chunk_overlap):
+      ...
+      instrument_mod.add_counts(items=df_c.shape[0])
+
+When a stage ends one json line is appended to the run log for the stage
+and one for each of its steps. Every line carries the run id so that runs
+can be compared with read_run_log (see scripts/compare_run_log.py).
+
+Steps timed in ProcessPoolExecutor workers are sent back with the results of
+pipeline_mod.bounded_map and merged into the parent process, so a stage
+reports the parse time of its workers too. Step cpu time is per thread so
+that a writer thread and the parser do not count each other's work.
+"""
+
+from contextlib import contextmanager
+import datetime
+import functools
+import inspect
+import os
+from pathlib import Path
+import platform
+import resource
+import sys
+import threading
+import time
+from typing import Any, Callable, Iterator, Optional, Union
+
+from pydantic import AliasChoices
+from pydantic import BaseModel
+from pydantic import Field
+import rich
+
+from congress_prep.checkpoint_mod import new_run_id
+
+
+RUN_LOG_ENV = "CONGRESS_PREP_RUN_LOG"
+
+# ru_maxrss is in bytes on macOS and in kilobytes on linux
+RSS_UNIT_BYTES = 1 if sys.platform == "darwin" else 1024
+
+
+class StageRecord(BaseModel):
+    run_id: str
+    pipeline: str
+    stage: str
+    step: Optional[str] = None
+    labels: dict[str, Any] = {}
+    started_at: datetime.datetime
+    wall_s: float
+    cpu_s: float
+    items: int
+    nbytes: int
+    items_per_s: Optional[float] = None
+    bytes_per_s: Optional[float] = None
+    # peak rss of the process when the stage ended (not of the stage alone),
+    # stored as peak_rss_mb in older run logs
+    process_peak_rss_mb: float = Field(
+        validation_alias=AliasChoices("process_peak_rss_mb", "peak_rss_mb")
+    )
+    host: str
+    pid: int
+
+
+class Counts:
+    """Items and bytes processed by a stage or step (mutable by the caller)"""
+
+    __slots__ = ("items", "nbytes")
+
+    def __init__(self, items: int = 0, nbytes: int = 0):
+        self.items = items
+        self.nbytes = nbytes
+
+    def add(self, items: int = 1, nbytes: int = 0):
+        self.items += items
+        self.nbytes += nbytes
+
+
+_run = {"run_id": None, "pipeline": "congress_prep", "log_path": None}
+
+# step name -> [wall_s, cpu_s, items, nbytes, process_peak_rss_mb]
+_steps: dict[str, list] = {}
+_steps_lock = threading.Lock()
+
+# counts of the stages that are running, innermost last
+_active: list[Counts] = []
+
+
+def start_run(
+    pipeline: str,
+    log_path: Optional[Union[str, Path]] = None,
+    run_id: Optional[str] = None,
+) -> str:
+    """Set the pipeline name, run id and run log file for following stages
+
+    Args:
+        pipeline: name of the script or module (e.g. "01_populate_postgres")
+        log_path: json lines run log (default is $CONGRESS_PREP_RUN_LOG,
+            stages are only printed if neither is set)
+        run_id: reuse a run id (e.g. the one of a resumed checkpoint)
+
+    Returns:
+        run id
+    """
+    if log_path is None:
+        log_path = os.getenv(RUN_LOG_ENV)
+    _run["run_id"] = run_id or new_run_id()
+    _run["pipeline"] = pipeline
+    _run["log_path"] = None if log_path is None else Path(log_path)
+    rich.print(f"{pipeline} run {_run['run_id']}, run log: {_run['log_path']}")
+    return _run["run_id"]
+
+
+def get_run_id() -> str:
+    if _run["run_id"] is None:
+        start_run(_run["pipeline"])
+    return _run["run_id"]
+
+
+def get_peak_rss_mb(children: bool = False) -> float:
+    """Peak resident set size of this process (or its waited for children)"""
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    return resource.getrusage(who).ru_maxrss * RSS_UNIT_BYTES / 2**20
+
+
+def get_children_cpu_s() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+@contextmanager
+def step(name: str, items: int = 1, nbytes: int = 0) -> Iterator[Counts]:
+    """Add the wall and thread cpu time of the block to step `name`
+
+    Args:
+        name: step name (e.g. "read", "parse", "db_write")
+        items: items processed in the block (can be changed on the yielded Counts)
+        nbytes: bytes processed in the block (can be changed on the yielded Counts)
+    """
+    counts = Counts(items, nbytes)
+    t0 = time.perf_counter()
+    c0 = time.thread_time()
+    try:
+        yield counts
+    finally:
+        dt = time.perf_counter() - t0
+        dc = time.thread_time() - c0
+        with _steps_lock:
+            totals = _steps.setdefault(name, [0.0, 0.0, 0, 0, 0.0])
+            totals[0] += dt
+            totals[1] += dc
+            totals[2] += counts.items
+            totals[3] += counts.nbytes
+
+
+def drain_steps() -> dict[str, list]:
+    """Return and reset the step totals of this process"""
+    global _steps
+    with _steps_lock:
+        steps, _steps = _steps, {}
+    if steps:
+        peak_rss_mb = get_peak_rss_mb()
+        for totals in steps.values():
+            totals[4] = peak_rss_mb
+    return steps
+
+
+def merge_steps(steps: dict[str, list]):
+    """Add step totals drained in another process (or an outer stage)"""
+    with _steps_lock:
+        for name, other in steps.items():
+            totals = _steps.setdefault(name, [0.0, 0.0, 0, 0, 0.0])
+            for ii in range(4):
+                totals[ii] += other[ii]
+            totals[4] = max(totals[4], other[4])
+
+
+def make_record(
+    stage_name: str,
+    step_name: Optional[str],
+    labels: dict[str, Any],
+    started_at: datetime.datetime,
+    wall_s: float,
+    cpu_s: float,
+    items: int,
+    nbytes: int,
+    process_peak_rss_mb: float,
+) -> StageRecord:
+    return StageRecord(
+        run_id=get_run_id(),
+        pipeline=_run["pipeline"],
+        stage=stage_name,
+        step=step_name,
+        labels=labels,
+        started_at=started_at,
+        wall_s=wall_s,
+        cpu_s=cpu_s,
+        items=items,
+        nbytes=nbytes,
+        items_per_s=items / wall_s if wall_s > 0 else None,
+        bytes_per_s=nbytes / wall_s if wall_s > 0 else None,
+        process_peak_rss_mb=process_peak_rss_mb,
+        host=platform.node(),
+        pid=os.getpid(),
+    )
+
+
+def write_records(records: list[StageRecord]):
+    log_path = _run["log_path"]
+    if log_path is None:
+        return
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, "a") as fp:
+        for record in records:
+            fp.write(record.model_dump_json() + "\n")
+
+
+def format_record(record: StageRecord) -> str:
+    name = record.stage if record.step is None else f"{record.stage}/{record.step}"
+    line = f"{name}: {record.wall_s:.2f}s wall, {record.cpu_s:.2f}s cpu, {record.items} items"
+    if record.items_per_s is not None:
+        line += f" ({record.items_per_s:.1f}/s)"
+    if record.nbytes and record.bytes_per_s is not None:
+        line += f", {record.nbytes / 1e6:.1f} MB ({record.bytes_per_s / 1e6:.1f} MB/s)"
+    return line + f", process peak rss {record.process_peak_rss_mb:.0f} MB"
+
+
+@contextmanager
+def stage(name: str, items: int = 0, nbytes: int = 0, **labels) -> Iterator[Counts]:
+    """Time a pipeline stage and append it and its steps to the run log
+
+    Cpu time includes worker processes that exited during the stage (e.g. a
+    ProcessPoolExecutor shut down inside the block). Steps timed before the
+    stage started belong to the enclosing stage and are kept for it.
+
+    Args:
+        name: stage name (e.g. "billstatus", "upload_unified")
+        items: items processed (can be changed on the yielded Counts)
+        nbytes: bytes processed (can be changed on the yielded Counts)
+        labels: json serializable values that identify the stage
+            configuration (e.g. congress_num=118, model_name="...")
+    """
+    outer_steps = drain_steps()
+    counts = Counts(items, nbytes)
+    started_at = datetime.datetime.now(datetime.timezone.utc)
+    t0 = time.perf_counter()
+    c0 = time.process_time()
+    cc0 = get_children_cpu_s()
+    _active.append(counts)
+    try:
+        yield counts
+    finally:
+        _active.remove(counts)
+        wall_s = time.perf_counter() - t0
+        cpu_s = time.process_time() - c0 + get_children_cpu_s() - cc0
+        process_peak_rss_mb = max(get_peak_rss_mb(), get_peak_rss_mb(children=True))
+        records = [
+            make_record(
+                name, None, labels, started_at, wall_s, cpu_s,
+                counts.items, counts.nbytes, process_peak_rss_mb,
+            )
+        ]
+        for step_name, (step_wall_s, step_cpu_s, step_items, step_nbytes, step_rss_mb) in (
+            drain_steps().items()
+        ):
+            records.append(
+                make_record(
+                    name, step_name, labels, started_at, step_wall_s, step_cpu_s,
+                    step_items, step_nbytes, step_rss_mb,
+                )
+            )
+        merge_steps(outer_steps)
+        write_records(records)
+        for record in records:
+            rich.print(format_record(record))
+
+
+def add_counts(items: int = 1, nbytes: int = 0):
+    """Add items and bytes to the innermost running stage (no-op outside a stage)"""
+    if _active:
+        _active[-1].add(items, nbytes)
+
+
+def staged(name: Optional[str] = None, labels: tuple[str, ...] = ()) -> Callable:
+    """Decorator that runs every call of a function as a stage
+
+    Args:
+        name: stage name (default is the function name)
+        labels: names of function arguments whose values label the stage
+    """
+
+    def decorate(fn: Callable) -> Callable:
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            stage_labels = {label: bound.arguments[label] for label in labels}
+            with stage(name or fn.__name__, **stage_labels):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def read_run_log(log_path: Union[str, Path], run_id: Optional[str] = None) -> list[StageRecord]:
+    """Read stage records from a run log (optionally only one run)"""
+    records = []
+    with open(log_path) as fp:
+        for line in fp:
+            record = StageRecord.model_validate_json(line)
+            if run_id is None or record.run_id == run_id:
+                records.append(record)
+    return records
+
+
+def get_run_ids(records: list[StageRecord]) -> list[str]:
+    """Run ids in the order they first appear"""
+    return list(dict.fromkeys(record.run_id for record in records))
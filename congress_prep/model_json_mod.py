@@ -0,0 +1,116 @@
+"""
+Convert trusted field dicts to the json form of a pydantic model without validating them.
+
+`Model.model_validate(fields).model_dump_json()` validates every field,
+constructs every nested model and then serializes them again. For a
+BillStatus with thousands of actions and amendments that is most of the
+ingest time, and the result is usually decoded again with json.loads.
+
+get_converter(Model) derives a converter from the model fields once. It
+walks a field dict (e.g. from bill_status_lxml_mod.get_bill_status_dict)
+and returns the dict that model_dump(mode="json") would return,
+
+  * keys in model field order, unknown keys dropped, missing keys set to
+    the field default (None for required fields)
+  * int fields converted with int(), str fields passed through
+  * bool, date and datetime fields converted with pydantic itself, cached
+    per distinct string, so the json has the same format
+
+Nothing is checked beyond what these conversions check (a required field
+that is missing becomes None), so use model_validate for untrusted input
+and to detect schema drift.
+"""
+
+import copy
+import datetime
+from functools import lru_cache
+import inspect
+import types
+from typing import Any, Callable, Optional, Union, get_args, get_origin
+
+from pydantic import BaseModel, TypeAdapter
+import pydantic_core
+
+
+Converter = Callable[[Any], Any]
+
+CACHED_SCALAR_TYPES = (bool, datetime.date, datetime.datetime)
+
+
+@lru_cache(maxsize=None)
+def get_adapter(tp: type) -> TypeAdapter:
+    return TypeAdapter(tp)
+
+
+@lru_cache(maxsize=2**16)
+def to_json_scalar(tp: type, value: Any) -> Any:
+    """Json value of a bool, date or datetime field exactly as pydantic dumps it"""
+    adapter = get_adapter(tp)
+    return adapter.dump_python(adapter.validate_python(value), mode="json")
+
+
+def get_scalar_converter(tp: type) -> Optional[Converter]:
+    """None means the value is used as is"""
+    if tp is str or tp is Any:
+        return None
+    if tp is int:
+        return int
+    if tp in CACHED_SCALAR_TYPES:
+        return lambda value: to_json_scalar(tp, value)
+    raise TypeError(f"no json converter for {tp}")
+
+
+def get_list_converter(item_tp: Any) -> Converter:
+    convert = get_type_converter(item_tp)
+    if convert is None:
+        return list
+    return lambda values: [
+        None if value is None else convert(value) for value in values
+    ]
+
+
+def get_type_converter(tp: Any) -> Optional[Converter]:
+    origin = get_origin(tp)
+    if origin is Union or origin is types.UnionType:
+        args = [arg for arg in get_args(tp) if arg is not type(None)]
+        if len(args) != 1:
+            raise TypeError(f"no json converter for {tp}")
+        return get_type_converter(args[0])
+    if origin is list:
+        return get_list_converter(get_args(tp)[0])
+    if inspect.isclass(tp) and issubclass(tp, BaseModel):
+        return get_converter(tp)
+    return get_scalar_converter(tp)
+
+
+@lru_cache(maxsize=None)
+def get_converter(model: type[BaseModel]) -> Converter:
+    """Function that turns a trusted field dict into model_dump(mode="json") of model"""
+    fields = []
+    for name, info in model.model_fields.items():
+        default = None if info.is_required() else info.get_default(call_default_factory=True)
+        fields.append((name, get_type_converter(info.annotation), default))
+
+    def convert(values: dict) -> dict:
+        result = {}
+        for name, convert_field, default in fields:
+            value = values.get(name)
+            if value is None:
+                # mutable defaults (e.g. []) are copied like pydantic does
+                result[name] = copy.copy(default) if name not in values else None
+            elif convert_field is None:
+                result[name] = value
+            else:
+                result[name] = convert_field(value)
+        return result
+
+    return convert
+
+
+def to_json_str(values: dict) -> str:
+    """Json string of converted values, same bytes as model_dump_json
+
+    pydantic_core.to_json is the serializer behind model_dump_json and is
+    about twice as fast as json.dumps on these dicts.
+    """
+    return pydantic_core.to_json(values).decode("utf-8")
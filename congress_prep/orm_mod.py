@@ -1,6 +1,7 @@
 import datetime
 from pathlib import Path
 import re
+from typing import Optional
 
 from sqlalchemy import JSON
 from sqlalchemy.orm import DeclarativeBase
@@ -25,6 +26,7 @@ class BillStatus(Base):
     lastmod: Mapped[datetime.datetime]
     bs_xml: Mapped[str]
     bs_json = mapped_column(type_=JSON, nullable=False)
+    content_hash: Mapped[Optional[str]]
 
 
 class TextVersionsXml(Base):
@@ -43,6 +45,7 @@ class TextVersionsXml(Base):
     xml_type: Mapped[str]
     root_tag: Mapped[str]
     tv_xml: Mapped[str]
+    content_hash: Mapped[Optional[str]]
 
 
 class TextVersionsTxt(Base):
@@ -61,3 +64,100 @@ class TextVersionsTxt(Base):
     xml_type: Mapped[str]
     root_tag: Mapped[str]
     tv_txt: Mapped[str]
+    content_hash: Mapped[Optional[str]]
+    # textversions_mod extractor that produced tv_txt and the content_hash of
+    # the textversions_xml row it was extracted from
+    extractor_version: Mapped[Optional[str]]
+    source_hash: Mapped[Optional[str]]
+
+
+# Normalized tables exploded from billstatus.bs_json (see billstatus_tables_mod).
+# Rows are keyed by the bill and the position in the bs_json list, and are
+# replaced whenever the billstatus row of the bill changes.
+
+
+class BillStatusSponsor(Base):
+    __tablename__ = "billstatus_sponsors"
+
+    legis_id: Mapped[str] = mapped_column(primary_key=True)
+    position: Mapped[int] = mapped_column(primary_key=True)
+    bioguide_id: Mapped[str] = mapped_column(index=True)
+    full_name: Mapped[str]
+    party: Mapped[Optional[str]]
+    state: Mapped[Optional[str]]
+    district: Mapped[Optional[str]]
+    is_by_request: Mapped[Optional[str]]
+
+
+class BillStatusCosponsor(Base):
+    __tablename__ = "billstatus_cosponsors"
+
+    legis_id: Mapped[str] = mapped_column(primary_key=True)
+    position: Mapped[int] = mapped_column(primary_key=True)
+    bioguide_id: Mapped[str] = mapped_column(index=True)
+    full_name: Mapped[str]
+    party: Mapped[Optional[str]]
+    state: Mapped[Optional[str]]
+    district: Mapped[Optional[str]]
+    sponsorship_date: Mapped[Optional[datetime.date]] = mapped_column(index=True)
+    is_original_cosponsor: Mapped[Optional[bool]]
+
+
+class BillStatusAction(Base):
+    __tablename__ = "billstatus_actions"
+
+    legis_id: Mapped[str] = mapped_column(primary_key=True)
+    position: Mapped[int] = mapped_column(primary_key=True)
+    action_date: Mapped[datetime.date] = mapped_column(index=True)
+    text: Mapped[str]
+    type: Mapped[Optional[str]]
+    action_code: Mapped[Optional[str]] = mapped_column(index=True)
+    source_system: Mapped[Optional[str]]
+
+
+class BillStatusSubject(Base):
+    __tablename__ = "billstatus_subjects"
+
+    legis_id: Mapped[str] = mapped_column(primary_key=True)
+    position: Mapped[int] = mapped_column(primary_key=True)
+    subject: Mapped[str] = mapped_column(index=True)
+
+
+class BillStatusCommittee(Base):
+    __tablename__ = "billstatus_committees"
+
+    legis_id: Mapped[str] = mapped_column(primary_key=True)
+    position: Mapped[int] = mapped_column(primary_key=True)
+    system_code: Mapped[str] = mapped_column(index=True)
+    name: Mapped[str]
+    chamber: Mapped[Optional[str]]
+    type: Mapped[Optional[str]]
+
+
+class BillStatusRelatedBill(Base):
+    __tablename__ = "billstatus_related_bills"
+
+    legis_id: Mapped[str] = mapped_column(primary_key=True)
+    position: Mapped[int] = mapped_column(primary_key=True)
+    related_legis_id: Mapped[str] = mapped_column(index=True)
+    congress_num: Mapped[int]
+    legis_type: Mapped[str]
+    legis_num: Mapped[int]
+    title: Mapped[Optional[str]]
+    relationship_types: Mapped[Optional[str]]
+
+
+class BillStatusAmendment(Base):
+    __tablename__ = "billstatus_amendments"
+
+    legis_id: Mapped[str] = mapped_column(primary_key=True)
+    position: Mapped[int] = mapped_column(primary_key=True)
+    amendment_id: Mapped[str] = mapped_column(index=True)
+    congress_num: Mapped[int]
+    amendment_type: Mapped[str]
+    amendment_num: Mapped[int]
+    chamber: Mapped[Optional[str]]
+    sponsor_bioguide_id: Mapped[Optional[str]] = mapped_column(index=True)
+    submitted_date: Mapped[Optional[datetime.datetime]]
+    purpose: Mapped[Optional[str]]
+    description: Mapped[Optional[str]]
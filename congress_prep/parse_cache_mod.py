@@ -0,0 +1,221 @@
+"""
+On-disk cache of parsed billstatus json keyed by xml content and parser version.
+
+Every stage that needs parsed bills (01_populate_postgres, sqla, the
+__main__ of bill_status_mod) parses the same unchanged xml again on every
+run. get_or_parse looks the xml up here first and only parses on a miss.
+
+  * the key is the sha256 of the parser version, the parse mode (strict or
+    trusted) and the xml. The parser version changes with PARSER_VERSION in
+    bill_status_lxml_mod and with the BillStatus json schema, so entries of
+    an older parser or model are never read.
+  * the value is the compact BillStatus json (the bs_json column, the same
+    bytes as model_dump_json) compressed with zstd through pyarrow. That is
+    what the ingest stores and hashes, and decoding it is several times
+    faster than parsing the xml.
+  * one file per entry under cache_dir/<2 hex chars>/, written to a temp
+    file and renamed so that parser processes can share the cache.
+  * hits refresh the file mtime and evict removes the least recently used
+    files until the cache fits in max_bytes.
+
+The cache directory is an argument or $CONGRESS_PREP_PARSE_CACHE (no
+caching if neither is set).
+"""
+
+from functools import lru_cache
+import hashlib
+import json
+import os
+from pathlib import Path
+import tempfile
+from typing import Optional, Union
+
+from lxml import etree
+import pyarrow as pa
+import rich
+
+from congress_prep import bill_status_lxml_mod
+from congress_prep import instrument_mod
+from congress_prep import model_json_mod
+from congress_prep import utils
+from congress_prep.bill_status_mod import BillStatus
+
+
+PARSE_CACHE_ENV = "CONGRESS_PREP_PARSE_CACHE"
+DEFAULT_MAX_BYTES = 4 * 2**30
+SUFFIX = ".json.zst"
+
+# length of the uncompressed json, stored in front of the zstd frame
+SIZE_BYTES = 8
+
+
+@lru_cache(maxsize=None)
+def get_parser_version() -> str:
+    """PARSER_VERSION and a digest of the BillStatus json schema"""
+    schema = json.dumps(BillStatus.model_json_schema(), sort_keys=True)
+    digest = hashlib.sha256(schema.encode("utf-8")).hexdigest()[:12]
+    return f"{bill_status_lxml_mod.PARSER_VERSION}-{digest}"
+
+
+@lru_cache(maxsize=None)
+def get_codec() -> pa.Codec:
+    return pa.Codec("zstd")
+
+
+def get_cache_dir(cache_dir: Optional[Union[str, Path]] = None) -> Optional[Path]:
+    """cache_dir, else $CONGRESS_PREP_PARSE_CACHE, else None (no caching)"""
+    if cache_dir is None:
+        cache_dir = os.getenv(PARSE_CACHE_ENV)
+    return None if cache_dir is None else Path(cache_dir)
+
+
+def get_key(xml: str, trusted: bool = False) -> str:
+    mode = "trusted" if trusted else "strict"
+    return utils.get_content_hash(get_parser_version(), mode, xml)
+
+
+def get_path(cache_dir: Path, key: str) -> Path:
+    return cache_dir / key[:2] / f"{key}{SUFFIX}"
+
+
+def read(cache_dir: Path, key: str) -> Optional[str]:
+    """Cached json string of key (None on a miss)"""
+    path = get_path(cache_dir, key)
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    size = int.from_bytes(data[:SIZE_BYTES], "little")
+    json_bytes = get_codec().decompress(data[SIZE_BYTES:], decompressed_size=size, asbytes=True)
+    # least recently used eviction goes by mtime
+    os.utime(path)
+    return json_bytes.decode("utf-8")
+
+
+def write(cache_dir: Path, key: str, json_str: str):
+    path = get_path(cache_dir, key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    json_bytes = json_str.encode("utf-8")
+    data = len(json_bytes).to_bytes(SIZE_BYTES, "little") + get_codec().compress(
+        json_bytes, asbytes=True
+    )
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as fp:
+        fp.write(data)
+    os.replace(tmp_path, path)
+
+
+def use_stream(xml: str, stream_min_bytes: Optional[int]) -> bool:
+    """Whether xml is large enough for the streaming parser (never if stream_min_bytes is None)"""
+    # len counts characters, the same as bytes for the mostly ascii billstatus xml
+    return stream_min_bytes is not None and len(xml) >= stream_min_bytes
+
+
+def parse(
+    xml: str,
+    trusted: bool = False,
+    root: Optional[etree._Element] = None,
+    stream_min_bytes: Optional[int] = None,
+) -> tuple[dict, str]:
+    """BillStatus json dict and json string of xml (from root if it is already parsed)
+
+    Documents of at least stream_min_bytes without a parsed root are parsed
+    with the streaming parser (see bill_status_lxml_mod), which gives the
+    same json with a lower peak memory but is slower.
+    """
+    stream = root is None and use_stream(xml, stream_min_bytes)
+    if trusted:
+        if root is None:
+            json_dict = bill_status_lxml_mod.json_from_xml_str(xml, stream=stream)
+        else:
+            json_dict = bill_status_lxml_mod.json_from_root(root)
+        return json_dict, model_json_mod.to_json_str(json_dict)
+    if root is None:
+        json_str = BillStatus.from_xml_str(xml, stream=stream).model_dump_json()
+    else:
+        json_str = bill_status_lxml_mod.from_root(root).model_dump_json()
+    return json.loads(json_str), json_str
+
+
+def lookup(
+    xml: str, cache_dir: Optional[Union[str, Path]] = None, trusted: bool = False
+) -> tuple[Optional[Path], Optional[str], Optional[str]]:
+    """Cache directory, key and cached json string of xml (None if not cached)"""
+    cache_dir = get_cache_dir(cache_dir)
+    if cache_dir is None:
+        return None, None, None
+    key = get_key(xml, trusted)
+    with instrument_mod.step("parse_cache_read") as sp:
+        json_str = read(cache_dir, key)
+        # items counts the hits
+        sp.items = int(json_str is not None)
+    return cache_dir, key, json_str
+
+
+def get_or_parse(
+    xml: str,
+    cache_dir: Optional[Union[str, Path]] = None,
+    trusted: bool = False,
+    root: Optional[etree._Element] = None,
+    stream_min_bytes: Optional[int] = None,
+) -> tuple[dict, str]:
+    """BillStatus json dict and json string of xml, from the cache if possible
+
+    Args:
+        xml: fdsys_billstatus.xml content
+        cache_dir: cache directory (default $CONGRESS_PREP_PARSE_CACHE, no
+            caching if that is not set either)
+        trusted: parse without pydantic validation on a miss (see
+            model_json_mod), trusted and strict entries are kept apart
+        root: parsed root element of xml, used on a miss
+        stream_min_bytes: on a miss, stream documents of at least this size
+            (None for never). The json is the same so the key does not change.
+
+    Returns:
+        (bs_json, bs_json_str) like the bs_json and content_hash inputs of the ingest
+    """
+    cache_dir, key, json_str = lookup(xml, cache_dir, trusted)
+    if json_str is not None:
+        return json.loads(json_str), json_str
+
+    json_dict, json_str = parse(
+        xml, trusted=trusted, root=root, stream_min_bytes=stream_min_bytes
+    )
+    if key is not None:
+        with instrument_mod.step("parse_cache_write"):
+            write(cache_dir, key, json_str)
+    return json_dict, json_str
+
+
+def evict(
+    cache_dir: Optional[Union[str, Path]] = None, max_bytes: int = DEFAULT_MAX_BYTES
+) -> tuple[int, int]:
+    """Remove the least recently used entries until the cache fits in max_bytes
+
+    Returns:
+        number of files and bytes removed
+    """
+    cache_dir = get_cache_dir(cache_dir)
+    if cache_dir is None or not cache_dir.exists():
+        return 0, 0
+    entries = []
+    for path in cache_dir.glob(f"*/*{SUFFIX}"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    nfiles = 0
+    nbytes = 0
+    for _, size, path in sorted(entries):
+        if total - nbytes <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        nfiles += 1
+        nbytes += size
+    rich.print(
+        f"parse cache {cache_dir}: {len(entries) - nfiles} files, "
+        f"{(total - nbytes) / 2**20:.0f} MB, evicted {nfiles} files ({nbytes / 2**20:.0f} MB)"
+    )
+    return nfiles, nbytes
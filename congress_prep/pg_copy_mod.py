@@ -0,0 +1,239 @@
+"""
+Bulk upserts into postgres with COPY and a staging table merge.
+
+Rows are streamed as csv with COPY ... FROM STDIN into a temporary staging
+table and merged into the target with one set based
+INSERT ... SELECT ... ON CONFLICT DO UPDATE. Temporary tables are never WAL
+logged (like unlogged tables) and are private to the connection, so two
+loaders writing to the same target do not share a staging table.
+
+Compared to insert(table).values(rows) this avoids compiling one huge
+statement per batch and sends the large xml payloads without any parameter
+binding.
+"""
+
+from collections import Counter
+import datetime
+import json
+from typing import Iterable, Iterator, Optional
+
+import sqlalchemy
+import sqlalchemy.orm
+from sqlalchemy import text
+
+
+COPY_READ_SIZE = 1 << 20
+
+# columns that record where and when a file was seen rather than what it
+# contains. They are updated even when the content hash matches, otherwise an
+# incremental run would see the old lastmod and read the file again every time.
+WATERMARK_COLUMNS = ("scrape_path", "lastmod")
+
+
+def csv_field(value) -> str:
+    """Encode one value for COPY ... WITH (FORMAT csv)
+
+    NULL is an unquoted empty field, everything else is quoted so that empty
+    strings stay empty strings.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    elif isinstance(value, (datetime.date, datetime.datetime)):
+        value = value.isoformat()
+    elif not isinstance(value, str):
+        value = str(value)
+    return '"' + value.replace('"', '""') + '"'
+
+
+class CsvRowStream:
+    """File like object that encodes rows as csv lines on demand
+
+    psycopg2's copy_expert calls read(size) until it gets an empty result,
+    so only about one encoded row is held in memory at a time.
+    """
+
+    def __init__(self, rows: Iterable[dict], columns: list[str]):
+        self.lines = self._iter_lines(rows, columns)
+        self.buffer = b""
+        self.pos = 0
+
+    @staticmethod
+    def _iter_lines(rows: Iterable[dict], columns: list[str]) -> Iterator[bytes]:
+        for row in rows:
+            line = ",".join(csv_field(row.get(col)) for col in columns) + "\n"
+            yield line.encode("utf-8")
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0:
+            rest = self.buffer[self.pos :] + b"".join(self.lines)
+            self.buffer, self.pos = b"", 0
+            return rest
+        chunks = []
+        nread = 0
+        while nread < size:
+            if self.pos >= len(self.buffer):
+                line = next(self.lines, None)
+                if line is None:
+                    break
+                self.buffer, self.pos = line, 0
+            chunk = self.buffer[self.pos : self.pos + size - nread]
+            self.pos += len(chunk)
+            nread += len(chunk)
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+
+def copy_upsert_rows(
+    conn: sqlalchemy.engine.Connection,
+    table_name: str,
+    columns: list[str],
+    key_columns: list[str],
+    rows: list[dict],
+    update_columns: Optional[list[str]] = None,
+    hash_column: Optional[str] = None,
+    watermark_columns: Iterable[str] = WATERMARK_COLUMNS,
+) -> Counter:
+    """COPY rows into a staging table and merge them into table_name
+
+    Does not commit, the caller owns the transaction.
+
+    With hash_column set an existing row is only rewritten when its hash
+    differs from the incoming one, so re-loading identical content does not
+    rewrite the (toasted) xml and json values. The watermark columns of the
+    remaining rows are then set with a second UPDATE of only those columns,
+    which keeps the toasted values of the row as they are.
+
+    Args:
+        conn: sqlalchemy connection (psycopg2 driver)
+        table_name: target table
+        columns: columns to load, in order
+        key_columns: columns of the conflict target (usually the primary key)
+        rows: row dictionaries, missing keys are loaded as NULL
+        update_columns: columns to overwrite on conflict (default all non key)
+        hash_column: content hash column that guards updates
+        watermark_columns: columns updated even when the hash matches
+            (those not in update_columns are ignored)
+
+    Returns:
+        counts of "inserted", "updated" (content changed), "lastmod_only"
+        (only watermark columns changed) and "unchanged" rows
+    """
+    if update_columns is None:
+        update_columns = [col for col in columns if col not in key_columns]
+    staging_name = f"staging_{table_name}"
+    col_list = ", ".join(columns)
+    key_list = ", ".join(key_columns)
+
+    # staging_seq numbers the rows in COPY order
+    conn.execute(
+        text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {staging_name} "
+            f"(LIKE {table_name} INCLUDING DEFAULTS, staging_seq bigserial) "
+            "ON COMMIT DELETE ROWS"
+        )
+    )
+    conn.execute(text(f"TRUNCATE {staging_name}"))
+
+    with conn.connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {staging_name} ({col_list}) FROM STDIN WITH (FORMAT csv)",
+            CsvRowStream(rows, columns),
+            size=COPY_READ_SIZE,
+        )
+
+    # distinct on keeps one row per key so a batch with repeated keys does not
+    # make ON CONFLICT touch the same target row twice. Like the executemany
+    # upsert the last row of a key wins.
+    if update_columns:
+        set_list = ", ".join(f"{col} = EXCLUDED.{col}" for col in update_columns)
+        on_conflict = f"DO UPDATE SET {set_list}"
+        if hash_column is not None:
+            on_conflict += (
+                f" WHERE {table_name}.{hash_column}"
+                f" IS DISTINCT FROM EXCLUDED.{hash_column}"
+            )
+    else:
+        on_conflict = "DO NOTHING"
+    result = conn.execute(
+        text(
+            f"""
+            INSERT INTO {table_name} ({col_list})
+            SELECT DISTINCT ON ({key_list}) {col_list} FROM {staging_name}
+            ORDER BY {key_list}, staging_seq DESC
+            ON CONFLICT ({key_list}) {on_conflict}
+            RETURNING (xmax = 0) AS inserted
+            """
+        )
+    )
+    counts = count_returned(result, len(rows))
+
+    watermark_columns = [col for col in watermark_columns if col in update_columns]
+    if hash_column is not None and watermark_columns and counts["unchanged"]:
+        # rows written above already have the new values and do not match
+        set_list = ", ".join(f"{col} = incoming.{col}" for col in watermark_columns)
+        key_match = " AND ".join(f"{table_name}.{col} = incoming.{col}" for col in key_columns)
+        changed = " OR ".join(
+            f"{table_name}.{col} IS DISTINCT FROM incoming.{col}" for col in watermark_columns
+        )
+        incoming_cols = ", ".join(key_columns + watermark_columns)
+        result = conn.execute(
+            text(
+                f"""
+                UPDATE {table_name} SET {set_list}
+                FROM (
+                    SELECT DISTINCT ON ({key_list}) {incoming_cols} FROM {staging_name}
+                    ORDER BY {key_list}, staging_seq DESC
+                ) AS incoming
+                WHERE {key_match} AND ({changed})
+                """
+            )
+        )
+        counts["lastmod_only"] = result.rowcount
+        counts["unchanged"] -= result.rowcount
+    return counts
+
+
+def count_returned(result: sqlalchemy.engine.Result, nrows: int) -> Counter:
+    """Count inserted/updated/unchanged rows from RETURNING (xmax = 0)
+
+    Freshly inserted rows have xmax = 0, rows rewritten by ON CONFLICT DO
+    UPDATE do not, and rows skipped by the conflict WHERE are not returned.
+    """
+    counts = Counter(inserted=0, updated=0, lastmod_only=0)
+    for (inserted,) in result:
+        counts["inserted" if inserted else "updated"] += 1
+    counts["unchanged"] = nrows - counts["inserted"] - counts["updated"]
+    return counts
+
+
+def copy_upsert(
+    session: sqlalchemy.orm.Session,
+    table: sqlalchemy.Table,
+    rows: list[dict],
+    lastmod_col: str = "lastmod",
+    no_update_cols: Optional[list[str]] = None,
+    hash_col: str = "content_hash",
+    watermark_cols: Iterable[str] = WATERMARK_COLUMNS,
+) -> Counter:
+    """Drop in replacement for the insert based upsert helper"""
+    if no_update_cols is None:
+        no_update_cols = []
+    key_columns = [c.name for c in table.primary_key.columns]
+    columns = [c.name for c in table.c if c.name in rows[0]]
+    update_columns = [
+        col for col in columns if col not in key_columns and col not in no_update_cols
+    ]
+    counts = copy_upsert_rows(
+        session.connection(),
+        table.name,
+        columns,
+        key_columns,
+        rows,
+        update_columns,
+        hash_column=hash_col if hash_col in columns else None,
+        watermark_columns=watermark_cols,
+    )
+    session.commit()
+    return counts
@@ -15,7 +15,12 @@ import rich
 from sklearn.preprocessing import normalize
 from tqdm import tqdm
 
+from congress_prep import instrument_mod
 
+
+@instrument_mod.staged(
+    "pinecone_upsert", labels=("congress_nums", "chunk_size", "chunk_overlap", "model_name")
+)
 def upsert_data(
     congress_hf_path: Union[str, Path],
     congress_nums: list[int],
@@ -49,7 +54,8 @@ def upsert_data(
         file_tag = f"usc-{cn}-vecs-v1-s{chunk_size}-o{chunk_overlap}-{model_tag}"
         fpath = congress_hf_path / dir_tag / "data" / f"{file_tag}.parquet"
         rich.print(f"{fpath=}")
-        df_vec = pd.read_parquet(fpath)
+        with instrument_mod.step("read", nbytes=fpath.stat().st_size):
+            df_vec = pd.read_parquet(fpath)
         df_vec = df_vec.rename(columns={"metadata": "chunk_metadata"})
         if nlim is not None:
             df_vec = df_vec.head(nlim)
@@ -58,7 +64,8 @@ def upsert_data(
         file_tag = f"usc-{cn}-unified-v1"
         fpath = congress_hf_path / dir_tag / f"{file_tag}.parquet"
         rich.print(f"{fpath=}")
-        df_uni = pd.read_parquet(fpath)
+        with instrument_mod.step("read", nbytes=fpath.stat().st_size):
+            df_uni = pd.read_parquet(fpath)
         df_uni = df_uni.rename(columns={"metadata": "bill_metadata"})
 
         df = pd.merge(df_vec, df_uni, on="legis_id")
@@ -93,7 +100,9 @@ def upsert_data(
                     "metadata": meta,
                 }
                 vectors.append(vector)
-            index.upsert(vectors=vectors)
+            with instrument_mod.step("upload", items=len(vectors)):
+                index.upsert(vectors=vectors)
+            instrument_mod.add_counts(len(vectors))
 
 
 
@@ -190,6 +199,7 @@ if __name__ == "__main__":
 
     model_name = "BAAI/bge-small-en-v1.5"
     dimension=384
+    instrument_mod.start_run("pinecone_mod", congress_hf_path / "run_log.jsonl")
 
 #    model_name = "BAAI/bge-large-en-v1.5"
 #    dimension=1024
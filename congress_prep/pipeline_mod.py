@@ -0,0 +1,231 @@
+"""
+Streaming building blocks for the ingest stages.
+
+An ingest run is three stages connected by bounded queues,
+
+  reader -> parse -> writer
+
+* reader: iterates scan records (and applies the incremental lastmod filter)
+  on a background thread, at most `max_queued` records ahead of the parser
+* parse: reads and parses files, optionally in a process pool with at most
+  `max_in_flight` files submitted and not yet consumed (a count of files,
+  not bytes, so a run of omnibus bills holds more memory than usual here)
+* writer: upserts batches on a background thread, at most `max_queued`
+  finished batches wait for it
+
+Batches are cut when they reach `batch_size` rows or `batch_bytes` bytes of
+payload (xml, text and json), whichever comes first. Together with the bounded queues this
+caps the number of raw xml strings alive at any moment, so peak memory does
+not grow with the size of the corpus and a large omnibus bill cannot make a
+batch of `batch_size` rows balloon.
+"""
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from congress_prep import instrument_mod
+
+
+DEFAULT_BATCH_BYTES = 64 * 2**20
+DEFAULT_MAX_QUEUED = 2
+
+_DONE = object()
+
+
+def row_nbytes(row: dict) -> int:
+    """Approximate size of a row as the length of its string values
+
+    The xml and text payloads dominate the size of most rows we write so the
+    small scalar columns are not counted. Nested json (e.g. bs_json) is not
+    counted either, rows that carry it need a size_fn that adds the length
+    of its json text (see upsert_billstatus in 01_populate_postgres).
+    """
+    return sum(len(value) for value in row.values() if isinstance(value, (str, bytes)))
+
+
+def iter_batches(
+    items: Iterable[Any],
+    batch_size: int,
+    batch_bytes: Optional[int] = DEFAULT_BATCH_BYTES,
+    size_fn: Callable[[Any], int] = row_nbytes,
+) -> Iterator[list]:
+    """Group items into lists capped by a row count and a byte budget
+
+    A single item larger than batch_bytes becomes a batch on its own.
+
+    Args:
+        items: rows (or anything size_fn understands)
+        batch_size: maximum number of items per batch
+        batch_bytes: maximum total size_fn per batch (None for no byte limit)
+        size_fn: size of one item in bytes
+    """
+    batch = []
+    nbytes = 0
+    for item in items:
+        batch.append(item)
+        if batch_bytes is not None:
+            nbytes += size_fn(item)
+        if len(batch) >= batch_size or (batch_bytes is not None and nbytes >= batch_bytes):
+            yield batch
+            batch = []
+            nbytes = 0
+    if batch:
+        yield batch
+
+
+def _map_chunk(fn: Callable, chunk: list) -> tuple[list, dict]:
+    # step timings recorded in a worker process travel back with the results
+    results = [fn(item) for item in chunk]
+    return results, instrument_mod.drain_steps()
+
+
+def bounded_map(
+    fn: Callable,
+    items: Iterable[Any],
+    executor: Optional[Executor] = None,
+    max_in_flight: int = 64,
+    chunksize: int = 1,
+    ordered: bool = True,
+) -> Iterator[Any]:
+    """Map with a bounded number of submitted tasks
+
+    Executor.map submits every item up front and keeps every result until it
+    is consumed, so a slow consumer lets results pile up without limit. Here
+    new chunks are only submitted as results are consumed. Steps timed with
+    instrument_mod.step in the workers are merged into this process.
+
+    Args:
+        fn: function to apply (must be picklable for a process pool)
+        items: inputs
+        executor: pool to run fn in (None means run on the calling thread)
+        max_in_flight: maximum number of items submitted and not yet yielded
+            (a count, the size of the items is not taken into account)
+        chunksize: number of items sent to a worker at a time
+        ordered: yield results in input order, else as soon as a chunk is
+            done (results of a chunk stay in order)
+    """
+    if executor is None:
+        yield from map(fn, items)
+        return
+
+    max_chunks = max(1, max_in_flight // chunksize)
+    pending = deque()
+    items = iter(items)
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < max_chunks:
+                chunk = []
+                for item in items:
+                    chunk.append(item)
+                    if len(chunk) >= chunksize:
+                        break
+                if not chunk:
+                    exhausted = True
+                    break
+                pending.append(executor.submit(_map_chunk, fn, chunk))
+            if not pending:
+                return
+            if ordered:
+                future = pending.popleft()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                future = next(future for future in pending if future in done)
+                pending.remove(future)
+            results, steps = future.result()
+            instrument_mod.merge_steps(steps)
+            yield from results
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def prefetch(items: Iterable[Any], max_queued: int = DEFAULT_MAX_QUEUED) -> Iterator[Any]:
+    """Iterate items on a background thread, at most max_queued ahead
+
+    Exceptions raised by the iterable are re-raised in the consumer.
+    """
+    q = queue.Queue(maxsize=max_queued)
+    stop = threading.Event()
+
+    def put(entry) -> bool:
+        # give up if the consumer went away so that join() cannot hang
+        while not stop.is_set():
+            try:
+                q.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+            put((_DONE, None))
+        except BaseException as exc:
+            put((_DONE, exc))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, exc = q.get()
+            if item is _DONE:
+                if exc is not None:
+                    raise exc
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def write_batches(
+    batches: Iterable[list],
+    write_fn: Callable[[list], None],
+    max_queued: int = DEFAULT_MAX_QUEUED,
+) -> int:
+    """Call write_fn on each batch from a background writer thread
+
+    The caller keeps parsing while the previous batch is written. At most
+    max_queued batches wait for the writer, after that the caller blocks.
+    An exception in write_fn stops the run and is re-raised here.
+
+    Returns:
+        number of batches written
+    """
+    q = queue.Queue(maxsize=max_queued)
+    errors = []
+
+    def consume():
+        while True:
+            batch = q.get()
+            if batch is _DONE:
+                return
+            if errors:
+                continue
+            try:
+                write_fn(batch)
+            except BaseException as exc:
+                errors.append(exc)
+
+    thread = threading.Thread(target=consume, daemon=True)
+    thread.start()
+    nbatches = 0
+    try:
+        for batch in batches:
+            if errors:
+                break
+            q.put(batch)
+            nbatches += 1
+    finally:
+        q.put(_DONE)
+        thread.join()
+    if errors:
+        raise errors[0]
+    return nbatches
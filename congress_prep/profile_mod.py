@@ -0,0 +1,412 @@
+"""
+Corpus wide schema profile of billstatus and text version xml.
+
+One pass over the congress-scraper tree (or over exported parquet files)
+counts, per congress,
+
+  * every element path (billStatus/bill/actions/item/actionDate), as the
+    number of elements and of documents that have it
+  * the attribute name sets seen on each path
+  * the number of distinct text values of each leaf path, up to
+    max_values (so enums and free text are easy to tell apart)
+
+For billstatus the paths are compared with the ones bill_status_lxml_mod
+reads (get_read_paths), so new or rare elements that the parser drops
+stand out in the report.
+
+Documents are profiled in a process pool through pipeline_mod.bounded_map.
+Each task profiles a group of documents and returns one merged profile, so
+only the counts cross process boundaries (and for parquet input the xml).
+
+python -m congress_prep.profile_mod /data/congress-scraper --kind billstatus --workers 8
+python -m congress_prep.profile_mod usc-118-billstatus.parquet --out profile.json
+python -m congress_prep.profile_mod /data/congress-scraper --kind bills-dtd --max-depth 6
+"""
+
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import partial
+import json
+import os
+from pathlib import Path
+import re
+from typing import Iterable, Iterator, Optional, Union
+import zlib
+
+from lxml import etree
+import pyarrow.parquet as pq
+import rich
+from rich.table import Table
+
+from congress_prep import bill_status_lxml_mod
+from congress_prep import instrument_mod
+from congress_prep import pipeline_mod
+from congress_prep import scan_mod
+from congress_prep import xml_mod
+
+
+# short prefixes for the namespaces of billstatus and text version xml
+NS_PREFIXES = {
+    "http://purl.org/dc/elements/1.1/": "dc",
+    "http://schemas.gpo.gov/xml/uslm": "uslm",
+    "http://www.w3.org/1999/xhtml": "html",
+}
+
+# parquet columns that hold the xml, first match wins
+XML_COLUMNS = ("bs_xml", "tv_xml", "xml")
+
+DEFAULT_MAX_VALUES = 1000
+
+Source = Union[str, bytes]
+
+
+def get_name(tag: str) -> str:
+    """Element name with a short namespace prefix ({dc ns}format -> dc:format)"""
+    if tag[0] != "{":
+        return tag
+    ns, local = tag[1:].split("}", 1)
+    prefix = NS_PREFIXES.get(ns)
+    return tag if prefix is None else f"{prefix}:{local}"
+
+
+def new_profile() -> dict:
+    return {
+        "docs": 0,
+        "errors": 0,
+        "elements": Counter(),
+        "docs_with": Counter(),
+        "attrs": Counter(),
+        "values": {},
+    }
+
+
+def add_value(values: dict[str, set], path: str, value: int, max_values: int):
+    """Add a value hash to the distinct values of path (keeps at most max_values + 1)"""
+    seen = values.get(path)
+    if seen is None:
+        values[path] = {value}
+    elif len(seen) <= max_values:
+        seen.add(value)
+
+
+def walk(
+    xel: etree._Element,
+    path: str,
+    depth: int,
+    profile: dict,
+    doc_paths: set,
+    max_depth: Optional[int],
+    max_values: int,
+):
+    """Count xel and its descendants, every element is visited once"""
+    profile["elements"][path] += 1
+    doc_paths.add(path)
+    if len(xel.attrib):
+        profile["attrs"][(path, ",".join(sorted(get_name(key) for key in xel.attrib)))] += 1
+    has_children = False
+    for child in xel:
+        tag = child.tag
+        # comments and processing instructions
+        if not isinstance(tag, str):
+            continue
+        has_children = True
+        if max_depth is not None and depth >= max_depth:
+            # deep text markup is counted by its tag under the cut off path
+            child_path = f"{path.split('/...', 1)[0]}/.../{get_name(tag)}"
+        else:
+            child_path = f"{path}/{get_name(tag)}"
+        walk(child, child_path, depth + 1, profile, doc_paths, max_depth, max_values)
+    if not has_children:
+        text = xel.text
+        if text is not None and not text.isspace():
+            add_value(profile["values"], path, zlib.crc32(text.encode("utf-8")), max_values)
+
+
+def read_source(source: Source, root_path: Optional[Path]) -> bytes:
+    """xml bytes of a path relative to root_path or the xml itself"""
+    if isinstance(source, bytes):
+        return source
+    return (root_path / source).read_bytes()
+
+
+def profile_group(
+    group: list[tuple[int, Source]],
+    root_path: Optional[Path] = None,
+    max_depth: Optional[int] = None,
+    max_values: int = DEFAULT_MAX_VALUES,
+) -> dict[int, dict]:
+    """Merged profile of (congress_num, source) pairs by congress
+
+    This is a module level function so that it can be sent to worker processes.
+    """
+    profiles = {}
+    parser = xml_mod.get_parser(recover=False)
+    for congress_num, source in group:
+        profile = profiles.get(congress_num)
+        if profile is None:
+            profile = profiles[congress_num] = new_profile()
+        profile["docs"] += 1
+        with instrument_mod.step("profile") as sp:
+            try:
+                xml = read_source(source, root_path)
+                sp.nbytes = len(xml)
+                root = etree.fromstring(xml, parser=parser)
+            except (OSError, etree.XMLSyntaxError):
+                profile["errors"] += 1
+                continue
+            doc_paths = set()
+            walk(root, get_name(root.tag), 1, profile, doc_paths, max_depth, max_values)
+            profile["docs_with"].update(doc_paths)
+    return profiles
+
+
+def merge_profiles(total: dict[int, dict], profiles: dict[int, dict], max_values: int):
+    for congress_num, profile in profiles.items():
+        merged = total.get(congress_num)
+        if merged is None:
+            total[congress_num] = profile
+            continue
+        merged["docs"] += profile["docs"]
+        merged["errors"] += profile["errors"]
+        merged["elements"].update(profile["elements"])
+        merged["docs_with"].update(profile["docs_with"])
+        merged["attrs"].update(profile["attrs"])
+        for path, values in profile["values"].items():
+            seen = merged["values"].setdefault(path, set())
+            if len(seen) <= max_values:
+                seen.update(values)
+
+
+def iter_tree(
+    congress_scraper_path: Union[str, Path],
+    kind: str,
+    records: Optional[list[scan_mod.ScanRecord]] = None,
+) -> Iterator[tuple[int, str]]:
+    """(congress_num, path relative to congress_scraper_path) of the files of kind"""
+    if records is None:
+        records = scan_mod.scan(congress_scraper_path)
+    for record in records:
+        if record.kind == kind:
+            yield record.congress_num, record.scrape_path
+
+
+def iter_parquet(
+    fpaths: Iterable[Union[str, Path]], batch_size: int = 256
+) -> Iterator[tuple[int, bytes]]:
+    """(congress_num, xml bytes) of the rows of parquet exports
+
+    The congress comes from a congress_num column or the usc-<congress>-
+    file name, the xml from the first of XML_COLUMNS in the file.
+    """
+    for fpath in fpaths:
+        pf = pq.ParquetFile(fpath)
+        names = pf.schema_arrow.names
+        xml_col = next((col for col in XML_COLUMNS if col in names), None)
+        if xml_col is None:
+            raise ValueError(f"{fpath} has none of the columns {XML_COLUMNS}")
+        columns = [xml_col]
+        if "congress_num" in names:
+            columns.append("congress_num")
+            file_congress = None
+        elif match := re.match(r"usc-(\d+)-", Path(fpath).name):
+            file_congress = int(match.group(1))
+        else:
+            raise ValueError(f"no congress_num column or usc-<congress>- name in {fpath}")
+        for batch in pf.iter_batches(batch_size=batch_size, columns=columns):
+            xmls = batch.column(xml_col).to_pylist()
+            if file_congress is None:
+                congresses = batch.column("congress_num").to_pylist()
+            else:
+                congresses = [file_congress] * len(xmls)
+            for congress_num, xml in zip(congresses, xmls):
+                if xml is not None:
+                    yield int(congress_num), xml.encode("utf-8")
+
+
+def iter_groups(items: Iterable, group_size: int) -> Iterator[list]:
+    group = []
+    for item in items:
+        group.append(item)
+        if len(group) == group_size:
+            yield group
+            group = []
+    if group:
+        yield group
+
+
+def profile_corpus(
+    items: Iterable[tuple[int, Source]],
+    root_path: Optional[Union[str, Path]] = None,
+    workers: int = 1,
+    group_size: int = 64,
+    max_in_flight: int = 16,
+    max_depth: Optional[int] = None,
+    max_values: int = DEFAULT_MAX_VALUES,
+) -> dict[int, dict]:
+    """Profile documents by congress
+
+    Args:
+        items: (congress_num, source) pairs, a source is a path relative to
+            root_path or xml bytes (see iter_tree and iter_parquet)
+        root_path: congress-scraper root for path sources
+        workers: number of processes (1 means profile on the calling thread)
+        group_size: number of documents profiled and merged per task
+        max_in_flight: maximum number of groups submitted and not yet merged
+        max_depth: elements deeper than this are counted by tag under the
+            path of their ancestor at this depth (None for full paths)
+        max_values: stop counting distinct values of a path beyond this
+
+    Returns:
+        profile per congress (see new_profile)
+    """
+    fn = partial(
+        profile_group,
+        root_path=None if root_path is None else Path(root_path),
+        max_depth=max_depth,
+        max_values=max_values,
+    )
+    total = {}
+    with ExitStack() as stack:
+        executor = None
+        if workers > 1:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+        results = pipeline_mod.bounded_map(
+            fn,
+            iter_groups(items, group_size),
+            executor=executor,
+            max_in_flight=max_in_flight,
+            ordered=False,
+        )
+        for profiles in results:
+            merge_profiles(total, profiles, max_values)
+    return total
+
+
+def get_report(
+    profiles: dict[int, dict],
+    read_paths: Optional[set[str]] = None,
+    max_values: int = DEFAULT_MAX_VALUES,
+) -> dict:
+    """Compact json report of profile_corpus output
+
+    Per congress and path: elements, docs, distinct values ("1000+" past
+    max_values), attribute sets and, if read_paths is given, whether the
+    parser reads the path.
+    """
+    read_names = None
+    if read_paths is not None:
+        read_names = {"/".join(get_name(part) for part in split_path(path)) for path in read_paths}
+    report = {}
+    for congress_num in sorted(profiles):
+        profile = profiles[congress_num]
+        attrs = {}
+        for (path, names), count in profile["attrs"].items():
+            attrs.setdefault(path, {})[names] = count
+        paths = {}
+        for path in sorted(profile["elements"]):
+            entry = {
+                "elements": profile["elements"][path],
+                "docs": profile["docs_with"][path],
+            }
+            values = profile["values"].get(path)
+            if values is not None:
+                entry["values"] = len(values) if len(values) <= max_values else f"{max_values}+"
+            if path in attrs:
+                entry["attrs"] = attrs[path]
+            if read_names is not None:
+                entry["read"] = path in read_names
+            paths[path] = entry
+        report[str(congress_num)] = {
+            "docs": profile["docs"],
+            "errors": profile["errors"],
+            "paths": paths,
+        }
+    return report
+
+
+def split_path(path: str) -> list[str]:
+    """Path parts, keeping "/" inside {namespace} tags"""
+    return re.findall(r"(?:\{[^}]*\})?[^/]+", path)
+
+
+def print_report(report: dict, top: int = 30):
+    """Print paths per congress and the rarest paths that the parser does not read"""
+    has_read = any(
+        "read" in entry for item in report.values() for entry in item["paths"].values()
+    )
+    table = Table(title="profile by congress")
+    for col in ["congress", "docs", "errors", "paths", "unread paths"]:
+        table.add_column(col, justify="right")
+    unread = Counter()
+    unread_docs = Counter()
+    for congress_num, item in report.items():
+        nunread = 0
+        for path, entry in item["paths"].items():
+            if entry.get("read") is False:
+                nunread += 1
+                unread[path] += entry["elements"]
+                unread_docs[path] += entry["docs"]
+        table.add_row(
+            congress_num,
+            str(item["docs"]),
+            str(item["errors"]),
+            str(len(item["paths"])),
+            str(nunread) if has_read else "-",
+        )
+    rich.print(table)
+    if not unread:
+        return
+    table = Table(title=f"elements the parser does not read (rarest {top})")
+    for col in ["path", "docs", "elements"]:
+        table.add_column(col, justify="left" if col == "path" else "right")
+    for path, ndocs in sorted(unread_docs.items(), key=lambda kv: (kv[1], kv[0]))[:top]:
+        table.add_row(path, str(ndocs), str(unread[path]))
+    rich.print(table)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "sources",
+        nargs="+",
+        type=Path,
+        help="congress-scraper root (with data/) or parquet export files",
+    )
+    parser.add_argument("--kind", default=scan_mod.BILLSTATUS, choices=scan_mod.KINDS)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--group-size", type=int, default=64)
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument("--max-values", type=int, default=DEFAULT_MAX_VALUES)
+    parser.add_argument("--out", type=Path, default=None, help="json report path")
+    parser.add_argument("--top", type=int, default=30)
+    args = parser.parse_args()
+
+    root_path = None
+    if len(args.sources) == 1 and args.sources[0].is_dir():
+        root_path = args.sources[0]
+        items = iter_tree(root_path, args.kind)
+    else:
+        items = iter_parquet(args.sources)
+
+    with instrument_mod.stage("profile", workers=args.workers) as st:
+        profiles = profile_corpus(
+            items,
+            root_path=root_path,
+            workers=args.workers,
+            group_size=args.group_size,
+            max_depth=args.max_depth,
+            max_values=args.max_values,
+        )
+        st.items = sum(profile["docs"] for profile in profiles.values())
+    read_paths = (
+        bill_status_lxml_mod.get_read_paths() if args.kind == scan_mod.BILLSTATUS else None
+    )
+    report = get_report(profiles, read_paths, args.max_values)
+    print_report(report, args.top)
+    if args.out is not None:
+        with open(args.out, "w") as fp:
+            json.dump(report, fp, indent=1)
+        rich.print(f"wrote {args.out}")
@@ -0,0 +1,198 @@
+"""
+Walk the congress-scraper data tree once and classify the files we ingest.
+
+The walk uses os.scandir so each directory is listed exactly once and the
+file type information comes for free with the listing. Each xml file we care
+about becomes a ScanRecord paired with its *-lastmod.txt sibling. The listing
+can be written to a json lines manifest and read back by later stages instead
+of walking the tree again.
+"""
+
+import os
+from pathlib import Path
+import re
+from typing import Iterable, Iterator, Optional, Union
+
+from pydantic import BaseModel
+import rich
+
+from congress_prep import utils
+
+
+BILLSTATUS = "billstatus"
+BILLS_DTD = "bills-dtd"
+BILLS_USLM = "bills-uslm"
+PLAW = "plaw"
+TEXTVERSION_KINDS = (BILLS_DTD, BILLS_USLM, PLAW)
+KINDS = (BILLSTATUS, *TEXTVERSION_KINDS)
+
+
+class ScanRecord(BaseModel):
+    kind: str
+    scrape_path: str
+    lastmod_path: Optional[str] = None
+    file_name: str
+    legis_id: str
+    congress_num: int
+    legis_type: str
+    legis_num: int
+    legis_class: str
+    legis_version: Optional[str] = None
+    xml_type: Optional[str] = None
+    tv_id: Optional[str] = None
+
+
+def get_lastmod_name(file_name: str) -> str:
+    return file_name.split(".")[0] + "-lastmod.txt"
+
+
+def classify(scrape_path: str, lastmod_path: Optional[str]) -> Optional[ScanRecord]:
+    """Turn a path relative to the congress-scraper root into a ScanRecord
+
+    Returns None for xml files that are neither billstatus nor text versions.
+    """
+    file_name = scrape_path.rsplit("/", 1)[-1]
+
+    if file_name == "fdsys_billstatus.xml":
+        if (match := re.match(utils.BILLSTATUS_PATH_PATTERN, scrape_path)) is None:
+            return None
+        gd = match.groupdict()
+        return ScanRecord(
+            kind=BILLSTATUS,
+            scrape_path=scrape_path,
+            lastmod_path=lastmod_path,
+            file_name=file_name,
+            legis_id="{}-{}-{}".format(
+                gd["congress_num"], gd["legis_type"], gd["legis_num"]
+            ),
+            congress_num=gd["congress_num"],
+            legis_type=gd["legis_type"],
+            legis_num=gd["legis_num"],
+            legis_class=gd["legis_class"],
+        )
+
+    if "/uslm/" in scrape_path:
+        xml_type = "uslm"
+    else:
+        xml_type = "dtd"
+
+    if match := re.match(utils.TEXTVERSION_BILLS_PATTERN, file_name):
+        kind = BILLS_USLM if xml_type == "uslm" else BILLS_DTD
+        legis_class = "bills"
+        legis_version = match.groupdict()["legis_version"]
+
+    elif match := re.match(utils.TEXTVERSION_PLAW_PATTERN, file_name):
+        kind = PLAW
+        legis_class = "plaw"
+        legis_version = "plaw"
+
+    else:
+        return None
+
+    gd = match.groupdict()
+    return ScanRecord(
+        kind=kind,
+        scrape_path=scrape_path,
+        lastmod_path=lastmod_path,
+        file_name=file_name,
+        legis_id="{}-{}-{}".format(gd["congress_num"], gd["legis_type"], gd["legis_num"]),
+        congress_num=gd["congress_num"],
+        legis_type=gd["legis_type"],
+        legis_num=gd["legis_num"],
+        legis_class=legis_class,
+        legis_version=legis_version,
+        xml_type=xml_type,
+        tv_id="{}-{}-{}-{}-{}".format(
+            gd["congress_num"],
+            gd["legis_type"],
+            gd["legis_num"],
+            legis_version,
+            xml_type,
+        ),
+    )
+
+
+def scan(congress_scraper_path: Union[str, Path]) -> list[ScanRecord]:
+    """Walk congress_scraper_path/data once and classify every xml file
+
+    Args:
+        congress_scraper_path: should have "cache" and "data" as subdirectories
+
+    Returns:
+        records sorted by scrape_path so that runs over the same tree see
+        files in the same order
+    """
+    root = str(congress_scraper_path)
+    records = []
+    nskipped = 0
+    stack = [os.path.join(root, "data")]
+    while stack:
+        dir_path = stack.pop()
+        with os.scandir(dir_path) as it:
+            entries = list(it)
+        names = {entry.name for entry in entries}
+        rel_dir = os.path.relpath(dir_path, root).replace(os.sep, "/")
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+                continue
+            if not entry.name.endswith(".xml"):
+                continue
+            lastmod_name = get_lastmod_name(entry.name)
+            lastmod_path = (
+                f"{rel_dir}/{lastmod_name}" if lastmod_name in names else None
+            )
+            record = classify(f"{rel_dir}/{entry.name}", lastmod_path)
+            if record is None:
+                nskipped += 1
+                continue
+            records.append(record)
+
+    records.sort(key=lambda record: record.scrape_path)
+    rich.print(f"scanned {len(records)} xml files, skipped {nskipped} unrecognized")
+    return records
+
+
+def write_manifest(records: Iterable[ScanRecord], manifest_path: Union[str, Path]):
+    manifest_path = Path(manifest_path)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = manifest_path.with_suffix(manifest_path.suffix + ".tmp")
+    with open(tmp_path, "w") as fp:
+        for record in records:
+            fp.write(record.model_dump_json(exclude_none=True))
+            fp.write("\n")
+    os.replace(tmp_path, manifest_path)
+
+
+def read_manifest(manifest_path: Union[str, Path]) -> list[ScanRecord]:
+    with open(manifest_path) as fp:
+        return [ScanRecord.model_validate_json(line) for line in fp]
+
+
+def load_or_scan(
+    congress_scraper_path: Union[str, Path],
+    manifest_path: Optional[Union[str, Path]] = None,
+    rescan: bool = False,
+) -> list[ScanRecord]:
+    """Read the manifest if it exists, otherwise scan and write it
+
+    Args:
+        congress_scraper_path: should have "cache" and "data" as subdirectories
+        manifest_path: json lines file with one ScanRecord per line
+        rescan: walk the tree even if the manifest exists
+    """
+    if manifest_path is not None and Path(manifest_path).exists() and not rescan:
+        records = read_manifest(manifest_path)
+        rich.print(f"read {len(records)} records from {manifest_path}")
+        return records
+
+    records = scan(congress_scraper_path)
+    if manifest_path is not None:
+        write_manifest(records, manifest_path)
+        rich.print(f"wrote {len(records)} records to {manifest_path}")
+    return records
+
+
+def filter_kinds(records: Iterable[ScanRecord], kinds: Iterable[str]) -> Iterator[ScanRecord]:
+    kinds = set(kinds)
+    return (record for record in records if record.kind in kinds)
@@ -5,17 +5,19 @@ from collections import OrderedDict
 from collections import Counter
 import json
 from pathlib import Path
-import re
-from typing import Union
+from typing import Optional, Union
 
-from bs4 import BeautifulSoup
 import pandas as pd
 import rich
 from sqlalchemy import create_engine
+from sqlalchemy import Engine
 from sqlalchemy import text
 
-from congress_prep import utils
-from congress_prep.bill_status_mod import BillStatus
+from congress_prep import parse_cache_mod
+from congress_prep import pg_copy_mod
+from congress_prep import pipeline_mod
+from congress_prep import scan_mod
+from congress_prep import xml_mod
 
 
 sql_drop_billstatus = """
@@ -67,8 +69,58 @@ def reset_tables(conn_str: str, echo=False):
         conn.commit()
 
 
+def upsert_rows(
+    engine: Engine, table_name: str, key_col: str, rows: list[dict], use_copy: bool = False
+):
+    """Upsert one batch of rows that all have the same keys
+
+    Args:
+        engine: sqlalchemy engine
+        table_name: target table
+        key_col: primary key column used as the conflict target
+        rows: row dictionaries
+        use_copy: load with COPY and a staging table merge instead of executemany
+    """
+    cols = list(rows[0].keys())
+    with engine.connect() as conn:
+        if use_copy:
+            pg_copy_mod.copy_upsert_rows(conn, table_name, cols, [key_col], rows)
+        else:
+            pt1 = "({})".format(", ".join(cols))
+            pt2 = "({})".format(", ".join([f":{key}" for key in cols]))
+            pt3 = ", ".join(f"{key} = EXCLUDED.{key}" for key in cols)
+            sql = f"""
+            INSERT INTO {table_name} {pt1} VALUES {pt2}
+            ON CONFLICT ({key_col}) DO UPDATE SET
+            {pt3}
+            """
+            conn.execute(text(sql), rows)
+        conn.commit()
+
+
+def report_repairs(
+    label: str, repaired: list[dict], repair_log_path: Optional[Union[str, Path]]
+):
+    rich.print(f"repaired {len(repaired)} {label} files that were not well formed xml")
+    if repair_log_path is None:
+        return
+    with open(repair_log_path, "a") as fp:
+        for item in repaired:
+            fp.write(json.dumps(item) + "\n")
+
+
 def upsert_billstatus_xml(
-        congress_scraper_path: Union[str, Path], conn_str: str, batch_size: int = 1000, echo: bool=False
+        congress_scraper_path: Union[str, Path],
+        conn_str: str,
+        batch_size: int = 1000,
+        echo: bool=False,
+        records: Optional[list[scan_mod.ScanRecord]] = None,
+        use_copy: bool = False,
+        batch_bytes: Optional[int] = pipeline_mod.DEFAULT_BATCH_BYTES,
+        repair_log_path: Optional[Union[str, Path]] = None,
+        trusted: bool = False,
+        parse_cache_dir: Optional[Union[str, Path]] = None,
+        stream_min_bytes: Optional[int] = None,
 ):
     """Upsert billstatus xml files into postgres
 
@@ -76,75 +128,78 @@ def upsert_billstatus_xml(
         congress_scraper_path: should have "cache" and "data" as subdirectories
         conn_str: postgres connection string
         batch_size: number of billstatus files to upsert at once
+        records: output of scan_mod.load_or_scan (the tree is scanned if None)
+        use_copy: load batches with COPY and a staging table merge
+        batch_bytes: also flush a batch once its xml reaches this many bytes
+        repair_log_path: json lines file listing files that were not well
+            formed xml and had to be repaired
+        trusted: build bs_json without pydantic validation (see model_json_mod)
+        parse_cache_dir: parsed billstatus cache (see parse_cache_mod,
+            default $CONGRESS_PREP_PARSE_CACHE)
+        stream_min_bytes: parse files of at least this size with the
+            streaming parser (None for never, see parse_cache_mod.parse)
     """
 
-    data_path = Path(congress_scraper_path) / "data"
+    congress_scraper_path = Path(congress_scraper_path)
     engine = create_engine(conn_str, echo=echo)
-
-    rows = []
-    ibatch = 0
-
-    for path_object in data_path.rglob("fdsys_billstatus.xml"):
-        path_str = str(path_object.relative_to(congress_scraper_path))
-        if (match := re.match(utils.BILLSTATUS_PATH_PATTERN, path_str)) is None:
-            rich.print("billstatus oops: {}".format(path_object))
-            continue
-
-        lastmod_path = path_object.parent / "fdsys_billstatus-lastmod.txt"
-        lastmod_str = lastmod_path.read_text()
-        xml = path_object.read_text().strip()
-        soup = BeautifulSoup(xml, "xml")
-        xml_pretty = soup.prettify() # note this also fixes invalid xml that bs leniently parsed
-        bs = BillStatus.from_xml_str(xml)
-
-        row = OrderedDict({
-            "legis_id": "{}-{}-{}".format(
-                match.groupdict()["congress_num"],
-                match.groupdict()["legis_type"],
-                match.groupdict()["legis_num"],
-            ),
-            "congress_num": int(match.groupdict()["congress_num"]),
-            "legis_type": match.groupdict()["legis_type"],
-            "legis_num": int(match.groupdict()["legis_num"]),
-            "scrape_path": path_str,
-            "lastmod": lastmod_str,
-            "bs_xml": xml_pretty,
-            "bs_json": bs.model_dump_json(),
-        })
-        rows.append(row)
-
-        if len(rows) >= batch_size:
-            rich.print(f"upserting billstatus batch {ibatch} with {len(rows)} rows.")
-            pt1 = "({})".format(", ".join(row.keys()))
-            pt2 = "({})".format(", ".join([f":{key}" for key in row.keys()]))
-            pt3 = ", ".join(f"{key} = EXCLUDED.{key}" for key in row.keys())
-            sql = f"""
-            INSERT INTO billstatus {pt1} VALUES {pt2}
-            ON CONFLICT (legis_id) DO UPDATE SET
-            {pt3}
-            """
-            with engine.connect() as conn:
-                conn.execute(text(sql), rows)
-                conn.commit()
-
-            rows = []
-            ibatch += 1
-
-
-    if len(rows) > 0:
+    if records is None:
+        records = scan_mod.scan(congress_scraper_path)
+
+    repaired = []
+
+    def iter_rows():
+        for record in scan_mod.filter_kinds(records, [scan_mod.BILLSTATUS]):
+            if record.lastmod_path is None:
+                rich.print("billstatus oops: {}".format(record.scrape_path))
+                continue
+
+            lastmod_str = (congress_scraper_path / record.lastmod_path).read_text()
+            xml = (congress_scraper_path / record.scrape_path).read_text().strip()
+            norm = xml_mod.normalize_xml(xml)
+            if norm.repaired:
+                repaired.append({"scrape_path": record.scrape_path, "errors": norm.errors})
+            # streaming only lowers the peak memory if the normalized tree is dropped
+            root = None if parse_cache_mod.use_stream(norm.xml, stream_min_bytes) else norm.root
+            norm = norm._replace(root=None)
+            _, bs_json = parse_cache_mod.get_or_parse(
+                norm.xml,
+                parse_cache_dir,
+                trusted=trusted,
+                root=root,
+                stream_min_bytes=stream_min_bytes,
+            )
+            del root
+
+            row = OrderedDict({
+                "legis_id": record.legis_id,
+                "congress_num": record.congress_num,
+                "legis_type": record.legis_type,
+                "legis_num": record.legis_num,
+                "scrape_path": record.scrape_path,
+                "lastmod": lastmod_str,
+                "bs_xml": norm.xml,
+                "bs_json": bs_json,
+            })
+            yield row
+
+    batches = pipeline_mod.iter_batches(iter_rows(), batch_size, batch_bytes)
+    for ibatch, rows in enumerate(batches):
         rich.print(f"upserting billstatus batch {ibatch} with {len(rows)} rows.")
-        pt1 = "({})".format(", ".join(row.keys()))
-        pt2 = "({})".format(", ".join([f":{key}" for key in row.keys()]))
-        sql = f"""
-        INSERT INTO billstatus {pt1} VALUES {pt2}
-        """
-        with engine.connect() as conn:
-            conn.execute(text(sql), rows)
-            conn.commit()
+        upsert_rows(engine, "billstatus", "legis_id", rows, use_copy=use_copy)
+
+    report_repairs("billstatus", repaired, repair_log_path)
+    parse_cache_mod.evict(parse_cache_dir)
 
 
 def upsert_textversion_xml(
-        congress_scraper_path: Union[str, Path], conn_str: str, batch_size: int = 1000, echo: bool=False
+        congress_scraper_path: Union[str, Path],
+        conn_str: str,
+        batch_size: int = 1000,
+        echo: bool=False,
+        records: Optional[list[scan_mod.ScanRecord]] = None,
+        use_copy: bool = False,
+        batch_bytes: Optional[int] = pipeline_mod.DEFAULT_BATCH_BYTES,
+        repair_log_path: Optional[Union[str, Path]] = None,
 ):
     """Upsert textversion xml files into postgres
 
@@ -152,116 +207,60 @@ def upsert_textversion_xml(
         congress_scraper_path: should have "cache" and "data" as subdirectories
         conn_str: postgres connection string
         batch_size: number of billstatus files to upsert at once
+        records: output of scan_mod.load_or_scan (the tree is scanned if None)
+        use_copy: load batches with COPY and a staging table merge
+        batch_bytes: also flush a batch once its xml reaches this many bytes
+        repair_log_path: json lines file listing files that were not well
+            formed xml and had to be repaired
     """
 
-    data_path = Path(congress_scraper_path) / "data"
+    congress_scraper_path = Path(congress_scraper_path)
     engine = create_engine(conn_str, echo=echo)
+    if records is None:
+        records = scan_mod.scan(congress_scraper_path)
     missed = Counter()
 
-    rows = []
-    ibatch = 0
-
-    for path_object in data_path.rglob("*.xml"):
-        path_str = str(path_object.relative_to(congress_scraper_path))
-
-#        if path_str != "data/govinfo/BILLS/113/1/sconres/BILLS-113sconres13is.xml":
-#            continue
-
-        if "/uslm/" in path_str:
-            xml_type = "uslm"
-        else:
-            xml_type = "dtd"
-
-        if match := re.match(utils.TEXTVERSION_BILLS_PATTERN, path_object.name):
-            legis_class = "bills"
-            legis_version = match.groupdict()["legis_version"]
-
-        elif match := re.match(utils.TEXTVERSION_PLAW_PATTERN, path_object.name):
-            legis_class = "plaw"
-            legis_version = "plaw"
-
-        else:
-            missed[path_object.name] += 1
-            continue
-
-        lastmod_path = path_object.parent / (
-            path_object.name.split(".")[0] + "-lastmod.txt"
-        )
-        lastmod_str = lastmod_path.read_text()
-
-        xml = path_object.read_text().strip()
-        soup = BeautifulSoup(xml, "xml")
-        xml_pretty = soup.prettify() # note this also fixes invalid xml that bs leniently parsed
-
-        root_tags = [el.name for el in soup.contents if el.name]
-        if len(root_tags) != 1:
-            rich.print("more than one non null root tag: ", root_tags)
-        else:
-            root_tag = root_tags[0]
-            root_tag = root_tag.replace("{http://schemas.gpo.gov/xml/uslm}", "")
-
-
-        if root_tag not in ("bill", "resolution", "amendment-doc", "pLaw", "parse_failed"):
-            print(f"root tag not recognized: {root_tag}")
-
-        row = {
-            "tv_id": "{}-{}-{}-{}-{}".format(
-                match.groupdict()["congress_num"],
-                match.groupdict()["legis_type"],
-                match.groupdict()["legis_num"],
-                legis_version,
-                xml_type,
-            ),
-            "legis_id": "{}-{}-{}".format(
-                match.groupdict()["congress_num"],
-                match.groupdict()["legis_type"],
-                match.groupdict()["legis_num"],
-            ),
-            "congress_num": int(match.groupdict()["congress_num"]),
-            "legis_type": match.groupdict()["legis_type"],
-            "legis_num": int(match.groupdict()["legis_num"]),
-            "legis_version": legis_version,
-            "legis_class": legis_class,
-            "scrape_path": path_str,
-            "file_name": Path(path_str).name,
-            "lastmod": lastmod_str,
-            "xml_type": xml_type,
-            "root_tag": root_tag,
-            "tv_xml": xml_pretty,
-        }
-        rows.append(row)
-
-        if len(rows) >= batch_size:
-            rich.print(f"upserting textversion_xml batch {ibatch} with {len(rows)} rows.")
-            pt1 = "({})".format(", ".join(row.keys()))
-            pt2 = "({})".format(", ".join([f":{key}" for key in row.keys()]))
-            pt3 = ", ".join(f"{key} = EXCLUDED.{key}" for key in row.keys())
-            sql = f"""
-            INSERT INTO textversion_xml {pt1} VALUES {pt2}
-            ON CONFLICT (tv_id) DO UPDATE SET
-            {pt3}
-            """
-            with engine.connect() as conn:
-                conn.execute(text(sql), rows)
-                conn.commit()
-
-            rows = []
-            ibatch += 1
-
-
-    if len(rows) > 0:
+    repaired = []
+
+    def iter_rows():
+        for record in scan_mod.filter_kinds(records, scan_mod.TEXTVERSION_KINDS):
+            if record.lastmod_path is None:
+                missed[record.file_name] += 1
+                continue
+
+            lastmod_str = (congress_scraper_path / record.lastmod_path).read_text()
+            xml = (congress_scraper_path / record.scrape_path).read_text().strip()
+            norm = xml_mod.normalize_xml(xml)
+            if norm.repaired:
+                repaired.append({"scrape_path": record.scrape_path, "errors": norm.errors})
+            root_tag = xml_mod.get_root_tag(norm.root)
+
+            if root_tag not in ("bill", "resolution", "amendment-doc", "pLaw", "parse_failed"):
+                print(f"root tag not recognized: {root_tag}")
+
+            row = {
+                "tv_id": record.tv_id,
+                "legis_id": record.legis_id,
+                "congress_num": record.congress_num,
+                "legis_type": record.legis_type,
+                "legis_num": record.legis_num,
+                "legis_version": record.legis_version,
+                "legis_class": record.legis_class,
+                "scrape_path": record.scrape_path,
+                "file_name": record.file_name,
+                "lastmod": lastmod_str,
+                "xml_type": record.xml_type,
+                "root_tag": root_tag,
+                "tv_xml": norm.xml,
+            }
+            yield row
+
+    batches = pipeline_mod.iter_batches(iter_rows(), batch_size, batch_bytes)
+    for ibatch, rows in enumerate(batches):
         rich.print(f"upserting textversion_xml batch {ibatch} with {len(rows)} rows.")
-        pt1 = "({})".format(", ".join(row.keys()))
-        pt2 = "({})".format(", ".join([f":{key}" for key in row.keys()]))
-        pt3 = ", ".join(f"{key} = EXCLUDED.{key}" for key in row.keys())
-        sql = f"""
-        INSERT INTO textversion_xml {pt1} VALUES {pt2}
-        ON CONFLICT (tv_id) DO UPDATE SET
-        {pt3}
-        """
-        with engine.connect() as conn:
-            conn.execute(text(sql), rows)
-            conn.commit()
+        upsert_rows(engine, "textversion_xml", "tv_id", rows, use_copy=use_copy)
+
+    report_repairs("textversion_xml", repaired, repair_log_path)
 
     return missed
 
@@ -0,0 +1,360 @@
+"""
+Write a synthetic congress-scraper data tree for benchmarks.
+
+The layout matches what scan_mod and the path patterns in utils expect,
+
+  data/{congress}/bills/{type}/{type}{num}/fdsys_billstatus.xml
+  data/govinfo/BILLS/{congress}/{session}/{type}/BILLS-{congress}{type}{num}{version}.xml
+  data/govinfo/BILLS/{congress}/{session}/{type}/uslm/BILLS-...xml
+  data/govinfo/PLAW/{congress}/public/PLAW-{congress}publ{num}.xml
+
+each with a *-lastmod.txt sibling. Sizes follow long tailed (lognormal)
+distributions and a small fraction of bills are "omnibus" bills with
+hundreds to thousands of amendments, actions and cosponsors and multi MB
+text versions, which is what dominates memory and time on the real corpus.
+"""
+
+from collections import Counter
+import datetime
+from pathlib import Path
+import random
+from typing import Union
+from xml.sax.saxutils import escape
+
+import rich
+
+
+USLM_NS = "http://schemas.gpo.gov/xml/uslm"
+
+# (legis_type, weight, is_resolution)
+LEGIS_TYPES = [
+    ("hr", 0.55, False),
+    ("s", 0.30, False),
+    ("hres", 0.07, True),
+    ("sres", 0.04, True),
+    ("hjres", 0.02, False),
+    ("sjres", 0.01, False),
+    ("hconres", 0.005, True),
+    ("sconres", 0.005, True),
+]
+
+# (legis_version, probability that a bill has it)
+LEGIS_VERSIONS = [("ih", 1.0), ("rh", 0.15), ("rfs", 0.05), ("eh", 0.08), ("enr", 0.03)]
+
+WORDS = (
+    "the of and to in shall section such act secretary state federal program "
+    "amended by striking inserting fiscal year appropriated authorized funds "
+    "agency public law subsection paragraph united states congress"
+).split()
+
+
+def get_words(rng: random.Random, nwords: int) -> str:
+    return " ".join(rng.choices(WORDS, k=nwords))
+
+
+def get_size(
+    rng: random.Random, median: float, sigma: float, lo: int, hi: int
+) -> int:
+    return int(min(max(median * rng.lognormvariate(0, sigma), lo), hi))
+
+
+def get_datetime(rng: random.Random, year: int) -> datetime.datetime:
+    start = datetime.datetime(year, 1, 3)
+    return start + datetime.timedelta(seconds=rng.randrange(365 * 24 * 3600))
+
+
+def get_lastmod(rng: random.Random, year: int) -> str:
+    return get_datetime(rng, year + 1).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def action_xml(rng: random.Random, year: int) -> str:
+    date = get_datetime(rng, year).date().isoformat()
+    return (
+        f"<item><actionDate>{date}</actionDate>"
+        f"<text>{get_words(rng, rng.randint(5, 40))}</text><type>Floor</type>"
+        f"<actionCode>H{rng.randint(10000, 99999)}</actionCode>"
+        "<sourceSystem><code>2</code><name>House floor actions</name></sourceSystem>"
+        "</item>"
+    )
+
+
+def member_xml(rng: random.Random, tag_extra: str = "") -> str:
+    bioguide_id = "{}{:06d}".format(rng.choice("ABCDEFGHKLMPRSW"), rng.randrange(10**6))
+    return (
+        f"<item><bioguideId>{bioguide_id}</bioguideId>"
+        f"<fullName>Rep. Member {bioguide_id}</fullName>"
+        f"<firstName>First</firstName><lastName>{bioguide_id}</lastName>"
+        f"<party>{rng.choice('DRI')}</party><state>{rng.choice(['CA', 'TX', 'NY', 'LA'])}</state>"
+        f"<district>{rng.randint(1, 40)}</district>{tag_extra}</item>"
+    )
+
+
+def amendment_xml(
+    rng: random.Random, congress_num: int, year: int, legis_type: str, legis_num: int
+) -> str:
+    date = get_datetime(rng, year)
+    action_date = date.date().isoformat()
+    actions = "".join(
+        f"<item><actionDate>{action_date}</actionDate><text>{get_words(rng, 12)}</text>"
+        "<type>Floor</type>"
+        "<sourceSystem><code>2</code><name>House floor actions</name></sourceSystem>"
+        "</item>"
+        for _ in range(rng.randint(1, 4))
+    )
+    return (
+        f"<amendment><number>{rng.randint(1, 3000)}</number><congress>{congress_num}</congress>"
+        f"<type>HAMDT</type><description>{get_words(rng, 20)}</description>"
+        f"<purpose>{get_words(rng, 30)}</purpose>"
+        f"<updateDate>{date.strftime('%Y-%m-%dT%H:%M:%SZ')}</updateDate>"
+        f"<latestAction><actionDate>{action_date}</actionDate><text>Agreed to</text></latestAction>"
+        f"<sponsors>{member_xml(rng)}</sponsors>"
+        f"<submittedDate>{date.strftime('%Y-%m-%dT%H:%M:%SZ')}</submittedDate>"
+        "<chamber>House of Representatives</chamber>"
+        f"<amendedBill><congress>{congress_num}</congress><type>{legis_type.upper()}</type>"
+        "<originChamber>House</originChamber><originChamberCode>H</originChamberCode>"
+        f"<number>{legis_num}</number><title>Synthetic Act</title></amendedBill>"
+        f"<links/><actions><count>1</count><actions>{actions}</actions></actions>"
+        "</amendment>"
+    )
+
+
+def billstatus_xml(
+    rng: random.Random,
+    congress_num: int,
+    legis_type: str,
+    legis_num: int,
+    versions: list[str],
+    omnibus: bool = False,
+) -> str:
+    """One fdsys_billstatus.xml document that BillStatus.from_xml_str accepts"""
+    year = 1787 + 2 * congress_num
+    if omnibus:
+        nactions = get_size(rng, 150, 0.5, 50, 1_000)
+        ncosponsors = get_size(rng, 100, 0.5, 10, 400)
+        namendments = get_size(rng, 600, 0.6, 100, 3_000)
+    else:
+        nactions = get_size(rng, 6, 0.8, 1, 200)
+        ncosponsors = get_size(rng, 4, 1.2, 0, 300)
+        namendments = get_size(rng, 0.2, 2.0, 0, 50)
+
+    update_date = get_datetime(rng, year + 1).strftime("%Y-%m-%dT%H:%M:%SZ")
+    introduced = get_datetime(rng, year).date().isoformat()
+    actions = "".join(action_xml(rng, year) for _ in range(nactions))
+    cosponsors = "".join(
+        member_xml(
+            rng,
+            f"<sponsorshipDate>{introduced}</sponsorshipDate>"
+            f"<isOriginalCosponsor>{rng.choice(['True', 'False'])}</isOriginalCosponsor>",
+        )
+        for _ in range(ncosponsors)
+    )
+    amendments = "".join(
+        amendment_xml(rng, congress_num, year, legis_type, legis_num)
+        for _ in range(namendments)
+    )
+    text_versions = "".join(
+        f"<item><type>{version}</type><date>{update_date}</date><formats><item>"
+        f"<url>https://www.congress.gov/{congress_num}/bills/{legis_type}{legis_num}/"
+        f"BILLS-{congress_num}{legis_type}{legis_num}{version}.xml</url></item></formats></item>"
+        for version in versions
+    )
+    subjects = "".join(
+        f"<item><name>{get_words(rng, 2).title()}</name></item>"
+        for _ in range(rng.randint(0, 12))
+    )
+    title = escape(get_words(rng, rng.randint(4, 20)).capitalize())
+
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        "<billStatus><version>3.0.0</version><bill>"
+        f"<number>{legis_num}</number><updateDate>{update_date}</updateDate>"
+        f"<updateDateIncludingText>{update_date}</updateDateIncludingText>"
+        "<originChamber>House</originChamber><originChamberCode>H</originChamberCode>"
+        f"<type>{legis_type.upper()}</type><introducedDate>{introduced}</introducedDate>"
+        f"<congress>{congress_num}</congress>"
+        f"<actions>{actions}</actions>"
+        f"<sponsors>{member_xml(rng)}</sponsors>"
+        f"<cosponsors>{cosponsors}</cosponsors>"
+        "<policyArea><name>Energy</name></policyArea>"
+        f"<subjects><legislativeSubjects>{subjects}</legislativeSubjects></subjects>"
+        f"<title>{title}</title>"
+        "<titles><item><titleType>Display Title</titleType>"
+        f"<title>{title}</title></item></titles>"
+        f"<amendments>{amendments}</amendments>"
+        f"<textVersions>{text_versions}</textVersions>"
+        f"<latestAction><actionDate>{introduced}</actionDate><text>Introduced</text></latestAction>"
+        "</bill>"
+        '<dublinCore xmlns:dc="http://purl.org/dc/elements/1.1/">'
+        "<dc:format>text/xml</dc:format><dc:language>EN</dc:language>"
+        "<dc:rights>Pursuant to Title 17</dc:rights>"
+        "<dc:contributor>Congressional Research Service</dc:contributor>"
+        "<dc:description>This file contains bill summaries</dc:description>"
+        "</dublinCore></billStatus>\n"
+    )
+
+
+def sections_xml(rng: random.Random, nbytes: int, uslm: bool) -> str:
+    parts = []
+    size = 0
+    isection = 0
+    while size < nbytes:
+        isection += 1
+        paras = []
+        for ipara in range(rng.randint(1, 6)):
+            para = get_words(rng, rng.randint(20, 120))
+            size += len(para) + 60
+            if uslm:
+                paras.append(
+                    f'<paragraph><num value="{ipara + 1}">({ipara + 1})</num>'
+                    f"<content>{para}</content></paragraph>"
+                )
+            else:
+                paras.append(
+                    f"<paragraph><enum>({ipara + 1})</enum><text>{para}</text></paragraph>"
+                )
+        header = get_words(rng, 6).capitalize()
+        if uslm:
+            parts.append(
+                f'<section><num value="{isection}">SEC. {isection}.</num>'
+                f"<heading>{header}</heading>{''.join(paras)}</section>"
+            )
+        else:
+            parts.append(
+                f"<section><enum>{isection}.</enum><header>{header}</header>"
+                f"{''.join(paras)}</section>"
+            )
+    return "".join(parts)
+
+
+def textversion_xml(
+    rng: random.Random,
+    congress_num: int,
+    legis_type: str,
+    legis_num: int,
+    root_tag: str,
+    nbytes: int,
+    uslm: bool,
+) -> str:
+    """One dtd or uslm text version document of about nbytes"""
+    body = sections_xml(rng, nbytes, uslm)
+    official_title = get_words(rng, 20).capitalize()
+    if uslm:
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<{root_tag} xmlns="{USLM_NS}" xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            f"<meta><dc:title>{congress_num} {legis_type.upper()} {legis_num}</dc:title></meta>"
+            f"<preface><docNumber>{legis_num}</docNumber>"
+            f"<longTitle><officialTitle>{official_title}</officialTitle></longTitle></preface>"
+            f"<main>{body}</main></{root_tag}>\n"
+        )
+    body_tag = "resolution-body" if root_tag == "resolution" else "legis-body"
+    return (
+        '<?xml version="1.0"?>\n'
+        f'<!DOCTYPE {root_tag} PUBLIC "-//US Congress//DTDs/{root_tag}.dtd//EN" "{root_tag}.dtd">\n'
+        f"<{root_tag}><metadata><dublinCore><dc:title "
+        'xmlns:dc="http://purl.org/dc/elements/1.1/">synthetic</dc:title>'
+        "</dublinCore></metadata>"
+        f"<form><congress>{congress_num}th CONGRESS</congress>"
+        f"<legis-num>{legis_type.upper()} {legis_num}</legis-num>"
+        f"<official-title>{official_title}</official-title></form>"
+        f"<{body_tag}>{body}</{body_tag}></{root_tag}>\n"
+    )
+
+
+def write_with_lastmod(path: Path, text: str, lastmod: str) -> int:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    path.with_name(path.name.split(".")[0] + "-lastmod.txt").write_text(lastmod)
+    return len(text)
+
+
+def generate_tree(
+    congress_scraper_path: Union[str, Path],
+    nbills: int = 1000,
+    congress_nums: tuple[int, ...] = (118,),
+    seed: int = 0,
+    omnibus_fraction: float = 0.005,
+    median_text_bytes: int = 15_000,
+    max_text_bytes: int = 8_000_000,
+) -> Counter:
+    """Write a synthetic data/ tree under congress_scraper_path
+
+    Args:
+        congress_scraper_path: output directory ("data" is created inside)
+        nbills: number of bills per congress
+        congress_nums: congresses to generate
+        seed: random seed, the same arguments always write the same tree
+        omnibus_fraction: fraction of bills with huge billstatus and text files
+        median_text_bytes: median size of a text version
+        max_text_bytes: cap on the size of a text version
+
+    Returns:
+        counts of files and bytes written per kind
+    """
+    rng = random.Random(seed)
+    data_path = Path(congress_scraper_path) / "data"
+    counts = Counter()
+    types, weights, resolutions = zip(*LEGIS_TYPES)
+    is_resolution = dict(zip(types, resolutions))
+
+    for congress_num in congress_nums:
+        year = 1787 + 2 * congress_num
+        next_num = Counter()
+        nplaw = 0
+        for _ in range(nbills):
+            legis_type = rng.choices(types, weights)[0]
+            next_num[legis_type] += 1
+            legis_num = next_num[legis_type]
+            omnibus = rng.random() < omnibus_fraction
+            versions = [v for v, prob in LEGIS_VERSIONS if rng.random() < prob]
+            if omnibus and "enr" not in versions:
+                versions.append("enr")
+
+            path = (
+                data_path
+                / str(congress_num)
+                / "bills"
+                / legis_type
+                / f"{legis_type}{legis_num}"
+                / "fdsys_billstatus.xml"
+            )
+            xml = billstatus_xml(rng, congress_num, legis_type, legis_num, versions, omnibus)
+            counts["billstatus_bytes"] += write_with_lastmod(
+                path, xml, get_lastmod(rng, year)
+            )
+            counts["billstatus_files"] += 1
+
+            root_tag = "resolution" if is_resolution[legis_type] else "bill"
+            session = rng.choice([1, 2])
+            tv_dir = data_path / "govinfo" / "BILLS" / str(congress_num) / str(session) / legis_type
+            for version in versions:
+                if omnibus:
+                    nbytes = get_size(rng, max_text_bytes / 4, 0.5, 500_000, max_text_bytes)
+                else:
+                    nbytes = get_size(rng, median_text_bytes, 1.2, 500, max_text_bytes)
+                file_name = f"BILLS-{congress_num}{legis_type}{legis_num}{version}.xml"
+                for uslm, sub_dir in [(False, tv_dir), (True, tv_dir / "uslm")]:
+                    xml = textversion_xml(
+                        rng, congress_num, legis_type, legis_num, root_tag, nbytes, uslm
+                    )
+                    kind = "bills_uslm" if uslm else "bills_dtd"
+                    counts[f"{kind}_bytes"] += write_with_lastmod(
+                        sub_dir / file_name, xml, get_lastmod(rng, year)
+                    )
+                    counts[f"{kind}_files"] += 1
+
+            if "enr" in versions and not is_resolution[legis_type]:
+                nplaw += 1
+                path = (
+                    data_path / "govinfo" / "PLAW" / str(congress_num) / "public"
+                    / f"PLAW-{congress_num}publ{nplaw}.xml"
+                )
+                xml = textversion_xml(
+                    rng, congress_num, legis_type, legis_num, "pLaw",
+                    get_size(rng, median_text_bytes, 1.0, 500, max_text_bytes), uslm=True,
+                )
+                counts["plaw_bytes"] += write_with_lastmod(path, xml, get_lastmod(rng, year))
+                counts["plaw_files"] += 1
+
+    rich.print(f"wrote synthetic tree to {data_path}: {dict(counts)}")
+    return counts
@@ -2,17 +2,22 @@ from __future__ import annotations
 from collections import Counter
 import datetime
 from pathlib import Path
-from typing import Optional
+import re
+from typing import Optional, Union
 import xml.etree.ElementTree as ET
 from xml.etree.ElementTree import Element
 
-from unstructured.partition.xml import partition_xml
-from unstructured.cleaners.core import clean
-from unstructured.cleaners.core import group_broken_paragraphs
 from bs4 import BeautifulSoup
+from lxml import etree
 import pandas as pd
 from pydantic import BaseModel
 
+from congress_prep import xml_mod
+
+
+# runs of two or more spaces
+SPACE_RUN = re.compile(" {2,}")
+
 
 def get_text_or_none(xel: Optional[Element] = None) -> Optional[str]:
     return xel.text if xel is not None else None
@@ -148,19 +153,33 @@ def get_bill_text_v3(
     return text
 
 
+def clean_whitespace(text: str) -> str:
+    """Drop tabs, make newlines and no-break spaces spaces, collapse spaces, strip
+
+    Gives the same string as removing tabs and then calling
+    unstructured.cleaners.core.clean(text, extra_whitespace=True), which
+    get_bill_text_v4 used to do, without importing unstructured. The
+    str.replace calls are single C level scans and the regex only runs
+    when there is a run of spaces to collapse.
+    """
+    text = text.replace("\t", "").replace("\xa0", " ").replace("\n", " ")
+    if "  " in text:
+        text = SPACE_RUN.sub(" ", text)
+    return text.strip()
+
+
 def get_bill_text_v4(xml: str):
+    return get_bill_text_v4_from_soup(BeautifulSoup(xml, "xml"))
 
-    soup = BeautifulSoup(xml, "xml")
+
+def get_bill_text_v4_from_soup(soup: BeautifulSoup):
     main_keys = [ch.name for ch in soup.children if ch.name]
     assert len(main_keys) == 1
     main_key = main_keys[0]
     name_text_children = [
         (
             child.name,
-            clean(
-                child.get_text(separator=" ").strip().replace("\t", ""),
-                extra_whitespace=True,
-            ),
+            clean_whitespace(child.get_text(separator=" ").strip()),
         )
         for child in soup.find(main_key)
         if (
@@ -173,13 +192,83 @@ def get_bill_text_v4(xml: str):
     return text
 
 
+# BeautifulSoup stores a string made only of these characters as "\n" (if it
+# has one) or " " (see BeautifulSoup.endData)
+SOUP_SPACES = "\x20\x0a\x09\x0c\x0d"
+
+
+def get_soup_strings(xel: etree._Element) -> list[str]:
+    """Text nodes of xel as get_text in BeautifulSoup sees them"""
+    return [
+        string if string.strip(SOUP_SPACES) else ("\n" if "\n" in string else " ")
+        for string in xel.itertext()
+    ]
+
+
+def parse_textversion(xml: Union[str, bytes]) -> etree._Element:
+    """Root element of a text version for get_bill_text_v5_from_root
+
+    Uses the recovering parser with entities resolved, the libxml2 settings
+    of the BeautifulSoup "xml" parser.
+
+    Raises:
+        ValueError: if not even the recovering parser finds a root element
+    """
+    if isinstance(xml, str):
+        xml = xml.encode("utf-8")
+    root = etree.fromstring(xml, parser=xml_mod.get_parser(recover=True, resolve_entities=True))
+    if root is None:
+        raise ValueError("no root element found")
+    return root
+
+
+def get_bill_text_v5(xml: Union[str, bytes]) -> str:
+    """Same text as get_bill_text_v4 from an lxml tree instead of a soup"""
+    return get_bill_text_v5_from_root(parse_textversion(xml))
+
+
+def get_bill_text_v5_from_root(root: etree._Element) -> str:
+    """Text of the non empty children of root except metadata, joined by blank lines
+
+    child.itertext() yields the same strings as child.get_text() in v4, in
+    the same order, without comments and processing instructions. The only
+    difference is that BeautifulSoup collapses whitespace only strings,
+    which changes the cleaned text only if they contain carriage returns or
+    form feeds, so those children go through get_soup_strings. With a root
+    from parse_textversion and each child cleaned as in v4, the result is
+    the same string.
+    """
+    texts = []
+    for child in root:
+        tag = child.tag
+        if not isinstance(tag, str) or tag == "metadata" or tag.endswith("}metadata"):
+            continue
+        text = " ".join(child.itertext())
+        if "\r" in text or "\f" in text:
+            text = " ".join(get_soup_strings(child))
+        text = text.strip()
+        if text:
+            texts.append(clean_whitespace(text))
+    return "\n\n".join(texts)
+
+
+# text extractors by version (textversions.extractor_version), add a new
+# version whenever the extracted text changes. EXTRACTOR_VERSION is the one
+# the ingest uses (get_bill_text_v5_from_root on its lxml tree).
+TEXT_EXTRACTORS = {"v4": get_bill_text_v4, "v5": get_bill_text_v5}
+EXTRACTOR_VERSION = "v5"
+
+
 def count_tags(xmls: list[str]) -> Counter:
+    """Count the child tag sequences of the root of each document
+
+    For a whole corpus use profile_mod, which profiles every element path
+    in parallel.
+    """
     tags = Counter()
     for xml in xmls:
         root = ET.fromstring(xml)
         tt = tuple([xel.tag for xel in root])
-        if "{http://schemas.gpo.gov/xml/uslm}meta" in tt:
-            sys.exit(0)
         tags[tt] += 1
     return tags
 
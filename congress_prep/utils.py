@@ -1,3 +1,7 @@
+from contextlib import contextmanager
+import datetime
+import gc
+import hashlib
 import re
 import pandas as pd
 
@@ -31,6 +35,59 @@ TEXTVERSION_PLAW_PATTERN = re.compile(
     """, re.VERBOSE
 )
 
+def parse_iso_datetime(value: str) -> datetime.datetime:
+    """Parse an ISO 8601 datetime, also with a "Z" suffix.
+
+    datetime.fromisoformat only accepts "Z" from python 3.11 on, and both
+    the lastmod files and pydantic's json datetimes use it.
+    """
+    value = value.strip()
+    if value.endswith(("Z", "z")):
+        value = value[:-1] + "+00:00"
+    return datetime.datetime.fromisoformat(value)
+
+
+def parse_lastmod(lastmod_str: str) -> datetime.datetime:
+    """Parse the contents of a *-lastmod.txt file.
+
+    The lastmod columns are "timestamp without time zone" and postgres drops
+    any offset in the input string, so we do the same here to make values
+    read from disk comparable with values read from the database.
+    """
+    return parse_iso_datetime(lastmod_str).replace(tzinfo=None)
+
+
+def get_content_hash(*parts: str) -> str:
+    """sha256 hex digest of one or more strings.
+
+    Used for the content_hash columns. Parts are separated by a NUL byte so
+    that ("ab", "c") and ("a", "bc") hash differently.
+    """
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(part.encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+@contextmanager
+def gc_paused():
+    """Pause the cyclic garbage collector for the block.
+
+    Building a large element tree and its dicts allocates hundreds of
+    thousands of objects, which triggers repeated full collections that
+    traverse every one of them. None of these objects form reference cycles,
+    so reference counting frees them and the collector has nothing to do.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
 def metadata_from_unified_row(urow: pd.Series):
     if len(urow["text_versions"]) == 0:
         return {}
@@ -0,0 +1,235 @@
+"""
+Compile declarative xml field maps into single pass extractors.
+
+A field map says where each field of a pydantic model comes from,
+
+  COSPONSOR_FIELDS = xml_extract_mod.from_model(Cosponsor)
+  NOTE_FIELDS = xml_extract_mod.from_model(
+      Note, links=xml_extract_mod.many(LINK_FIELDS, item_tag="link")
+  )
+
+from_model derives it from the model fields: scalar fields are the text of
+the child whose tag is the camelCase field name (action_date ->
+actionDate), model fields are a nested element and list[model] fields
+are a container of <item> elements. Keyword arguments override single
+fields (another tag, item tag or nested map, a custom getter) or drop
+them (None).
+
+compile_fields turns a field map into a function element -> field dict
+that looks up each child tag in one dict and visits every child element
+once, instead of one find per field. The first child with a tag wins,
+like find. Fields without a child are None, [] for lists, or what a
+custom getter returns for None.
+"""
+
+from typing import Any, Callable, NamedTuple, Optional, Union, get_args, get_origin
+import inspect
+import types
+
+from lxml import etree
+from pydantic import BaseModel
+
+
+Extractor = Callable[[etree._Element], Any]
+
+TEXT = "text"
+ONE = "one"
+MANY = "many"
+CUSTOM = "custom"
+CHECK = "check"
+
+
+class Field(NamedTuple):
+    kind: str
+    tag: Optional[str] = None
+    fields: Optional[dict[str, "Field"]] = None
+    fn: Optional[Callable] = None
+    item_tag: str = "item"
+    empty_is_none: bool = False
+
+
+def text(tag: Optional[str] = None) -> Field:
+    """Text of a child element"""
+    return Field(TEXT, tag)
+
+
+def one(
+    fields: dict[str, Field], tag: Optional[str] = None, empty_is_none: bool = False
+) -> Field:
+    """Field dict of a child element (None if empty_is_none and it has no children)"""
+    return Field(ONE, tag, fields, empty_is_none=empty_is_none)
+
+
+def many(
+    fields: dict[str, Field],
+    tag: Optional[str] = None,
+    item_tag: str = "item",
+    skip: Optional[Callable[[etree._Element], bool]] = None,
+    empty_is_none: bool = False,
+) -> Field:
+    """Field dicts of the item_tag children of a child element
+
+    Items for which skip(item) is true are left out, and so are items
+    without children if empty_is_none.
+    """
+    return Field(MANY, tag, fields, skip, item_tag, empty_is_none)
+
+
+def custom(fn: Callable[[Optional[etree._Element]], Any], tag: Optional[str] = None) -> Field:
+    """fn of a child element (called with None if there is no such child)"""
+    return Field(CUSTOM, tag, fn=fn)
+
+
+def check(fn: Callable[[etree._Element], None], tag: str) -> Field:
+    """Call fn on a child element to validate it, nothing is stored"""
+    return Field(CHECK, tag, fn=fn)
+
+
+def to_xml_tag(name: str) -> str:
+    """camelCase tag of a snake_case field name"""
+    first, *rest = name.split("_")
+    return first + "".join(part.capitalize() for part in rest)
+
+
+def get_default_field(tp: Any) -> Field:
+    origin = get_origin(tp)
+    if origin is Union or origin is types.UnionType:
+        args = [arg for arg in get_args(tp) if arg is not type(None)]
+        if len(args) != 1:
+            raise TypeError(f"no default xml field for {tp}")
+        return get_default_field(args[0])
+    if origin is list:
+        (item_tp,) = get_args(tp)
+        if inspect.isclass(item_tp) and issubclass(item_tp, BaseModel):
+            return many(from_model(item_tp))
+        raise TypeError(f"no default xml field for {tp}")
+    if inspect.isclass(tp) and issubclass(tp, BaseModel):
+        return one(from_model(tp))
+    return text()
+
+
+def from_model(model: type[BaseModel], **overrides: Optional[Field]) -> dict[str, Field]:
+    """Field map of model (overrides replace or, with None, drop fields)"""
+    fields = {}
+    for name, info in model.model_fields.items():
+        if name in overrides:
+            field = overrides.pop(name)
+            if field is not None:
+                fields[name] = field
+        else:
+            fields[name] = get_default_field(info.annotation)
+    # checks and other entries that are not model fields
+    fields.update({name: field for name, field in overrides.items() if field is not None})
+    return fields
+
+
+def compile_many(field: Field) -> Extractor:
+    get_item = compile_fields(field.fields, field.empty_is_none)
+    item_tag = field.item_tag
+    skip = field.fn
+    if skip is None and not field.empty_is_none:
+        return lambda xel: [get_item(item) for item in xel.iterchildren(item_tag)]
+
+    def get_items(xel: etree._Element) -> list:
+        result = []
+        for item in xel.iterchildren(item_tag):
+            if skip is not None and skip(item):
+                continue
+            value = get_item(item)
+            if value is not None:
+                result.append(value)
+        return result
+
+    return get_items
+
+
+def compile_field(field: Field) -> Optional[Extractor]:
+    """Extractor of one field from its child element (None for text)"""
+    if field.kind == TEXT:
+        return None
+    if field.kind == ONE:
+        return compile_fields(field.fields, field.empty_is_none)
+    if field.kind == MANY:
+        return compile_many(field)
+    if field.kind in (CUSTOM, CHECK):
+        return field.fn
+    raise ValueError(f"unknown field kind {field.kind}")
+
+
+def compile_fields(fields: dict[str, Field], empty_is_none: bool = False) -> Extractor:
+    """Function element -> field dict that visits each child element once
+
+    Args:
+        fields: field map (see from_model)
+        empty_is_none: return None for elements without children
+    """
+    # child tag -> (field name, extractor or None for the text)
+    handlers = {}
+    # fields that get a value when their child is missing
+    missing = []
+    for name, field in fields.items():
+        tag = field.tag or to_xml_tag(name)
+        if tag in handlers:
+            raise ValueError(f"fields {handlers[tag][0]} and {name} both read <{tag}>")
+        handlers[tag] = (name, compile_field(field))
+        if field.kind == MANY:
+            missing.append((name, list))
+        elif field.kind == CUSTOM:
+            missing.append((name, lambda fn=field.fn: fn(None)))
+        elif field.kind != CHECK:
+            missing.append((name, None))
+    check_names = tuple(name for name, field in fields.items() if field.kind == CHECK)
+
+    def extract(xel: etree._Element) -> Optional[dict]:
+        if empty_is_none and len(xel) == 0:
+            return None
+        result = {}
+        for child in xel:
+            handler = handlers.get(child.tag)
+            if handler is None:
+                continue
+            name, get_value = handler
+            if name in result:
+                continue
+            result[name] = child.text if get_value is None else get_value(child)
+        if len(result) < len(handlers):
+            for name, get_default in missing:
+                if name not in result:
+                    result[name] = None if get_default is None else get_default()
+        for name in check_names:
+            result.pop(name, None)
+        return result
+
+    return extract
+
+
+def compile_section(field: Field) -> Callable[[Optional[etree._Element]], Any]:
+    """Extractor of a field from its (possibly missing) element"""
+    get_value = compile_field(field)
+    if field.kind == TEXT:
+        return lambda xel: None if xel is None else xel.text
+    if field.kind == MANY:
+        return lambda xel: [] if xel is None else get_value(xel)
+    if field.kind == CUSTOM:
+        return get_value
+    return lambda xel: None if xel is None else get_value(xel)
+
+
+def get_paths(fields: dict[str, Field], prefix: str) -> set[str]:
+    """Element paths (prefix/tag/...) that a field map reads
+
+    Custom getters and checks add only the path of their own element.
+    """
+    paths = set()
+    for name, field in fields.items():
+        path = f"{prefix}/{field.tag or to_xml_tag(name)}"
+        if field.kind == CHECK:
+            continue
+        paths.add(path)
+        if field.kind == ONE:
+            paths.update(get_paths(field.fields, path))
+        elif field.kind == MANY:
+            item_path = f"{path}/{field.item_tag}"
+            paths.add(item_path)
+            paths.update(get_paths(field.fields, item_path))
+    return paths
@@ -0,0 +1,140 @@
+"""
+Parse and repair legislation xml with lxml.
+
+Most files are well formed and go through the strict parser untouched. The
+few that are not (unescaped ampersands, truncated downloads, ...) are parsed
+again with lxml's recovering parser and re-serialized, which yields well
+formed xml in a single C level pass instead of a BeautifulSoup prettify.
+The parsed tree is returned alongside the text so callers can read the root
+tag and build models from it without parsing again.
+"""
+
+from pathlib import Path
+import threading
+from typing import Iterable, NamedTuple, Optional, Union
+
+from lxml import etree
+
+
+SNIFF_CHUNK_SIZE = 512
+
+# lxml parser objects must not be shared between threads
+_local = threading.local()
+
+
+def get_parser(recover: bool, resolve_entities: bool = False) -> etree.XMLParser:
+    """Thread local parser
+
+    Args:
+        recover: use lxml's recovering parser
+        resolve_entities: replace internal entities and drop undefined ones
+            (the lxml default, like the BeautifulSoup "xml" parser) instead of
+            keeping them as entity nodes
+    """
+    name = "recover_parser" if recover else "strict_parser"
+    if resolve_entities:
+        name += "_resolving"
+    parser = getattr(_local, name, None)
+    if parser is None:
+        parser = etree.XMLParser(
+            recover=recover,
+            huge_tree=True,
+            resolve_entities="internal" if resolve_entities else False,
+            no_network=True,
+        )
+        setattr(_local, name, parser)
+    return parser
+
+
+class NormalizedXml(NamedTuple):
+    root: etree._Element
+    xml: str
+    repaired: bool
+    errors: list[str]
+
+
+def normalize_xml(xml: str) -> NormalizedXml:
+    """Parse xml and repair it if it is not well formed
+
+    Args:
+        xml: document text (may start with an xml declaration)
+
+    Returns:
+        NormalizedXml with the parsed root element, well formed xml text
+        (the input itself if no repair was needed, else the whole repaired
+        document with an xml declaration), whether a repair was needed and
+        the parser errors that triggered it
+
+    Raises:
+        ValueError: if not even the recovering parser finds a root element
+    """
+    data = xml.encode("utf-8")
+    try:
+        root = etree.fromstring(data, parser=get_parser(recover=False))
+        return NormalizedXml(root=root, xml=xml, repaired=False, errors=[])
+    except etree.XMLSyntaxError:
+        pass
+
+    parser = get_parser(recover=True)
+    root = etree.fromstring(data, parser=parser)
+    errors = [f"{err.line}:{err.column} {err.message}" for err in parser.error_log]
+    if root is None:
+        raise ValueError(f"no root element found: {errors[:3]}")
+    # serialize the document, not just the root, to keep the xml declaration,
+    # DOCTYPE and processing instructions (e.g. xml-stylesheet) around it
+    repaired_xml = etree.tostring(
+        root.getroottree(), xml_declaration=True, encoding="UTF-8"
+    ).decode("utf-8")
+    return NormalizedXml(
+        root=root,
+        xml=repaired_xml,
+        repaired=True,
+        errors=errors,
+    )
+
+
+def get_root_tag(root: etree._Element) -> str:
+    """Root tag without a namespace (e.g. uslm "bill" or dtd "pLaw")"""
+    return etree.QName(root).localname
+
+
+def sniff_root_tag_from_chunks(chunks: Iterable[Union[str, bytes]]) -> Optional[str]:
+    """Root tag from the prolog and first start tag only
+
+    Feeds chunks to an incremental parser and stops at the first start
+    event, so the cost does not depend on the document size and errors after
+    the first start tag do not matter.
+
+    Returns:
+        namespace free root tag or None if no start tag could be parsed
+    """
+    parser = etree.XMLPullParser(
+        events=("start",),
+        huge_tree=True,
+        resolve_entities=False,
+        no_network=True,
+        load_dtd=False,
+    )
+    try:
+        for chunk in chunks:
+            parser.feed(chunk)
+            for _, root in parser.read_events():
+                return etree.QName(root).localname
+    except etree.XMLSyntaxError:
+        return None
+    return None
+
+
+def sniff_root_tag(xml: Union[str, bytes], chunk_size: int = SNIFF_CHUNK_SIZE) -> Optional[str]:
+    """Root tag of an in memory document (see sniff_root_tag_from_chunks)"""
+    return sniff_root_tag_from_chunks(
+        xml[start : start + chunk_size] for start in range(0, len(xml), chunk_size)
+    )
+
+
+def sniff_root_tag_from_path(
+    path: Union[str, Path], chunk_size: int = SNIFF_CHUNK_SIZE
+) -> Optional[str]:
+    """Root tag of a file, reading only as much of it as needed"""
+    with open(path, "rb") as fp:
+        return sniff_root_tag_from_chunks(iter(lambda: fp.read(chunk_size), b""))
@@ -0,0 +1,148 @@
+"""
+Compare BillStatus parse speed of ElementTree + find and the lxml single pass parser.
+
+Typical bills are small, so the interesting case is the omnibus bills with
+hundreds of cosponsors and thousands of actions and amendments. Both are
+generated with synthetic_mod (or read from a directory of real files).
+
+The second table times what the billstatus ingest does per file, xml to a
+bs_json dict and its json string, in strict mode (validate, model_dump_json,
+json.loads) and in trusted mode (model_json_mod, no validation).
+
+The third table times a full parse against a parse of only the sections
+that the vector store exports read (bill_status_lxml_mod.METADATA_SECTIONS,
+or --sections).
+
+python scripts/bench_bill_status.py
+python scripts/bench_bill_status.py --path /data/congress-scraper/data/117/bills/hr
+"""
+
+import argparse
+from functools import partial
+import json
+from pathlib import Path
+import random
+import time
+
+import rich
+from rich.table import Table
+
+from congress_prep import bill_status_lxml_mod
+from congress_prep import model_json_mod
+from congress_prep import synthetic_mod
+from congress_prep.bill_status_mod import BillStatus
+
+
+def get_synthetic(nbills: int, omnibus: bool, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        synthetic_mod.billstatus_xml(rng, 118, "hr", legis_num, ["ih", "eh"], omnibus=omnibus)
+        for legis_num in range(1, nbills + 1)
+    ]
+
+
+def to_json_strict(xml: str) -> tuple[dict, str]:
+    json_str = bill_status_lxml_mod.from_xml_str(xml).model_dump_json()
+    return json.loads(json_str), json_str
+
+
+def to_json_trusted(xml: str) -> tuple[dict, str]:
+    json_dict = bill_status_lxml_mod.json_from_xml_str(xml)
+    return json_dict, model_json_mod.to_json_str(json_dict)
+
+
+def time_parser(fn, xmls: list[str], repeat: int) -> float:
+    """Best of repeat runs over all documents"""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for xml in xmls:
+            fn(xml)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", type=Path, default=None)
+    parser.add_argument("--nbills", type=int, default=200)
+    parser.add_argument("--nomnibus", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--sections",
+        default=",".join(bill_status_lxml_mod.METADATA_SECTIONS),
+        help="comma separated sections for the selective parse",
+    )
+    args = parser.parse_args()
+
+    if args.path is not None:
+        corpora = {
+            str(args.path): [
+                fpath.read_text().strip()
+                for fpath in sorted(args.path.rglob("fdsys_billstatus.xml"))
+            ]
+        }
+    else:
+        corpora = {
+            "typical": get_synthetic(args.nbills, False, args.seed),
+            "omnibus": get_synthetic(args.nomnibus, True, args.seed),
+        }
+
+    table = Table(title="BillStatus.from_xml_str")
+    for col in ["corpus", "files", "MB", "etree s", "lxml s", "speedup", "lxml MB/s"]:
+        table.add_column(col, justify="right")
+    for name, xmls in corpora.items():
+        mb = sum(len(xml) for xml in xmls) / 1e6
+        dt_ref = time_parser(BillStatus.from_xml_str_etree, xmls, args.repeat)
+        dt_new = time_parser(bill_status_lxml_mod.from_xml_str, xmls, args.repeat)
+        table.add_row(
+            name,
+            str(len(xmls)),
+            f"{mb:.1f}",
+            f"{dt_ref:.3f}",
+            f"{dt_new:.3f}",
+            f"{dt_ref / dt_new:.2f}x",
+            f"{mb / dt_new:.1f}",
+        )
+    rich.print(table)
+
+    table = Table(title="xml -> bs_json")
+    for col in ["corpus", "files", "MB", "strict s", "trusted s", "speedup", "trusted MB/s"]:
+        table.add_column(col, justify="right")
+    for name, xmls in corpora.items():
+        mb = sum(len(xml) for xml in xmls) / 1e6
+        dt_ref = time_parser(to_json_strict, xmls, args.repeat)
+        dt_new = time_parser(to_json_trusted, xmls, args.repeat)
+        table.add_row(
+            name,
+            str(len(xmls)),
+            f"{mb:.1f}",
+            f"{dt_ref:.3f}",
+            f"{dt_new:.3f}",
+            f"{dt_ref / dt_new:.2f}x",
+            f"{mb / dt_new:.1f}",
+        )
+    rich.print(table)
+
+    sections = args.sections.split(",")
+    table = Table(title=f"sections {sections}")
+    for col in ["corpus", "files", "MB", "full s", "sections s", "speedup", "sections MB/s"]:
+        table.add_column(col, justify="right")
+    for name, xmls in corpora.items():
+        mb = sum(len(xml) for xml in xmls) / 1e6
+        dt_ref = time_parser(bill_status_lxml_mod.from_xml_str, xmls, args.repeat)
+        dt_new = time_parser(
+            partial(bill_status_lxml_mod.from_xml_str, sections=sections), xmls, args.repeat
+        )
+        table.add_row(
+            name,
+            str(len(xmls)),
+            f"{mb:.1f}",
+            f"{dt_ref:.3f}",
+            f"{dt_new:.3f}",
+            f"{dt_ref / dt_new:.2f}x",
+            f"{mb / dt_new:.1f}",
+        )
+    rich.print(table)
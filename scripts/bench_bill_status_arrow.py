@@ -0,0 +1,115 @@
+"""
+Check and time the billstatus xml -> Arrow converter of bill_status_arrow_mod.
+
+Parity: every row of the record batch must equal BillStatus.model_dump() of
+the strict parser (dates and datetimes compare as python objects).
+
+Timing: the converter against the path of the HF export without the
+database round trip, BillStatus.from_xml_str -> model_dump_json ->
+json.loads -> pandas object column -> pa.Table.from_pandas.
+
+python scripts/bench_bill_status_arrow.py
+python scripts/bench_bill_status_arrow.py --path /data/congress-scraper/data/117/bills/hr
+"""
+
+import argparse
+import json
+from pathlib import Path
+import random
+import sys
+import time
+
+import pandas as pd
+import pyarrow as pa
+import rich
+from rich.table import Table
+
+from congress_prep import bill_status_arrow_mod
+from congress_prep import synthetic_mod
+from congress_prep.bill_status_mod import BillStatus
+
+
+def get_synthetic(nbills: int, omnibus: bool, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        synthetic_mod.billstatus_xml(rng, 118, "hr", legis_num, ["ih", "eh"], omnibus=omnibus)
+        for legis_num in range(1, nbills + 1)
+    ]
+
+
+def via_pandas(xmls: list[str]) -> pa.Table:
+    df = pd.DataFrame(
+        {"bs_json": [json.loads(BillStatus.from_xml_str(xml).model_dump_json()) for xml in xmls]}
+    )
+    return pa.Table.from_pandas(df)
+
+
+def via_arrow(xmls: list[str]) -> pa.RecordBatch:
+    return bill_status_arrow_mod.to_record_batch(xmls)
+
+
+def check_parity(xmls: list[str]) -> int:
+    """Number of rows that differ from the strict parser"""
+    rows = via_arrow(xmls).to_pylist()
+    nbad = 0
+    for xml, row in zip(xmls, rows):
+        ref = BillStatus.from_xml_str(xml).model_dump()
+        if {key: row[key] for key in ref} != ref:
+            nbad += 1
+    return nbad
+
+
+def time_fn(fn, xmls: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(xmls)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", type=Path, default=None)
+    parser.add_argument("--nbills", type=int, default=200)
+    parser.add_argument("--nomnibus", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.path is not None:
+        corpora = {
+            str(args.path): [
+                fpath.read_text().strip()
+                for fpath in sorted(args.path.rglob("fdsys_billstatus.xml"))
+            ]
+        }
+    else:
+        corpora = {
+            "typical": get_synthetic(args.nbills, False, args.seed),
+            "omnibus": get_synthetic(args.nomnibus, True, args.seed),
+        }
+
+    nbad = 0
+    table = Table(title="billstatus xml -> arrow")
+    for col in ["corpus", "files", "MB", "mismatches", "pandas s", "arrow s", "speedup", "arrow MB/s"]:
+        table.add_column(col, justify="right")
+    for name, xmls in corpora.items():
+        mb = sum(len(xml) for xml in xmls) / 1e6
+        nbad_corpus = check_parity(xmls)
+        nbad += nbad_corpus
+        dt_ref = time_fn(via_pandas, xmls, args.repeat)
+        dt_new = time_fn(via_arrow, xmls, args.repeat)
+        table.add_row(
+            name,
+            str(len(xmls)),
+            f"{mb:.1f}",
+            str(nbad_corpus),
+            f"{dt_ref:.3f}",
+            f"{dt_new:.3f}",
+            f"{dt_ref / dt_new:.2f}x",
+            f"{mb / dt_new:.1f}",
+        )
+    rich.print(table)
+    sys.exit(1 if nbad else 0)
@@ -0,0 +1,76 @@
+"""
+Peak memory and time of the tree and streaming billstatus parsers on one huge bill.
+
+A synthetic omnibus bill is made larger by repeating its amendments
+--factor times (a factor of 30 gives about 50 MB, the size of the largest
+appropriations bills). Each parser runs in a fresh process so that peak
+resident memory is its own.
+
+python scripts/bench_bill_status_stream.py --factor 30
+"""
+
+import argparse
+import random
+import resource
+import subprocess
+import sys
+import time
+
+import rich
+from rich.table import Table
+
+from congress_prep import bill_status_lxml_mod
+from congress_prep import synthetic_mod
+
+
+def get_huge_xml(factor: int, seed: int) -> bytes:
+    rng = random.Random(seed)
+    xml = synthetic_mod.billstatus_xml(rng, 118, "hr", 1, ["ih", "eh"], omnibus=True)
+    i0 = xml.index("<amendments>") + len("<amendments>")
+    i1 = xml.index("</amendments>")
+    return (xml[:i0] + xml[i0:i1] * factor + xml[i1:]).encode("utf-8")
+
+
+def run_one(mode: str, factor: int, seed: int):
+    """Parse in this process and print seconds and peak rss increase in MB"""
+    xml = get_huge_xml(factor, seed)
+    rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    if mode == "trusted":
+        bill_status_lxml_mod.json_from_xml_str(xml, stream=False)
+    elif mode == "trusted-stream":
+        bill_status_lxml_mod.json_from_xml_str(xml, stream=True)
+    elif mode == "strict":
+        bill_status_lxml_mod.from_xml_str(xml, stream=False)
+    else:
+        bill_status_lxml_mod.from_xml_str(xml, stream=True)
+    dt = time.perf_counter() - t0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{dt} {(rss - rss0) * 1024 / 2**20} {len(xml)}")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--factor", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--run-one", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one is not None:
+        run_one(args.run_one, args.factor, args.seed)
+        sys.exit(0)
+
+    table = Table(title=f"huge billstatus (amendments x {args.factor})")
+    for col in ["mode", "MB", "s", "peak rss MB"]:
+        table.add_column(col, justify="right")
+    for mode in ["strict", "strict-stream", "trusted", "trusted-stream"]:
+        out = subprocess.run(
+            [sys.executable, __file__, "--factor", str(args.factor), "--seed", str(args.seed), "--run-one", mode],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+        dt, rss_mb, nbytes = float(out[0]), float(out[1]), int(out[2])
+        table.add_row(mode, f"{nbytes / 1e6:.0f}", f"{dt:.2f}", f"{rss_mb:.0f}")
+    rich.print(table)
@@ -0,0 +1,98 @@
+"""
+Compare the insert based upsert with the COPY + staging table upsert.
+
+Writes a synthetic textversions_xml corpus into a scratch postgres database
+twice per loader (the first pass inserts, the second pass updates every row)
+and prints rows/s and MB/s for each.
+
+python scripts/bench_copy_upsert.py postgresql+psycopg2://localhost:5432/scratch
+"""
+
+import argparse
+import importlib
+import random
+import time
+
+import rich
+from sqlalchemy import create_engine
+
+from congress_prep import orm_mod
+from congress_prep import pg_copy_mod
+
+populate = importlib.import_module("congress_prep.01_populate_postgres")
+
+
+WORDS = "the of and to in shall section such act secretary state federal".split()
+
+
+def get_xml(rng: random.Random, nbytes: int) -> str:
+    paras = []
+    size = 0
+    while size < nbytes:
+        para = " ".join(rng.choices(WORDS, k=80))
+        paras.append(f"<paragraph><text>{para}</text></paragraph>")
+        size += len(para) + 40
+    body = "".join(paras)
+    return f'<?xml version="1.0"?><bill><legis-body>{body}</legis-body></bill>'
+
+
+def get_rows(nrows: int, median_bytes: int = 20_000, seed: int = 0) -> list[dict]:
+    """Text version rows with a long tailed size distribution capped at 5 MB"""
+    rng = random.Random(seed)
+    rows = []
+    for ii in range(nrows):
+        nbytes = min(int(median_bytes * rng.lognormvariate(0, 1.5)), 5_000_000)
+        rows.append(
+            {
+                "tv_id": f"118-hr-{ii}-ih-dtd",
+                "legis_id": f"118-hr-{ii}",
+                "congress_num": 118,
+                "legis_type": "hr",
+                "legis_num": ii,
+                "legis_version": "ih",
+                "legis_class": "bills",
+                "scrape_path": f"data/govinfo/BILLS/118/1/hr/BILLS-118hr{ii}ih.xml",
+                "file_name": f"BILLS-118hr{ii}ih.xml",
+                "lastmod": "2024-01-11T13:31:58Z",
+                "xml_type": "dtd",
+                "root_tag": "bill",
+                "tv_xml": get_xml(rng, nbytes),
+            }
+        )
+    return rows
+
+
+def run(Session, upsert_fn, rows: list[dict], batch_size: int) -> float:
+    t0 = time.perf_counter()
+    for ii in range(0, len(rows), batch_size):
+        with Session() as session:
+            upsert_fn(session, orm_mod.TextVersionsXml.__table__, rows[ii : ii + batch_size])
+    return time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("conn_str")
+    parser.add_argument("--nrows", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--median-bytes", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rows = get_rows(args.nrows, args.median_bytes)
+    mb = sum(len(row["tv_xml"]) for row in rows) / 1e6
+    rich.print(f"{len(rows)} rows, {mb:.1f} MB of xml")
+
+    engine = create_engine(args.conn_str)
+    Session = populate.get_session(args.conn_str)
+    loaders = {"insert": populate.upsert, "copy": pg_copy_mod.copy_upsert}
+
+    for name, upsert_fn in loaders.items():
+        orm_mod.TextVersionsXml.__table__.drop(engine, checkfirst=True)
+        orm_mod.TextVersionsXml.__table__.create(engine)
+        for phase in ["insert", "update"]:
+            dt = run(Session, upsert_fn, rows, args.batch_size)
+            rich.print(
+                f"{name:>6} loader, {phase} pass: {dt:.2f}s, "
+                f"{len(rows) / dt:.0f} rows/s, {mb / dt:.1f} MB/s"
+            )
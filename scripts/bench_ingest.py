@@ -0,0 +1,191 @@
+"""
+Ingest throughput benchmark on a synthetic congress-scraper tree.
+
+Generates a tree with synthetic_mod (once, it is reused if it exists) and
+times each ingest stage,
+
+  scan          walk the data/ tree and classify files
+  parse         read + BillStatus.from_xml_str for every billstatus file
+  text-extract  read + get_bill_text_v5 for every text version
+  upsert        upsert_billstatus + upsert_textversions_combined into a db
+
+Results are printed and appended to a json lines file. With --compare the
+run is checked against the last result with the same configuration in that
+file and the script exits non-zero if any stage got slower than --tolerance.
+
+python scripts/bench_ingest.py --nbills 2000
+python scripts/bench_ingest.py --conn-str postgresql+psycopg2://localhost:5432/scratch
+python scripts/bench_ingest.py --compare bench_ingest.jsonl
+"""
+
+import argparse
+import datetime
+import importlib
+import json
+import os
+from pathlib import Path
+import platform
+import sys
+import tempfile
+import time
+
+import rich
+from rich.table import Table
+
+from congress_prep import scan_mod
+from congress_prep import synthetic_mod
+from congress_prep.bill_status_mod import BillStatus
+from congress_prep.textversions_mod import get_bill_text_v5
+
+populate = importlib.import_module("congress_prep.01_populate_postgres")
+
+
+def timed(fn, *args, **kwargs) -> tuple[float, object]:
+    t0 = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - t0, result
+
+
+def bench_parse(root: Path, records: list[scan_mod.ScanRecord]) -> tuple[int, int]:
+    nbytes = 0
+    for record in records:
+        xml = (root / record.scrape_path).read_text()
+        BillStatus.from_xml_str(xml)
+        nbytes += len(xml)
+    return len(records), nbytes
+
+
+def bench_text(root: Path, records: list[scan_mod.ScanRecord]) -> tuple[int, int]:
+    nbytes = 0
+    for record in records:
+        xml = (root / record.scrape_path).read_text()
+        get_bill_text_v5(xml)
+        nbytes += len(xml)
+    return len(records), nbytes
+
+
+def bench_upsert(
+    root: Path, conn_str: str, records: list[scan_mod.ScanRecord], workers: int
+) -> None:
+    populate.reset_tables(conn_str)
+    populate.upsert_billstatus(root, conn_str, workers=workers, records=records)
+    populate.upsert_textversions_combined(root, conn_str, workers=workers, records=records)
+
+
+def get_config(args) -> dict:
+    return {
+        "nbills": args.nbills,
+        "seed": args.seed,
+        "omnibus_fraction": args.omnibus_fraction,
+        "dialect": args.conn_str.split(":", 1)[0],
+        "workers": args.workers,
+    }
+
+
+def compare(results: dict, compare_path: Path, tolerance: float) -> bool:
+    """Return True if no stage is slower than the last matching result by more than tolerance"""
+    previous = None
+    if compare_path.exists():
+        with open(compare_path) as fp:
+            for line in fp:
+                item = json.loads(line)
+                if item["config"] == results["config"]:
+                    previous = item
+    if previous is None:
+        rich.print(f"no previous result with this config in {compare_path}")
+        return True
+
+    ok = True
+    for stage, stats in results["stages"].items():
+        if stage not in previous["stages"]:
+            continue
+        ratio = stats["seconds"] / previous["stages"][stage]["seconds"]
+        slower = ratio > 1 + tolerance
+        ok = ok and not slower
+        flag = "[red]REGRESSION[/red]" if slower else "ok"
+        rich.print(f"{stage:>13}: {ratio:.2f}x the time of {previous['timestamp']} {flag}")
+    return ok
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--tree-path",
+        type=Path,
+        default=Path(tempfile.gettempdir()) / "congress-scraper-synthetic",
+    )
+    parser.add_argument("--conn-str", default=None, help="default is a sqlite file")
+    parser.add_argument("--nbills", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--omnibus-fraction", type=float, default=0.005)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--stages", default="scan,parse,text-extract,upsert")
+    parser.add_argument("--results", type=Path, default=Path("bench_ingest.jsonl"))
+    parser.add_argument("--compare", type=Path, default=None)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    # one tree per configuration so that results are comparable
+    root = args.tree_path / f"n{args.nbills}-s{args.seed}-o{args.omnibus_fraction}"
+    if args.conn_str is None:
+        args.conn_str = f"sqlite:///{root / 'bench.db'}"
+    if not (root / "data").exists():
+        synthetic_mod.generate_tree(
+            root,
+            nbills=args.nbills,
+            seed=args.seed,
+            omnibus_fraction=args.omnibus_fraction,
+        )
+
+    stages = args.stages.split(",")
+    records = scan_mod.scan(root)
+    billstatus = list(scan_mod.filter_kinds(records, [scan_mod.BILLSTATUS]))
+    textversions = list(scan_mod.filter_kinds(records, scan_mod.TEXTVERSION_KINDS))
+    bs_bytes = sum((root / r.scrape_path).stat().st_size for r in billstatus)
+    tv_bytes = sum((root / r.scrape_path).stat().st_size for r in textversions)
+
+    stats = {}
+    if "scan" in stages:
+        dt, scanned = timed(scan_mod.scan, root)
+        stats["scan"] = {"seconds": dt, "items": len(scanned), "bytes": 0}
+    if "parse" in stages:
+        dt, (nitems, nbytes) = timed(bench_parse, root, billstatus)
+        stats["parse"] = {"seconds": dt, "items": nitems, "bytes": nbytes}
+    if "text-extract" in stages:
+        dt, (nitems, nbytes) = timed(bench_text, root, textversions)
+        stats["text-extract"] = {"seconds": dt, "items": nitems, "bytes": nbytes}
+    if "upsert" in stages:
+        dt, _ = timed(bench_upsert, root, args.conn_str, records, args.workers)
+        stats["upsert"] = {
+            "seconds": dt,
+            "items": len(billstatus) + len(textversions),
+            "bytes": bs_bytes + tv_bytes,
+        }
+
+    table = Table(title=f"ingest benchmark ({args.nbills} bills, {args.conn_str})")
+    for col in ["stage", "seconds", "items", "items/s", "MB/s"]:
+        table.add_column(col, justify="right")
+    for stage, stat in stats.items():
+        table.add_row(
+            stage,
+            f"{stat['seconds']:.2f}",
+            str(stat["items"]),
+            f"{stat['items'] / stat['seconds']:.1f}",
+            f"{stat['bytes'] / 1e6 / stat['seconds']:.1f}",
+        )
+    rich.print(table)
+
+    results = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "config": get_config(args),
+        "platform": {"python": platform.python_version(), "machine": platform.machine()},
+        "stages": stats,
+    }
+    ok = True
+    if args.compare is not None:
+        ok = compare(results, args.compare, args.tolerance)
+    with open(args.results, "a") as fp:
+        fp.write(json.dumps(results) + "\n")
+    rich.print(f"appended results to {args.results}")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,125 @@
+"""
+Check and time BillStatus.parse_many against a serial from_xml_str loop.
+
+Parity: every result of parse_many (ordered and unordered, every output)
+must have the same json as BillStatus.from_xml_str(xml).model_dump_json().
+
+Timing: the serial loop that the stages used to run (read the file,
+from_xml_str, model_dump_json) against parse_many(output="json") with
+1, 2, ... --workers processes. Pool start-up is included in every run.
+
+python scripts/bench_parse_many.py --workers 8
+python scripts/bench_parse_many.py --path /data/congress-scraper/data/117/bills/hr
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+import random
+import sys
+import tempfile
+import time
+
+import rich
+from rich.table import Table
+
+from congress_prep import bill_status_batch_mod
+from congress_prep import synthetic_mod
+from congress_prep.bill_status_mod import BillStatus
+
+
+def write_synthetic(out_path: Path, nbills: int, nomnibus: int, seed: int) -> list[Path]:
+    rng = random.Random(seed)
+    paths = []
+    for legis_num in range(1, nbills + 1):
+        omnibus = legis_num <= nomnibus
+        xml = synthetic_mod.billstatus_xml(rng, 118, "hr", legis_num, ["ih", "eh"], omnibus=omnibus)
+        fpath = out_path / f"hr{legis_num}" / "fdsys_billstatus.xml"
+        fpath.parent.mkdir(parents=True)
+        fpath.write_text(xml)
+        paths.append(fpath)
+    return paths
+
+
+def serial(paths: list[Path]) -> list[bytes]:
+    return [
+        BillStatus.from_xml_str(fpath.read_text().strip()).model_dump_json().encode("utf-8")
+        for fpath in paths
+    ]
+
+
+def batch(paths: list[Path], workers: int, ordered: bool = True) -> list[bytes]:
+    results = [None] * len(paths)
+    for idx, json_bytes, error in BillStatus.parse_many(
+        paths, workers=workers, ordered=ordered, output="json"
+    ):
+        results[idx] = json_bytes
+    return results
+
+
+def check_parity(paths: list[Path], workers: int) -> int:
+    """Number of results that differ from the serial loop"""
+    ref = serial(paths)
+    nbad = 0
+    for ordered in [True, False]:
+        for output in bill_status_batch_mod.OUTPUTS:
+            for idx, result, error in BillStatus.parse_many(
+                paths, workers=workers, ordered=ordered, output=output
+            ):
+                if output == "model":
+                    result = result.model_dump_json().encode("utf-8")
+                elif output == "dict":
+                    result = json.dumps(result).encode("utf-8")
+                    ref_idx = json.dumps(json.loads(ref[idx])).encode("utf-8")
+                    nbad += result != ref_idx
+                    continue
+                nbad += result != ref[idx]
+    return nbad
+
+
+def time_fn(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", type=Path, default=None)
+    parser.add_argument("--nbills", type=int, default=300)
+    parser.add_argument("--nomnibus", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.path is not None:
+            paths = sorted(args.path.rglob("fdsys_billstatus.xml"))
+        else:
+            paths = write_synthetic(Path(tmp_dir), args.nbills, args.nomnibus, args.seed)
+        mb = sum(fpath.stat().st_size for fpath in paths) / 1e6
+
+        nbad = check_parity(paths, min(args.workers, 2))
+        dt_ref = time_fn(lambda: serial(paths), args.repeat)
+
+        table = Table(title=f"parse_many, {len(paths)} files, {mb:.1f} MB, {nbad} mismatches")
+        for col in ["run", "s", "speedup", "MB/s"]:
+            table.add_column(col, justify="right")
+        table.add_row("serial loop", f"{dt_ref:.3f}", "1.00x", f"{mb / dt_ref:.1f}")
+        workers = 1
+        while True:
+            for ordered in [True, False] if workers > 1 else [True]:
+                dt = time_fn(lambda: batch(paths, workers, ordered), args.repeat)
+                name = f"workers={workers}" + ("" if ordered else " unordered")
+                table.add_row(name, f"{dt:.3f}", f"{dt_ref / dt:.2f}x", f"{mb / dt:.1f}")
+            if workers >= args.workers:
+                break
+            workers = min(workers * 2, args.workers)
+        rich.print(table)
+    sys.exit(1 if nbad else 0)
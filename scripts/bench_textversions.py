@@ -0,0 +1,146 @@
+"""
+Check and time the lxml text extractor (get_bill_text_v5) against get_bill_text_v4.
+
+Parity: for every text version the two extractors must return the same
+string, and a file that fails with one must fail with the other. With
+--sample only that many randomly chosen files are checked and timed. If
+unstructured is installed, clean_whitespace is also checked against
+unstructured's clean(text, extra_whitespace=True) on the text of every
+top level element.
+
+Timing: best of --repeat runs of each extractor over the in memory xml,
+reported as text versions per second and MB/s.
+
+python scripts/bench_textversions.py /data/congress-scraper/data/govinfo --sample 2000
+python scripts/bench_textversions.py --synthetic 300 --parity-only
+"""
+
+import argparse
+from pathlib import Path
+import random
+import sys
+import time
+
+import rich
+from rich.table import Table
+
+from congress_prep import synthetic_mod
+from congress_prep import textversions_mod
+from congress_prep.textversions_mod import get_bill_text_v4
+from congress_prep.textversions_mod import get_bill_text_v5
+
+try:
+    from unstructured.cleaners.core import clean
+except ImportError:
+    clean = None
+
+
+EXTRACTORS = {"v4 (BeautifulSoup)": get_bill_text_v4, "v5 (lxml)": get_bill_text_v5}
+
+
+def text_or_error(fn, xml: str) -> str:
+    try:
+        return fn(xml)
+    except Exception as exc:
+        return f"error: {type(exc).__name__}"
+
+
+def get_synthetic(nbills: int, seed: int) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    docs = []
+    for legis_num in range(1, nbills + 1):
+        nbytes = synthetic_mod.get_size(rng, 15_000, 1.2, 500, 2_000_000)
+        for uslm in [False, True]:
+            xml = synthetic_mod.textversion_xml(rng, 118, "hr", legis_num, "bill", nbytes, uslm)
+            docs.append((f"synthetic hr{legis_num} {uslm=}", xml.strip()))
+    return docs
+
+
+def get_files(path: Path, sample: int, seed: int) -> list[tuple[str, str]]:
+    fpaths = sorted(path.rglob("BILLS-*.xml")) + sorted(path.rglob("PLAW-*.xml"))
+    if sample and sample < len(fpaths):
+        fpaths = random.Random(seed).sample(fpaths, sample)
+    # stripped like in get_textversion_rows
+    return [(str(fpath), fpath.read_text().strip()) for fpath in fpaths]
+
+
+def check_parity(docs: list[tuple[str, str]]) -> list[tuple[str, str, str]]:
+    mismatches = []
+    for name, xml in docs:
+        ref = text_or_error(get_bill_text_v4, xml)
+        new = text_or_error(get_bill_text_v5, xml)
+        if ref.startswith("error") and new.startswith("error"):
+            continue
+        if ref != new:
+            idx = next((ii for ii, (aa, bb) in enumerate(zip(ref, new)) if aa != bb), 0)
+            mismatches.append((name, repr(ref[idx : idx + 60]), repr(new[idx : idx + 60])))
+    return mismatches
+
+
+def check_clean(docs: list[tuple[str, str]]) -> list[tuple[str, str, str]]:
+    """clean_whitespace against unstructured's clean on every top level element text"""
+    mismatches = []
+    for name, xml in docs:
+        try:
+            root = textversions_mod.parse_textversion(xml)
+        except ValueError:
+            continue
+        for child in root.iterchildren("*"):
+            text = " ".join(child.itertext())
+            ref = clean(text.replace("\t", ""), extra_whitespace=True)
+            new = textversions_mod.clean_whitespace(text)
+            if ref != new:
+                mismatches.append((f"{name} <{child.tag}>", repr(ref[:60]), repr(new[:60])))
+    return mismatches
+
+
+def time_fn(fn, xmls: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for xml in xmls:
+            text_or_error(fn, xml)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", type=Path, nargs="?", default=None)
+    parser.add_argument("--synthetic", type=int, default=300, help="number of synthetic bills")
+    parser.add_argument("--sample", type=int, default=0, help="number of files, 0 for all")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--parity-only", action="store_true")
+    args = parser.parse_args()
+
+    if args.path is not None:
+        docs = get_files(args.path, args.sample, args.seed)
+    else:
+        docs = get_synthetic(args.synthetic, args.seed)
+    xmls = [xml for _, xml in docs]
+    mb = sum(len(xml.encode("utf-8")) for xml in xmls) / 1e6
+
+    mismatches = check_parity(docs)
+    if clean is not None:
+        mismatches += check_clean(docs)
+    else:
+        rich.print("unstructured is not installed, clean_whitespace is not checked")
+    for name, ref, new in mismatches[:20]:
+        rich.print(f"[red]mismatch[/red] {name}\n  ref: {ref}\n  new: {new}")
+    rich.print(f"{len(docs)} text versions, {mb:.1f} MB, {len(mismatches)} mismatches")
+
+    if not args.parity_only:
+        table = Table(title=f"text extraction, {len(docs)} text versions, {mb:.1f} MB")
+        for col in ["extractor", "s", "versions/s", "MB/s", "speedup"]:
+            table.add_column(col, justify="right")
+        dt_ref = None
+        for name, fn in EXTRACTORS.items():
+            dt = time_fn(fn, xmls, args.repeat)
+            dt_ref = dt_ref or dt
+            table.add_row(
+                name, f"{dt:.3f}", f"{len(docs) / dt:.1f}", f"{mb / dt:.1f}", f"{dt_ref / dt:.2f}x"
+            )
+        rich.print(table)
+    sys.exit(1 if mismatches else 0)
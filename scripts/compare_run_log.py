@@ -0,0 +1,76 @@
+"""
+Compare stage timings of two runs in an instrument_mod run log.
+
+By default the last two runs in the log are compared. Stages and steps are
+matched on (pipeline, stage, step, labels).
+
+python scripts/compare_run_log.py /data/congress-scraper/run_log.jsonl
+python scripts/compare_run_log.py run_log.jsonl --base 20240301T101500-1a2b3c4d --new 20240302T...
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import rich
+from rich.table import Table
+
+from congress_prep import instrument_mod
+
+
+def get_key(record: instrument_mod.StageRecord) -> tuple:
+    return (
+        record.pipeline,
+        record.stage,
+        record.step or "",
+        json.dumps(record.labels, sort_keys=True),
+    )
+
+
+def format_ratio(new: float, base: float) -> str:
+    if base == 0:
+        return "-"
+    ratio = new / base
+    color = "red" if ratio > 1.1 else "green" if ratio < 0.9 else "white"
+    return f"[{color}]{ratio:.2f}x[/{color}]"
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("run_log", type=Path)
+    parser.add_argument("--base", default=None, help="run id (default second to last run)")
+    parser.add_argument("--new", default=None, help="run id (default last run)")
+    args = parser.parse_args()
+
+    records = instrument_mod.read_run_log(args.run_log)
+    run_ids = instrument_mod.get_run_ids(records)
+    if len(run_ids) < 2 and (args.base is None or args.new is None):
+        raise ValueError(f"need two runs to compare, found {run_ids}")
+    base_id = args.base or run_ids[-2]
+    new_id = args.new or run_ids[-1]
+
+    base = {get_key(r): r for r in records if r.run_id == base_id}
+    new = {get_key(r): r for r in records if r.run_id == new_id}
+
+    table = Table(title=f"{new_id} vs {base_id}")
+    for col in ["stage", "labels", "wall s", "wall", "cpu", "items/s", "MB/s", "process peak rss MB"]:
+        table.add_column(col, justify="right")
+    for key, rec in new.items():
+        pipeline, stage, step, labels = key
+        name = f"{stage}/{step}" if step else stage
+        ref = base.get(key)
+        if ref is None:
+            table.add_row(name, labels, f"{rec.wall_s:.2f}", "new", "", "", "", f"{rec.process_peak_rss_mb:.0f}")
+            continue
+        table.add_row(
+            name,
+            labels,
+            f"{rec.wall_s:.2f}",
+            format_ratio(rec.wall_s, ref.wall_s),
+            format_ratio(rec.cpu_s, ref.cpu_s),
+            f"{(rec.items_per_s or 0):.1f} ({(ref.items_per_s or 0):.1f})",
+            f"{(rec.bytes_per_s or 0) / 1e6:.1f} ({(ref.bytes_per_s or 0) / 1e6:.1f})",
+            f"{rec.process_peak_rss_mb:.0f} ({ref.process_peak_rss_mb:.0f})",
+        )
+    rich.print(table)
@@ -0,0 +1,262 @@
+"""
+Check that the lxml and ElementTree billstatus parsers give the same BillStatus.
+
+Every fdsys_billstatus.xml file under the path is parsed with
+BillStatus.from_xml_str_etree (find based reference) and
+bill_status_lxml_mod.from_xml_str. The json dumps must be equal, and a file
+that fails with one parser must fail with the other. For files that parse,
+the trusted json of bill_status_lxml_mod.json_from_xml_str must also have
+the same bytes (files that fail validation are not checked in trusted mode),
+and so must the streaming (iterparse) parse.
+
+Besides the given files, mutated copies of one synthetic document are
+checked: required children removed (e.g. an amendedBill without a number),
+duplicated containers (only the first one is read, like find) and empty
+items. For these both parsers must also fail or succeed as expected, and
+the streaming parse must fail whenever the reference does.
+Exits non-zero on any difference.
+
+python scripts/parity_bill_status.py /data/congress-scraper/data/118
+python scripts/parity_bill_status.py --synthetic 500
+"""
+
+import argparse
+from functools import partial
+from itertools import chain
+from pathlib import Path
+import random
+import re
+import sys
+
+import rich
+
+from congress_prep import bill_status_lxml_mod
+from congress_prep import model_json_mod
+from congress_prep import synthetic_mod
+from congress_prep.bill_status_mod import BillStatus
+
+
+def parse_or_error(fn, xml: str) -> str:
+    try:
+        return fn(xml).model_dump_json()
+    except Exception as exc:
+        return f"error: {type(exc).__name__}"
+
+
+def trusted_or_error(xml: str) -> str:
+    try:
+        return model_json_mod.to_json_str(bill_status_lxml_mod.json_from_xml_str(xml))
+    except Exception as exc:
+        return f"error: {type(exc).__name__}"
+
+
+def iter_synthetic(nbills: int, seed: int):
+    rng = random.Random(seed)
+    for legis_num in range(1, nbills + 1):
+        omnibus = legis_num % 50 == 0
+        yield f"synthetic hr{legis_num}", synthetic_mod.billstatus_xml(
+            rng, 118, "hr", legis_num, ["ih", "eh"], omnibus=omnibus
+        )
+
+
+# items that fail validation, in the repeated containers below they must be
+# ignored like find ignores them
+BAD_ACTION = "<item><actionDate>never</actionDate><text>Never</text></item>"
+BAD_MEMBER = "<item><fullName>No Bioguide Id</fullName></item>"
+BAD_AMENDMENT = "<amendment><number>one</number></amendment>"
+
+# name, pattern, replacement, should_fail (the first match of the regex
+# pattern in the base document is replaced, the first amendedBill is the
+# first one followed by originChamber)
+MUTATIONS = [
+    ("amendedBill without type", "<type>HR</type><originChamber>", "<originChamber>", True),
+    (
+        "amendedBill without originChamberCode",
+        "<originChamberCode>H</originChamberCode><number>",
+        "<number>",
+        True,
+    ),
+    (
+        "amendedBill without number",
+        "</originChamberCode><number>1</number><title>Synthetic Act",
+        "</originChamberCode><title>Synthetic Act",
+        True,
+    ),
+    (
+        "amendedBill with a bad number",
+        "<number>1</number><title>Synthetic Act",
+        "<number>one</number><title>Synthetic Act",
+        True,
+    ),
+    (
+        "amendedBill with a bad updateDateIncludingText",
+        "<title>Synthetic Act</title></amendedBill>",
+        "<title>Synthetic Act</title>"
+        "<updateDateIncludingText>yesterday</updateDateIncludingText></amendedBill>",
+        True,
+    ),
+    (
+        "amendedBill with updateDateIncludingText",
+        "<title>Synthetic Act</title></amendedBill>",
+        "<title>Synthetic Act</title>"
+        "<updateDateIncludingText>2023-01-01T00:00:00Z</updateDateIncludingText></amendedBill>",
+        False,
+    ),
+    # required children removed
+    ("bill without updateDate", r"<updateDate>[^<]*</updateDate>", "", True),
+    ("bill without congress", r"<congress>118</congress><actions>", "<actions>", True),
+    ("bill without dublinCore", r"<dublinCore .*</dublinCore>", "", True),
+    (
+        "action without actionDate",
+        r"<actions><item><actionDate>[^<]*</actionDate>",
+        "<actions><item>",
+        True,
+    ),
+    (
+        "sponsor without bioguideId",
+        r"<sponsors><item><bioguideId>[^<]*</bioguideId>",
+        "<sponsors><item>",
+        True,
+    ),
+    (
+        "cosponsor without bioguideId",
+        r"<cosponsors><item><bioguideId>[^<]*</bioguideId>",
+        "<cosponsors><item>",
+        True,
+    ),
+    ("amendment without number", r"<amendment><number>[^<]*</number>", "<amendment>", True),
+    (
+        "amendment action without actionDate",
+        r"<actions><count>1</count><actions><item><actionDate>[^<]*</actionDate>",
+        "<actions><count>1</count><actions><item>",
+        True,
+    ),
+    (
+        "text version format without url",
+        r"<formats><item><url>[^<]*</url>",
+        "<formats><item>",
+        True,
+    ),
+    # duplicated containers, only the first one is read
+    (
+        "second actions",
+        r"</actions><sponsors>",
+        f"</actions><actions>{BAD_ACTION}</actions><sponsors>",
+        False,
+    ),
+    (
+        "second sponsors",
+        r"</sponsors><cosponsors>",
+        f"</sponsors><sponsors>{BAD_MEMBER}</sponsors><cosponsors>",
+        False,
+    ),
+    (
+        "second cosponsors",
+        r"</cosponsors><policyArea>",
+        f"</cosponsors><cosponsors>{BAD_MEMBER}</cosponsors><policyArea>",
+        False,
+    ),
+    (
+        "second amendments",
+        r"</amendments><textVersions>",
+        f"</amendments><amendments>{BAD_AMENDMENT}</amendments><textVersions>",
+        False,
+    ),
+    (
+        "second textVersions",
+        r"</textVersions><latestAction>",
+        "</textVersions><textVersions><item><formats><item/></formats></item></textVersions>"
+        "<latestAction>",
+        False,
+    ),
+    (
+        "empty actions before actions",
+        r"<actions><item>",
+        "<actions></actions><actions><item>",
+        False,
+    ),
+    (
+        "empty amendments before amendments",
+        r"<amendments>",
+        "<amendments></amendments><amendments>",
+        False,
+    ),
+    ("second bill", r"</bill>", "</bill><bill><number>one</number></bill>", False),
+    # empty items
+    ("empty action item", r"<actions><item>", "<actions><item/><item>", False),
+    ("empty sponsor item", r"<sponsors><item>", "<sponsors><item/><item>", True),
+    ("empty cosponsor item", r"<cosponsors><item>", "<cosponsors><item/><item>", True),
+    ("empty amendment", r"<amendments><amendment>", "<amendments><amendment/><amendment>", True),
+    ("empty text version item", r"<textVersions><item>", "<textVersions><item/><item>", False),
+    ("empty subject item", r"<legislativeSubjects>", "<legislativeSubjects><item/>", True),
+    ("empty title item", r"<titles><item>", "<titles><item/><item>", True),
+    ("empty policyArea", r"<policyArea><name>Energy</name></policyArea>", "<policyArea/>", False),
+]
+
+
+def iter_mutated(seed: int):
+    """Mutated copies of a synthetic bill (hr1 with amendments)"""
+    base = synthetic_mod.billstatus_xml(random.Random(seed), 118, "hr", 1, ["ih"], omnibus=True)
+    for name, pattern, new, should_fail in MUTATIONS:
+        xml, nsubs = re.subn(pattern, new, base, count=1, flags=re.DOTALL)
+        if nsubs == 0:
+            raise ValueError(f"mutation {name!r} does not apply")
+        yield f"mutated: {name}", xml, should_fail
+
+
+def iter_files(path: Path):
+    for fpath in sorted(path.rglob("fdsys_billstatus.xml")):
+        yield str(fpath), fpath.read_text().strip()
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", type=Path, nargs="?", default=None)
+    parser.add_argument("--synthetic", type=int, default=0, help="number of synthetic bills")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    docs = iter_synthetic(args.synthetic, args.seed)
+    if args.path is not None:
+        docs = iter_files(args.path)
+
+    docs = chain(
+        ((name, xml, None) for name, xml in docs),
+        iter_mutated(args.seed),
+    )
+
+    nfiles = 0
+    nerrors = 0
+    mismatches = []
+    for name, xml, should_fail in docs:
+        ref = parse_or_error(BillStatus.from_xml_str_etree, xml)
+        new = parse_or_error(bill_status_lxml_mod.from_xml_str, xml)
+        nfiles += 1
+        if should_fail is not None and ref.startswith("error") != should_fail:
+            expected = "error" if should_fail else "success"
+            mismatches.append((f"{name} (expected {expected})", ref[:80], new[:80]))
+        if ref.startswith("error") or new.startswith("error"):
+            nerrors += 1
+            # the exception types differ (AttributeError vs KeyError) but both must fail
+            if ref.startswith("error") != new.startswith("error"):
+                mismatches.append((name, ref[:80], new[:80]))
+            streamed = parse_or_error(partial(bill_status_lxml_mod.from_xml_str, stream=True), xml)
+            if not streamed.startswith("error"):
+                mismatches.append((f"{name} (stream)", ref[:80], streamed[:80]))
+        elif ref != new:
+            mismatches.append((name, ref[:80], new[:80]))
+        else:
+            trusted = trusted_or_error(xml)
+            if trusted != ref:
+                mismatches.append((f"{name} (trusted)", ref[:80], trusted[:80]))
+            streamed = parse_or_error(partial(bill_status_lxml_mod.from_xml_str, stream=True), xml)
+            if streamed != ref:
+                mismatches.append((f"{name} (stream)", ref[:80], streamed[:80]))
+
+    for name, ref, new in mismatches[:20]:
+        rich.print(f"[red]mismatch[/red] {name}\n  etree: {ref}\n  new:   {new}")
+    rich.print(
+        f"{nfiles} files, {nerrors} failed with both parsers, {len(mismatches)} mismatches"
+    )
+    sys.exit(1 if mismatches else 0)